@@ -0,0 +1,42 @@
+"""Account keys, cookie storage and dispatch sharding"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+ACCOUNT_COOKIES_DIR = Path(os.getenv("ACCOUNT_COOKIES_DIR", "account_cookies"))
+# Schedules without an account use the legacy tiktok_only_cookies.txt
+DEFAULT_ACCOUNT = "default"
+# Comma-separated account ids ("default" for schedules without one) this process
+# dispatches; empty means every account
+DISPATCH_ACCOUNTS = os.getenv("DISPATCH_ACCOUNTS", "")
+
+
+def account_key(account_id: int | None) -> str:
+    """Shard / rate-limit / pool key for an account"""
+    return f"account-{account_id}" if account_id else DEFAULT_ACCOUNT
+
+
+def parse_shard(spec) -> frozenset | None:
+    """``"3,5,default"`` (or a list of the same) -> account keys; None means all accounts"""
+    if isinstance(spec, str):
+        spec = spec.split(",")
+    keys = set()
+    for item in spec or []:
+        item = str(item).strip()
+        if not item:
+            continue
+        keys.add(DEFAULT_ACCOUNT if item == DEFAULT_ACCOUNT else account_key(int(item)))
+    return frozenset(keys) or None
+
+
+def store_cookies(account_id: int, data: bytes) -> Path:
+    """Write an account's cookie file (owner-only permissions) and return its path"""
+    ACCOUNT_COOKIES_DIR.mkdir(parents=True, exist_ok=True)
+    path = ACCOUNT_COOKIES_DIR / f"account-{account_id}.txt"
+    partial = path.with_name(f"{path.name}.part")
+    fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(data)
+    os.replace(partial, path)
+    return path.resolve()
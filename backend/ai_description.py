@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import os
 from pathlib import Path
 import re
@@ -47,3 +49,61 @@ def generate_description_openai(filename: str, video_path: str) -> str:
     
     return generate_description(filename, video_path)
 
+
+class HeuristicBackend:
+    """Local filename-based backend; also the offline stub for batching tests"""
+
+    def generate_batch(self, items: list[tuple[str, str]]) -> list[str]:
+        return [generate_description(filename, video_path) for filename, video_path in items]
+
+
+class OpenAIBackend:
+    """One model round trip per batch instead of per upload.
+
+    Needs the ``openai`` package and OPENAI_API_KEY. Titles the model skips
+    fall back to the filename heuristic.
+    """
+
+    SYSTEM_PROMPT = (
+        "You are a TikTok content creator. Generate engaging descriptions with hashtags, "
+        "at most 150 characters each. Answer with one numbered line per title, e.g. '1. ...'."
+    )
+
+    def __init__(self, client=None, model: str | None = None):
+        self._client = client
+        self.model = model or os.getenv("OPENAI_MODEL", "gpt-4")
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._client
+
+    def generate_batch(self, items: list[tuple[str, str]]) -> list[str]:
+        titles = "\n".join(f"{i + 1}. {Path(filename).stem}" for i, (filename, _) in enumerate(items))
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": f"Generate a TikTok description for each video title:\n{titles}"},
+            ],
+        )
+        answers = {}
+        for line in (response.choices[0].message.content or "").splitlines():
+            match = re.match(r"^\s*(\d+)[.)]\s*(.+)$", line)
+            if match:
+                answers.setdefault(int(match.group(1)), match.group(2).strip()[:150])
+        return [
+            answers.get(i + 1) or generate_description(filename, video_path)
+            for i, (filename, video_path) in enumerate(items)
+        ]
+
+
+def get_backend():
+    """Pick the description backend from DESCRIPTION_BACKEND (heuristic | openai)"""
+    if os.getenv("DESCRIPTION_BACKEND", "heuristic") == "openai":
+        return OpenAIBackend()
+    return HeuristicBackend()
+
@@ -0,0 +1,110 @@
+"""Browser pool benchmark: per-post latency with and without warm sessions.
+
+    python bench_browser_pool.py --posts 40 --accounts 2 --workers 2 --cold-start 6 --upload 4
+
+Drives ``upload_worker._upload_once`` with a stub WebDriver whose start-up
+(Chrome launch plus cookie login) takes ``--cold-start`` seconds and whose
+upload takes ``--upload`` seconds. With the pool off, every post pays the
+cold start inside ``upload_video``, as the uploader does on its own; with it
+on, only the first post per account and worker does, plus any recycles
+(``BROWSER_MAX_USES``). Use timings measured on real Chrome for the two
+durations to project production latency.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import threading
+import time
+from pathlib import Path
+
+from loadsim import FakeUploader, _install_fake_uploader, percentiles, report_in_scratch
+
+
+class StubDriver:
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        pass
+
+
+def _run_mode(upload_worker, pooled: bool, args) -> dict:
+    from browser_pool import BrowserPool
+
+    def factory(cookies_path, headless):
+        time.sleep(args.cold_start)
+        return StubDriver()
+
+    def upload_video(filename=None, description=None, cookies=None, browser_agent=None, **kwargs):
+        if browser_agent is None:
+            time.sleep(args.cold_start)
+        time.sleep(args.upload)
+        return []
+
+    pool = BrowserPool(factory=factory)
+    upload_worker.BROWSER_POOL_ENABLED = pooled
+    upload_worker.browser_pool = pool
+    upload_worker.upload_video = upload_video
+
+    cookies = itertools.cycle([f"account-{index}.txt" for index in range(args.accounts)])
+    jobs = [next(cookies) for _ in range(args.posts)]
+    latencies, lock = [], threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not jobs:
+                    return
+                cookie_file = jobs.pop()
+            started = time.perf_counter()
+            upload_worker._upload_once("bench.mp4", "Benchmark", cookie_file, True)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    pool.close()
+
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "posts_per_minute": round(args.posts / elapsed * 60, 2),
+        "per_post_seconds": percentiles(latencies),
+        "pool": pool.stats() if pooled else None,
+    }
+
+
+def run(args) -> dict:
+    upload_worker = _install_fake_uploader(FakeUploader())
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+        "without_pool": _run_mode(upload_worker, False, args),
+        "with_pool": _run_mode(upload_worker, True, args),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=40)
+    parser.add_argument("--accounts", type=int, default=2, help="distinct cookie files, one pool key each")
+    parser.add_argument("--workers", type=int, default=2, help="concurrent uploads")
+    parser.add_argument("--cold-start", type=float, default=6.0, help="seconds to launch Chrome and log in")
+    parser.add_argument("--upload", type=float, default=4.0, help="seconds for the upload itself")
+    parser.add_argument("--workdir", default=None, help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default=None, help="also write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    output = Path(args.output).resolve() if args.output else None
+    return report_in_scratch(run, args, "bench-browser-pool-", output)
+
+
+if __name__ == "__main__":
+    main()
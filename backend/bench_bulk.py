@@ -0,0 +1,134 @@
+"""Bulk endpoint benchmark: many single calls against one bulk call.
+
+    python bench_bulk.py --schedules 5000
+
+Creates ``--schedules`` schedules for one video, then cancels them, twice:
+
+- ``single``: one ``POST /schedules`` per schedule, then one
+  ``DELETE /schedules/{id}`` each
+- ``bulk``: one ``POST /schedules/bulk`` with every create, then one with
+  every cancel
+
+Calls go through FastAPI's in-process test client, so the numbers are the
+server-side cost (validation, SQL, commits, dispatcher bookkeeping) without
+network round trips; a real client adds one round trip per call on top.
+Reports seconds, calls and SQL statements per phase.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from loadsim import FakeUploader, _install_fake_uploader, report_in_scratch
+
+MODES = ("single", "bulk")
+
+
+def _timed(phase, schedules: int):
+    """Run ``phase()`` -> calls; returns seconds, calls, SQL statements and throughput"""
+    from metrics import db_queries_total
+
+    before = db_queries_total.value()
+    started = time.perf_counter()
+    calls = phase()
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 3),
+        "calls": calls,
+        "queries": int(db_queries_total.value() - before),
+        "schedules_per_second": round(schedules / elapsed, 1),
+    }
+
+
+def _run_mode(client, mode: str, video_id: int, args) -> dict:
+    start = datetime.now() + timedelta(days=1)
+    creates = [
+        {
+            "video_id": video_id,
+            "scheduled_time": (start + timedelta(minutes=index)).isoformat(),
+            "description": f"Benchmark {index}",
+        }
+        for index in range(args.schedules)
+    ]
+    ids = []
+
+    def create():
+        if mode == "single":
+            for body in creates:
+                response = client.post("/schedules", json=body)
+                response.raise_for_status()
+                ids.append(response.json()["id"])
+            return len(creates)
+        response = client.post("/schedules/bulk", json={"operations": [{"op": "create", **body} for body in creates]})
+        response.raise_for_status()
+        ids.extend(result["id"] for result in response.json()["results"])
+        return 1
+
+    def cancel():
+        if mode == "single":
+            for schedule_id in ids:
+                client.delete(f"/schedules/{schedule_id}").raise_for_status()
+            return len(ids)
+        operations = [{"op": "cancel", "id": schedule_id} for schedule_id in ids]
+        response = client.post("/schedules/bulk", json={"operations": operations})
+        response.raise_for_status()
+        assert response.json()["failed"] == 0
+        return 1
+
+    return {"create": _timed(create, args.schedules), "cancel": _timed(cancel, args.schedules)}
+
+
+def run(args) -> dict:
+    _install_fake_uploader(FakeUploader())
+
+    from fastapi.testclient import TestClient
+
+    import main
+    from database import SessionLocal
+    from models import Video
+
+    db = SessionLocal()
+    try:
+        video = Video(
+            original_filename="bench.mp4",
+            stored_filename="bench.mp4",
+            file_path="uploads/bench.mp4",
+            description="Benchmark",
+            file_size=0,
+        )
+        db.add(video)
+        db.commit()
+        video_id = video.id
+    finally:
+        db.close()
+
+    with TestClient(main.app) as client:
+        results = {mode: _run_mode(client, mode, video_id, args) for mode in args.modes}
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+        "modes": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schedules", type=int, default=5000, help="schedules created and cancelled per mode")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--workdir", default=None, help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default=None, help="also write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    output = Path(args.output).resolve() if args.output else None
+    # Schedules are a day out and cancelled again; nothing is uploaded
+    os.environ.update(BROWSER_POOL_ENABLED="0", DISPATCH_IN_API="0", TRANSCODE_ENABLED="0")
+    return report_in_scratch(run, args, "bench-bulk-", output)
+
+
+if __name__ == "__main__":
+    main()
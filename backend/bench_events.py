@@ -0,0 +1,140 @@
+"""Event bus benchmark: fan-out latency and drops with many SSE subscribers.
+
+    python bench_events.py --subscribers 1000 --loops 4 --publishers 4 --events 100
+
+Spreads ``--subscribers`` queues over ``--loops`` event loops (one thread
+each, like uvicorn workers) and publishes ``--events`` schedule events from
+``--publishers`` threads, as upload workers and request handlers do. Each
+subscriber records how long every event took from ``publish`` to its
+``get``. ``--slow`` of the subscribers sleep ``--slow-delay`` seconds per
+event, standing in for clients on a poor connection. Once one of those falls
+SUBSCRIBER_QUEUE_SIZE events behind, its backlog is dropped for a single
+``resync``. The report counts those and the events they replaced.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+from loadsim import percentiles, report_in_scratch
+
+DONE = "bench.done"
+
+
+def run(args) -> dict:
+    from events import SUBSCRIBER_QUEUE_SIZE, EventBus
+
+    bus = EventBus()
+    slow_every = round(1 / args.slow) if args.slow else 0
+    latencies, received, resyncs, last_delivery = [], [0], [0], [0.0]
+    lock = threading.Lock()
+    subscribed = threading.Barrier(args.loops + 1)
+
+    async def consume(subscription, slow: bool):
+        mine, mine_received, mine_resyncs, last = [], 0, 0, 0.0
+        while True:
+            event = await subscription.get()
+            if event["type"] == DONE:
+                break
+            if event["type"] == "resync":
+                mine_resyncs += 1
+                continue
+            last = time.perf_counter()
+            mine.append(last - event["published_at"])
+            mine_received += 1
+            if slow:
+                await asyncio.sleep(args.slow_delay)
+        subscription.close()
+        with lock:
+            latencies.extend(mine)
+            received[0] += mine_received
+            resyncs[0] += mine_resyncs
+            last_delivery[0] = max(last_delivery[0], last)
+
+    async def serve(first: int, count: int):
+        subscriptions = [bus.subscribe() for _ in range(count)]
+        consumers = [
+            consume(subscription, bool(slow_every) and (first + index) % slow_every == 0)
+            for index, subscription in enumerate(subscriptions)
+        ]
+        subscribed.wait()
+        await asyncio.gather(*consumers)
+
+    per_loop = [args.subscribers // args.loops + (index < args.subscribers % args.loops) for index in range(args.loops)]
+    firsts = [sum(per_loop[:index]) for index in range(args.loops)]
+    loops = [
+        threading.Thread(target=asyncio.run, args=(serve(first, count),))
+        for first, count in zip(firsts, per_loop)
+    ]
+    for thread in loops:
+        thread.start()
+    subscribed.wait()
+
+    publish_seconds = []
+
+    def publisher(index: int):
+        mine = []
+        for event_id in range(index, args.events, args.publishers):
+            started = time.perf_counter()
+            bus.publish("schedule.status", {"id": event_id, "status": "uploading", "published_at": started})
+            mine.append(time.perf_counter() - started)
+            if args.interval:
+                time.sleep(args.interval)
+        with lock:
+            publish_seconds.extend(mine)
+
+    started = time.perf_counter()
+    publishers = [threading.Thread(target=publisher, args=(index,)) for index in range(args.publishers)]
+    for thread in publishers:
+        thread.start()
+    for thread in publishers:
+        thread.join()
+    publish_elapsed = time.perf_counter() - started
+    # Repeated: a subscriber whose queue is full when it arrives gets a resync in its place
+    while any(thread.is_alive() for thread in loops):
+        bus.publish(DONE, {})
+        for thread in loops:
+            thread.join(timeout=0.5)
+
+    expected = args.subscribers * args.events
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+        "queue_size": SUBSCRIBER_QUEUE_SIZE,
+        "publish_seconds": round(publish_elapsed, 3),
+        "publish_call_ms": percentiles([value * 1000 for value in publish_seconds]),
+        "delivery_latency_ms": percentiles([value * 1000 for value in latencies]),
+        "delivered": received[0],
+        "expected": expected,
+        "delivery_seconds": round(last_delivery[0] - started, 3),
+        "deliveries_per_second": round(received[0] / max(last_delivery[0] - started, 1e-9)),
+        "resyncs": resyncs[0],
+        "dropped_events": expected - received[0],
+        "subscribers_left": bus.subscriber_count(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--loops", type=int, default=4, help="subscriber event loops (threads)")
+    parser.add_argument("--publishers", type=int, default=4, help="publishing threads")
+    parser.add_argument("--events", type=int, default=100, help="events published in total")
+    parser.add_argument("--interval", type=float, default=0.0, help="seconds each publisher waits between events")
+    parser.add_argument("--slow", type=float, default=0.0, help="fraction of subscribers that consume slowly")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="seconds a slow subscriber spends per event")
+    parser.add_argument("--workdir", default=None, help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default=None, help="also write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    output = Path(args.output).resolve() if args.output else None
+    return report_in_scratch(run, args, "bench-events-", output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Ingest benchmark: concurrent uploads and event-loop responsiveness.
+
+    python bench_ingest.py --clients 8 --size-mb 64
+
+Serves the API with uvicorn on a local port, then for each mode has
+``--clients`` threads upload a ``--size-mb`` file at once while a probe
+thread keeps calling ``GET /``:
+
+- ``legacy``: the pre-streaming handler (blocking ``shutil.copyfileobj``
+  inside the async endpoint), mounted by this script for comparison
+- ``multipart``: ``POST /videos/upload``
+- ``chunked``: init, ``PUT`` chunks of ``--chunk-mb``, finalize
+
+Reports aggregate MB/s, per-upload latency and probe latency; a stalled event
+loop shows up as probe latency close to the upload time.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from fastapi import File, UploadFile
+
+from loadsim import FakeUploader, _install_fake_uploader, percentiles, report_in_scratch
+
+MODES = ("legacy", "multipart", "chunked")
+
+
+def _mount_legacy_upload(app) -> None:
+    """The baseline write path: a blocking copy on the event loop thread"""
+
+    @app.post("/bench/legacy-upload")
+    async def legacy_upload(file: UploadFile = File(...)):
+        path = Path("uploads") / f"{uuid.uuid4()}{Path(file.filename).suffix}"
+        with path.open("wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        return {"file_size": os.path.getsize(path)}
+
+
+def _serve(app):
+    """Start uvicorn in a thread; returns (server, base url)"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def _upload(client, mode: str, path: Path, chunk_size: int) -> None:
+    if mode in ("legacy", "multipart"):
+        url = "/bench/legacy-upload" if mode == "legacy" else "/videos/upload"
+        with path.open("rb") as handle:
+            client.post(url, files={"file": (path.name, handle, "video/mp4")}).raise_for_status()
+        return
+
+    size = path.stat().st_size
+    session = client.post("/videos/chunked", json={"filename": path.name, "total_size": size})
+    session.raise_for_status()
+    upload_id = session.json()["upload_id"]
+    with path.open("rb") as handle:
+        offset = 0
+        while chunk := handle.read(chunk_size):
+            client.put(f"/videos/chunked/{upload_id}", params={"offset": offset}, content=chunk).raise_for_status()
+            offset += len(chunk)
+    client.post(f"/videos/chunked/{upload_id}/finalize").raise_for_status()
+
+
+def _run_mode(base_url: str, mode: str, files: list[Path], chunk_size: int) -> dict:
+    import httpx
+
+    upload_times, probe_times, errors = [], [], []
+    done = threading.Event()
+
+    def uploader(path: Path):
+        with httpx.Client(base_url=base_url, timeout=600) as client:
+            started = time.perf_counter()
+            try:
+                _upload(client, mode, path, chunk_size)
+            except Exception as exc:  # noqa: BLE001
+                errors.append(str(exc))
+                return
+            upload_times.append(time.perf_counter() - started)
+
+    def probe():
+        with httpx.Client(base_url=base_url, timeout=600) as client:
+            while not done.is_set():
+                started = time.perf_counter()
+                client.get("/")
+                probe_times.append(time.perf_counter() - started)
+                time.sleep(0.02)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    threads = [threading.Thread(target=uploader, args=(path,)) for path in files]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+
+    total_mb = sum(path.stat().st_size for path in files) / 2**20
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_mb_per_second": round(total_mb / elapsed, 1),
+        "upload_seconds": percentiles(upload_times, (50, 99)),
+        "probe_latency_seconds": percentiles(probe_times),
+        "errors": errors[:5],
+    }
+
+
+def run(args) -> dict:
+    _install_fake_uploader(FakeUploader())
+
+    import main
+
+    _mount_legacy_upload(main.app)
+    block = os.urandom(2**20)
+    files = []
+    for index in range(args.clients):
+        # Distinct content per client so deduplication doesn't short-cut the writes
+        path = Path(f"bench-{index}.mp4")
+        with path.open("wb") as handle:
+            handle.write(index.to_bytes(8, "big"))
+            for _ in range(args.size_mb):
+                handle.write(block)
+        files.append(path)
+
+    server, base_url = _serve(main.app)
+    try:
+        results = {mode: _run_mode(base_url, mode, files, args.chunk_mb * 2**20) for mode in args.modes}
+    finally:
+        server.should_exit = True
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+        "modes": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8, help="concurrent uploads")
+    parser.add_argument("--size-mb", type=int, default=64, help="size of each uploaded file")
+    parser.add_argument("--chunk-mb", type=int, default=8, help="PUT size for the chunked mode")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--workdir", default=None, help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default=None, help="also write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    output = Path(args.output).resolve() if args.output else None
+    # Only ingest is measured; uploads are never dispatched
+    os.environ.update(BROWSER_POOL_ENABLED="0", DISPATCH_IN_API="0", TRANSCODE_ENABLED="0")
+    return report_in_scratch(run, args, "bench-ingest-", output)
+
+
+if __name__ == "__main__":
+    main()
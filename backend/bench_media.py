@@ -0,0 +1,166 @@
+"""Media serving benchmark: concurrent Range reads and revalidations.
+
+    python bench_media.py --clients 16 --requests 200 --size-mb 256 --range-kb 1024
+
+Serves the API with uvicorn on a local port, writes one ``--size-mb`` video
+into ``uploads/`` and has ``--clients`` threads issue ``--requests`` requests
+each, the way players scrub through a clip:
+
+- a ``Range: bytes=N-M`` read of ``--range-kb`` at a random offset
+- every ``--revalidate-every``-th request a conditional GET with the ETag
+  from the first response (``If-None-Match``)
+
+for each mode:
+
+- ``staticfiles``: the old ``StaticFiles`` mount, mounted by this script at
+  ``/bench/static`` for comparison
+- ``route``: ``GET /uploads/{filename}``
+
+Reports requests/s, MB/s, per-request latency, the status codes seen (206 and
+304 are what players and caches want) and the latency of a probe thread
+calling ``GET /`` meanwhile.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from loadsim import FakeUploader, _install_fake_uploader, percentiles, report_in_scratch
+
+MODES = ("staticfiles", "route")
+
+
+def _serve(app):
+    """Start uvicorn in a thread; returns (server, base url)"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def _run_mode(base_url: str, url: str, size: int, args) -> dict:
+    import httpx
+
+    range_bytes = args.range_kb * 1024
+    latencies, probe_times, statuses, errors = [], [], Counter(), []
+    received = [0]
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def player(seed: int):
+        rng = random.Random(seed)
+        etag = None
+        with httpx.Client(base_url=base_url, timeout=600) as client:
+            for index in range(args.requests):
+                if etag and args.revalidate_every and index % args.revalidate_every == 0:
+                    headers = {"If-None-Match": etag}
+                else:
+                    start = rng.randrange(0, max(size - range_bytes, 1))
+                    headers = {"Range": f"bytes={start}-{start + range_bytes - 1}"}
+                started = time.perf_counter()
+                try:
+                    response = client.get(url, headers=headers)
+                except Exception as exc:  # noqa: BLE001
+                    errors.append(str(exc))
+                    continue
+                elapsed = time.perf_counter() - started
+                etag = etag or response.headers.get("etag")
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] += 1
+                    received[0] += len(response.content)
+
+    def probe():
+        with httpx.Client(base_url=base_url, timeout=600) as client:
+            while not done.is_set():
+                started = time.perf_counter()
+                client.get("/")
+                probe_times.append(time.perf_counter() - started)
+                time.sleep(0.02)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    threads = [threading.Thread(target=player, args=(args.seed + index,)) for index in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "throughput_mb_per_second": round(received[0] / 2**20 / elapsed, 1),
+        "request_seconds": percentiles(latencies),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "probe_latency_seconds": percentiles(probe_times),
+        "errors": errors[:5],
+    }
+
+
+def run(args) -> dict:
+    _install_fake_uploader(FakeUploader())
+
+    from fastapi.staticfiles import StaticFiles
+
+    import main
+
+    main.app.mount("/bench/static", StaticFiles(directory="uploads"), name="bench-static")
+    path = Path("uploads") / "bench-media.mp4"
+    block = os.urandom(2**20)
+    with path.open("wb") as handle:
+        for _ in range(args.size_mb):
+            handle.write(block)
+    size = path.stat().st_size
+
+    urls = {"staticfiles": f"/bench/static/{path.name}", "route": f"/uploads/{path.name}"}
+    server, base_url = _serve(main.app)
+    try:
+        results = {mode: _run_mode(base_url, urls[mode], size, args) for mode in args.modes}
+    finally:
+        server.should_exit = True
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+        "modes": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16, help="concurrent players")
+    parser.add_argument("--requests", type=int, default=200, help="requests per player")
+    parser.add_argument("--size-mb", type=int, default=256, help="size of the served video")
+    parser.add_argument("--range-kb", type=int, default=1024, help="bytes per Range read")
+    parser.add_argument("--revalidate-every", type=int, default=10, help="send If-None-Match every N requests (0: never)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default=None, help="also write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    output = Path(args.output).resolve() if args.output else None
+    # Only media reads are measured; nothing is dispatched or transcoded
+    os.environ.update(BROWSER_POOL_ENABLED="0", DISPATCH_IN_API="0", TRANSCODE_ENABLED="0")
+    return report_in_scratch(run, args, "bench-media-", output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""List endpoint benchmark: SQL statements and latency as the library grows.
+
+    python bench_queries.py --videos 50000 --schedules 200000 --steps 4
+
+Grows the database in ``--steps`` equal increments up to ``--videos`` videos
+and ``--schedules`` schedules (spread over the next year). After each step it
+calls the list endpoints the dashboard uses and records the SQL statements
+each request ran (from the per-request metric) and its latency. Flat
+statement counts across steps are the point; a lazy-loading regression shows
+up as counts that grow with the row count.
+
+``legacy_videos_lazy`` replays the pre-eager-loading ``GET /videos`` loop
+(``v.schedules`` per row) over the first ``--legacy-rows`` videos, for
+comparison.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from loadsim import FakeUploader, _install_fake_uploader, report_in_scratch
+
+
+def _grow(db, videos: int, schedules: int, now: datetime, rng: random.Random) -> None:
+    """Bulk-insert ``videos`` videos and ``schedules`` schedules pointing at any video so far"""
+    from sqlalchemy import func, insert
+
+    from models import ScheduledUpload, Video
+
+    first = (db.query(func.max(Video.id)).scalar() or 0) + 1
+    rows = [
+        {
+            "original_filename": f"bench-{index}.mp4",
+            "stored_filename": f"bench-{index}.mp4",
+            "file_path": f"uploads/bench-{index}.mp4",
+            "description": f"Benchmark video {index}",
+            "file_size": 0,
+        }
+        for index in range(first, first + videos)
+    ]
+    for start in range(0, len(rows), 10000):
+        db.execute(insert(Video), rows[start:start + 10000])
+    last = first + videos - 1
+
+    rows = [
+        {
+            "video_id": rng.randint(1, last),
+            "scheduled_time": now + timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+            "description": "Benchmark",
+            "status": "pending" if rng.random() < 0.8 else "completed",
+        }
+        for _ in range(schedules)
+    ]
+    for start in range(0, len(rows), 10000):
+        db.execute(insert(ScheduledUpload), rows[start:start + 10000])
+    db.commit()
+
+
+def _measure(client, route: str, path: str, params: dict | None = None) -> dict:
+    """Statements and latency of one request, counted by MetricsMiddleware"""
+    from metrics import db_queries_per_request
+
+    count_before, queries_before = db_queries_per_request.totals().get((route,), (0, 0))
+    started = time.perf_counter()
+    response = client.get(path, params=params)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    count, queries = db_queries_per_request.totals()[(route,)]
+    assert count == count_before + 1
+    return {"queries": int(queries - queries_before), "seconds": round(elapsed, 3), "rows": len(response.json())}
+
+
+def _legacy_videos_lazy(limit: int) -> dict:
+    """The old GET /videos: one SELECT for the page plus one per video for its schedules"""
+    from database import SessionLocal
+    from metrics import db_queries_total
+    from models import Video
+
+    db = SessionLocal()
+    try:
+        before = db_queries_total.value()
+        started = time.perf_counter()
+        videos = db.query(Video).order_by(Video.id).limit(limit).all()
+        scheduled = [bool(video.schedules) for video in videos]
+        elapsed = time.perf_counter() - started
+        return {"queries": db_queries_total.value() - before, "seconds": round(elapsed, 3), "rows": len(scheduled)}
+    finally:
+        db.close()
+
+
+def run(args) -> dict:
+    _install_fake_uploader(FakeUploader())
+
+    from fastapi.testclient import TestClient
+
+    import main
+    from database import SessionLocal
+
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    month = {"from": now.isoformat(), "to": (now + timedelta(days=31)).isoformat()}
+    steps = []
+    with TestClient(main.app) as client:
+        for step in range(1, args.steps + 1):
+            db = SessionLocal()
+            try:
+                _grow(db, args.videos // args.steps, args.schedules // args.steps, now, rng)
+            finally:
+                db.close()
+
+            endpoints = {
+                "GET /videos": _measure(client, "/videos", "/videos"),
+                "GET /videos?limit=100": _measure(client, "/videos", "/videos", {"limit": 100}),
+                "GET /schedules?limit=100": _measure(client, "/schedules", "/schedules", {"limit": 100}),
+                "GET /schedules?from&to (31 days)": _measure(client, "/schedules", "/schedules", month),
+            }
+            if not args.skip_full_schedules:
+                endpoints["GET /schedules"] = _measure(client, "/schedules", "/schedules")
+            endpoints["legacy_videos_lazy"] = _legacy_videos_lazy(args.legacy_rows)
+            steps.append(
+                {
+                    "videos": step * (args.videos // args.steps),
+                    "schedules": step * (args.schedules // args.steps),
+                    "endpoints": endpoints,
+                }
+            )
+
+    constant = {
+        name: len({step["endpoints"][name]["queries"] for step in steps}) == 1
+        for name in steps[0]["endpoints"]
+        if name != "legacy_videos_lazy"
+    }
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+        "steps": steps,
+        "query_count_constant": constant,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=50000)
+    parser.add_argument("--schedules", type=int, default=200000)
+    parser.add_argument("--steps", type=int, default=4, help="measure after each of this many equal increments")
+    parser.add_argument("--legacy-rows", type=int, default=1000, help="videos the lazy-loading replay touches")
+    parser.add_argument("--skip-full-schedules", action="store_true", help="don't time the unpaginated GET /schedules")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default=None, help="also write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    output = Path(args.output).resolve() if args.output else None
+    # Only the read path is measured; nothing is dispatched or transcoded
+    os.environ.update(BROWSER_POOL_ENABLED="0", DISPATCH_IN_API="0", TRANSCODE_ENABLED="0")
+    return report_in_scratch(run, args, "bench-queries-", output)
+
+
+if __name__ == "__main__":
+    main()
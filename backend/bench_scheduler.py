@@ -0,0 +1,175 @@
+"""Scheduler benchmark: dispatch lateness and idle DB load with a large backlog.
+
+    python bench_scheduler.py --pending 100000 --probes 200 --spread 30 --idle 60
+    python bench_scheduler.py --mode poll --poll-seconds 60    # the old polling loop
+
+Seeds ``--pending`` schedules due days from now (the backlog the scheduler
+has to carry) plus ``--probes`` schedules due over the next ``--spread``
+seconds. Uploads are recorded instead of run. Reports how late each probe was
+handed to the upload pool, how long the initial load took, and how many SQL
+statements the scheduler issued over ``--idle`` seconds with nothing due.
+
+``--mode heap`` runs the real scheduler thread; ``--mode poll`` replays the
+pre-heap loop (a due-row query every ``--poll-seconds``) for comparison.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from loadsim import FakeUploader, _install_fake_uploader, percentiles, report_in_scratch
+
+
+def _seed(args, now: datetime) -> dict:
+    """Bulk-insert the backlog and the probes; returns {probe id: scheduled_time}"""
+    from sqlalchemy import insert
+
+    from database import SessionLocal
+    from models import ScheduledUpload, Video
+
+    db = SessionLocal()
+    try:
+        video = Video(original_filename="bench.mp4", stored_filename="bench.mp4", file_path="bench.mp4", file_size=0)
+        db.add(video)
+        db.flush()
+        backlog = [
+            {
+                "video_id": video.id,
+                "scheduled_time": now + timedelta(days=2, seconds=index),
+                "description": "backlog",
+                "status": "pending",
+            }
+            for index in range(args.pending)
+        ]
+        for start in range(0, len(backlog), 10000):
+            db.execute(insert(ScheduledUpload), backlog[start:start + 10000])
+
+        first = now + timedelta(seconds=args.lead)
+        step = args.spread / max(args.probes - 1, 1)
+        probes = [
+            ScheduledUpload(
+                video_id=video.id,
+                scheduled_time=first + timedelta(seconds=index * step),
+                description="probe",
+                status="pending",
+            )
+            for index in range(args.probes)
+        ]
+        db.add_all(probes)
+        db.commit()
+        return {probe.id: probe.scheduled_time for probe in probes}
+    finally:
+        db.close()
+
+
+def _legacy_poll(args, dispatched: dict, stop: threading.Event) -> None:
+    """The loop the deadline heap replaced: query for due rows every poll interval"""
+    from database import SessionLocal
+    from models import ScheduledUpload
+
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            due = (
+                db.query(ScheduledUpload)
+                .filter(ScheduledUpload.status == "pending", ScheduledUpload.scheduled_time <= datetime.now())
+                .all()
+            )
+            for schedule in due:
+                schedule.status = "uploading"
+            due_ids = [schedule.id for schedule in due]
+            db.commit()
+        finally:
+            db.close()
+        for schedule_id in due_ids:
+            dispatched.setdefault(schedule_id, datetime.now())
+        stop.wait(args.poll_seconds)
+
+
+def run(args) -> dict:
+    _install_fake_uploader(FakeUploader())
+
+    import scheduler
+    from database import init_db
+    from metrics import db_queries_total
+
+    init_db()
+
+    dispatched = {}
+
+    def record(schedule_id, scheduled_time=None, account=None):
+        dispatched.setdefault(schedule_id, datetime.now())
+
+    scheduler.upload_pool.submit = record
+
+    seeded_at = time.perf_counter()
+    probes = _seed(args, datetime.now())
+    seed_seconds = time.perf_counter() - seeded_at
+
+    stop = threading.Event()
+    started = time.perf_counter()
+    load_seconds = None
+    if args.mode == "heap":
+        scheduler.start_scheduler_thread()
+        while len(scheduler.deadline_queue) < len(probes) + args.pending:
+            time.sleep(0.01)
+        load_seconds = time.perf_counter() - started
+    else:
+        threading.Thread(target=_legacy_poll, args=(args, dispatched, stop), daemon=True).start()
+
+    deadline = max(probes.values()) + timedelta(seconds=args.poll_seconds + 30)
+    while not probes.keys() <= dispatched.keys() and datetime.now() < deadline:
+        time.sleep(0.05)
+    lateness = [(dispatched[i] - when).total_seconds() for i, when in probes.items() if i in dispatched]
+
+    # Nothing else is due for two days: whatever runs now is pure idle overhead
+    queries_before = db_queries_total.value()
+    time.sleep(args.idle)
+    idle_queries = db_queries_total.value() - queries_before
+    stop.set()
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+        "seed_seconds": round(seed_seconds, 2),
+        "initial_load_seconds": round(load_seconds, 3) if load_seconds is not None else None,
+        "dispatched": f"{len(lateness)}/{len(probes)}",
+        "dispatch_lateness_seconds": percentiles(lateness),
+        "idle_queries": idle_queries,
+        "idle_queries_per_minute": round(idle_queries / args.idle * 60, 2) if args.idle else None,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("heap", "poll"), default="heap")
+    parser.add_argument("--pending", type=int, default=100000, help="backlog due days from now")
+    parser.add_argument("--probes", type=int, default=200, help="schedules due during the run")
+    parser.add_argument("--lead", type=float, default=5, help="seconds before the first probe is due")
+    parser.add_argument("--spread", type=float, default=30, help="probes are due evenly over this many seconds")
+    parser.add_argument("--idle", type=float, default=60, help="seconds of idle time to count queries over")
+    parser.add_argument("--poll-seconds", type=float, default=60, help="poll interval for --mode poll")
+    parser.add_argument("--workdir", default=None, help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default=None, help="also write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    output = Path(args.output).resolve() if args.output else None
+    # Measure the scheduler alone: no rate limit, no browser pool, no leader lease
+    os.environ.update(
+        BROWSER_POOL_ENABLED="0",
+        DISPATCH_IN_API="1",
+        UPLOAD_POSTS_PER_HOUR="0",
+        UPLOAD_MIN_SPACING_SECONDS="0",
+    )
+    os.environ.setdefault("LEADER_ELECTION", "0")
+    return report_in_scratch(run, args, "bench-scheduler-", output)
+
+
+if __name__ == "__main__":
+    main()
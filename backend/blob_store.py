@@ -0,0 +1,115 @@
+"""Content-addressed, reference-counted storage for uploaded video files"""
+from __future__ import annotations
+
+import os
+import uuid
+from pathlib import Path
+
+from sqlalchemy.exc import IntegrityError
+
+from models import VideoBlob
+
+
+class BlobStore:
+    """Stores each distinct file once as ``<sha256><ext>`` under ``directory``.
+
+    Methods take the caller's session and never commit, so the reference count
+    changes in the same transaction as the ``Video`` row that owns them.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def exists(self, db, sha256: str) -> bool:
+        return db.get(VideoBlob, sha256) is not None
+
+    def read_range(self, db, sha256: str, offset: int, length: int) -> bytes | None:
+        """``length`` bytes of stored content from ``offset``; None if it isn't stored"""
+        blob = db.get(VideoBlob, sha256)
+        if blob is None:
+            return None
+        try:
+            with open(blob.file_path, "rb") as handle:
+                handle.seek(offset)
+                return handle.read(length)
+        except FileNotFoundError:
+            return None
+
+    def add_reference(self, db, sha256: str) -> VideoBlob | None:
+        """Bump the count on an existing blob; None if there is no such blob"""
+        updated = (
+            db.query(VideoBlob)
+            .filter(VideoBlob.sha256 == sha256)
+            .update({VideoBlob.ref_count: VideoBlob.ref_count + 1}, synchronize_session=False)
+        )
+        if not updated:
+            return None
+        blob = db.get(VideoBlob, sha256)
+        db.refresh(blob)
+        return blob
+
+    def adopt(self, db, sha256: str, suffix: str, temp_path: Path) -> tuple[VideoBlob, bool]:
+        """Take ownership of a freshly written file.
+
+        Returns ``(blob, deduplicated)``; when the content is already stored the
+        temp file is dropped and the existing blob gains a reference.
+        """
+        blob = self.add_reference(db, sha256)
+        if blob is not None:
+            temp_path.unlink(missing_ok=True)
+            return blob, True
+
+        blob_path = self.directory / f"{sha256}{suffix.lower()}"
+        os.replace(temp_path, blob_path)
+        blob = VideoBlob(
+            sha256=sha256,
+            file_path=str(blob_path),
+            file_size=os.path.getsize(blob_path),
+            ref_count=1,
+        )
+        try:
+            with db.begin_nested():
+                db.add(blob)
+        except IntegrityError:
+            # Same content finished uploading concurrently; share theirs
+            if Path(db.get(VideoBlob, sha256).file_path) != blob_path:
+                blob_path.unlink(missing_ok=True)
+            return self.add_reference(db, sha256), True
+        return blob, False
+
+    def release(self, db, sha256: str) -> Path | None:
+        """Drop one reference; returns the file to unlink once the caller commits.
+
+        The last reference moves the file aside at once, while this
+        transaction holds the write lock. An upload of the same content that
+        commits after us then stores a fresh file under the blob's name
+        rather than having it unlinked from under it. If the commit fails,
+        ``restore`` puts the file back.
+        """
+        (
+            db.query(VideoBlob)
+            .filter(VideoBlob.sha256 == sha256)
+            .update({VideoBlob.ref_count: VideoBlob.ref_count - 1}, synchronize_session=False)
+        )
+        blob = db.get(VideoBlob, sha256)
+        if blob is None:
+            return None
+        db.refresh(blob)
+        if blob.ref_count > 0:
+            return None
+        db.delete(blob)
+        path = Path(blob.file_path)
+        doomed = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.deleted")
+        try:
+            os.replace(path, doomed)
+        except FileNotFoundError:
+            return None
+        return doomed
+
+    @staticmethod
+    def restore(doomed: Path) -> None:
+        """Undo ``release`` moving a file aside, after a rolled-back delete"""
+        original = doomed.with_name(doomed.name.rsplit(".", 2)[0])
+        if not original.exists():
+            os.replace(doomed, original)
@@ -0,0 +1,146 @@
+"""Warm pool of authenticated Selenium sessions, keyed by cookie file"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+BROWSER_POOL_ENABLED = os.getenv("BROWSER_POOL_ENABLED", "1") == "1"
+# Recycle a browser after this many uploads to cap memory growth / stale state
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "20"))
+# Quit browsers idle for longer than this
+BROWSER_IDLE_SECONDS = int(os.getenv("BROWSER_IDLE_SECONDS", "1800"))
+
+
+def default_browser_factory(cookies_path: str, headless: bool):
+    """Start Chrome and load the account's cookies once"""
+    from tiktok_uploader.auth import AuthBackend
+    from tiktok_uploader.browsers import get_browser
+
+    driver = get_browser(name="chrome", headless=headless)
+    return AuthBackend(cookies=cookies_path).authenticate_agent(driver)
+
+
+class BrowserSession:
+    def __init__(self, driver, key):
+        self.driver = driver
+        self.key = key
+        self.uses = 0
+        self.failed = False
+        self.last_used = time.monotonic()
+
+    def mark_failed(self) -> None:
+        """Recycle instead of returning to the pool (TikTok error, stuck page, ...)"""
+        self.failed = True
+
+    def is_healthy(self) -> bool:
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:  # noqa: BLE001
+            return False
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except Exception:  # noqa: BLE001
+            pass
+
+
+class BrowserPool:
+    """Leases warm browser sessions to upload workers.
+
+    ``factory(cookies_path, headless)`` builds a logged-in WebDriver; tests can
+    pass one returning a stub driver.
+    """
+
+    def __init__(
+        self,
+        factory=default_browser_factory,
+        max_uses: int = BROWSER_MAX_USES,
+        idle_seconds: int = BROWSER_IDLE_SECONDS,
+    ):
+        self.factory = factory
+        self.max_uses = max(max_uses, 1)
+        self.idle_seconds = idle_seconds
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "recycled": 0, "leased": 0}
+
+    @contextmanager
+    def lease(self, cookies_path: str, headless: bool = False):
+        """Yield a healthy ``BrowserSession``; it returns to the pool unless it failed"""
+        key = (cookies_path, headless)
+        with self._lock:
+            self._stats["leased"] += 1
+        session = self._acquire(key)
+        try:
+            yield session
+        except BaseException:
+            session.mark_failed()
+            raise
+        finally:
+            self._release(session)
+
+    def _acquire(self, key) -> BrowserSession:
+        while True:
+            with self._lock:
+                session = self._idle[key].pop() if self._idle[key] else None
+            if session is None:
+                break
+            if session.is_healthy():
+                with self._lock:
+                    self._stats["reused"] += 1
+                return session
+            self._recycle(session)
+
+        driver = self.factory(*key)
+        with self._lock:
+            self._stats["created"] += 1
+        return BrowserSession(driver, key)
+
+    def _release(self, session: BrowserSession) -> None:
+        session.uses += 1
+        session.last_used = time.monotonic()
+        if session.failed or session.uses >= self.max_uses:
+            self._recycle(session)
+            return
+        with self._lock:
+            self._idle[session.key].append(session)
+        self.evict_idle()
+
+    def _recycle(self, session: BrowserSession) -> None:
+        with self._lock:
+            self._stats["recycled"] += 1
+        session.quit()
+
+    def evict_idle(self) -> None:
+        """Quit sessions that have sat unused past ``idle_seconds``"""
+        cutoff = time.monotonic() - self.idle_seconds
+        expired = []
+        with self._lock:
+            for key, sessions in self._idle.items():
+                expired.extend(s for s in sessions if s.last_used < cutoff)
+                sessions[:] = [s for s in sessions if s.last_used >= cutoff]
+        for session in expired:
+            self._recycle(session)
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = [s for idle in self._idle.values() for s in idle]
+            self._idle.clear()
+        for session in sessions:
+            self._recycle(session)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "idle": sum(len(sessions) for sessions in self._idle.values()),
+                "enabled": BROWSER_POOL_ENABLED,
+            }
+
+
+browser_pool = BrowserPool()
@@ -0,0 +1,144 @@
+"""Monotonic change counter for schedules - backs ETags, the /schedules/changes feed and the event relay"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+from sqlalchemy import event, inspect, select, update
+
+from database import SessionLocal
+from events import event_bus, schedule_event
+from models import ChangeCounter, RecurrenceRule, ScheduledUpload
+
+SCHEDULES = "schedules"
+# Counter value at the last hard delete; older cursors can't see the removal and must refetch
+SCHEDULES_PURGED = "schedules_purged"
+# How often the API checks for rows changed by other processes while SSE clients are connected
+EVENT_RELAY_SECONDS = float(os.getenv("EVENT_RELAY_SECONDS", "2"))
+# More changed rows than this in one pass are sent as a single resync
+EVENT_RELAY_MAX_EVENTS = 100
+
+
+def next_change_seq(connection, name: str = SCHEDULES) -> int:
+    """Bump a counter inside the caller's transaction and return the new value"""
+    bumped = connection.execute(
+        update(ChangeCounter)
+        .where(ChangeCounter.name == name)
+        .values(value=ChangeCounter.value + 1)
+    )
+    if not bumped.rowcount:
+        connection.execute(ChangeCounter.__table__.insert().values(name=name, value=1))
+    return connection.execute(
+        select(ChangeCounter.value).where(ChangeCounter.name == name)
+    ).scalar_one()
+
+
+def current_change_seq(db, name: str = SCHEDULES) -> int:
+    value = db.execute(select(ChangeCounter.value).where(ChangeCounter.name == name)).scalar()
+    return value or 0
+
+
+def record_purge(db) -> None:
+    """Call before hard-deleting schedules so stale cursors are told to reset"""
+    connection = db.connection()
+    seq = next_change_seq(connection)
+    purged = connection.execute(
+        update(ChangeCounter)
+        .where(ChangeCounter.name == SCHEDULES_PURGED)
+        .values(value=seq)
+    )
+    if not purged.rowcount:
+        connection.execute(
+            ChangeCounter.__table__.insert().values(name=SCHEDULES_PURGED, value=seq)
+        )
+
+
+@event.listens_for(ScheduledUpload, "before_insert")
+def _stamp_insert(mapper, connection, target):
+    target.change_seq = next_change_seq(connection)
+
+
+@event.listens_for(ScheduledUpload, "before_update")
+def _stamp_update(mapper, connection, target):
+    target.change_seq = next_change_seq(connection)
+
+
+# Recurrence rules feed virtual occurrences into GET /schedules, so they move the counter too
+@event.listens_for(RecurrenceRule, "after_insert")
+@event.listens_for(RecurrenceRule, "after_delete")
+def _rule_changed(mapper, connection, target):
+    next_change_seq(connection)
+
+
+@event.listens_for(RecurrenceRule, "after_update")
+def _rule_updated(mapper, connection, target):
+    # Advancing materialized_until only swaps virtual occurrences for real rows
+    state = inspect(target)
+    if any(
+        state.attrs[column.key].history.has_changes()
+        for column in mapper.column_attrs
+        if column.key != "materialized_until"
+    ):
+        next_change_seq(connection)
+
+
+class ChangeRelay:
+    """Publishes schedule changes made by other processes on this process's event bus.
+
+    Celery workers, ``cli.py scheduler`` and ``manual_upload.py`` publish on
+    their own in-process bus, which no dashboard is subscribed to. While this
+    process has subscribers, the relay follows the change feed and publishes
+    ``schedule.status`` for each changed row whose change wasn't already
+    announced here. With no subscribers it runs no queries.
+    """
+
+    def __init__(self, bus=event_bus, poll_seconds: float = EVENT_RELAY_SECONDS):
+        self.bus = bus
+        self.poll_seconds = poll_seconds
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+
+    def run(self) -> None:
+        cursor = None
+        while True:
+            time.sleep(self.poll_seconds)
+            if not self.bus.subscriber_count():
+                # Clients fetch the full list when they connect; start from there
+                cursor = None
+                continue
+            try:
+                cursor = self.relay(cursor)
+            except Exception as exc:  # noqa: BLE001
+                print(f"[events] Relay failed: {exc}")
+
+    def relay(self, cursor: int | None) -> int:
+        """Publish rows changed after ``cursor``; returns the new cursor"""
+        db = SessionLocal()
+        try:
+            latest = current_change_seq(db)
+            if cursor is None or latest <= cursor:
+                return latest
+            rows = (
+                db.query(ScheduledUpload)
+                .filter(ScheduledUpload.change_seq > cursor, ScheduledUpload.change_seq <= latest)
+                .limit(EVENT_RELAY_MAX_EVENTS + 1)
+                .all()
+            )
+            resync = len(rows) > EVENT_RELAY_MAX_EVENTS or current_change_seq(db, SCHEDULES_PURGED) > cursor
+            events = [] if resync else [schedule_event(row) for row in rows if not self.bus.announced(row.change_seq)]
+        finally:
+            db.close()
+
+        if resync:
+            self.bus.publish("resync", {"change_seq": latest})
+        for payload in events:
+            self.bus.publish("schedule.status", payload)
+        return latest
+
+
+change_relay = ChangeRelay()
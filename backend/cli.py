@@ -0,0 +1,102 @@
+"""Run dispatch outside the API process.
+
+    python cli.py scheduler [3 5 default]   # deadline queue + upload pool (thread backend)
+                                            # or the ETA sync loop (celery backend)
+    python cli.py worker [-c 2]             # Celery worker for the upload queues
+
+Start the API with ``DISPATCH_IN_API=0`` so it only records schedules. Any
+number of schedulers may run: a leader election (``LEADER_ELECTION``, on by
+default) lets one per shard dispatch while the rest stand by.
+"""
+from __future__ import annotations
+
+import argparse
+import signal
+import sys
+
+from accounts import DISPATCH_ACCOUNTS, parse_shard
+
+
+def run_scheduler_command(args) -> None:
+    from dispatcher import DISPATCHER_BACKEND
+    from leader import LEADER_ELECTION, LeaderElection, scheduler_leader
+
+    shard = parse_shard(args.accounts or DISPATCH_ACCOUNTS)
+    if args.no_leader:
+        leader = None
+    elif DISPATCHER_BACKEND == "celery":
+        leader = LeaderElection("celery-sync") if LEADER_ELECTION else None
+    else:
+        leader = scheduler_leader(shard)
+    _release_on_exit(leader)
+
+    if DISPATCHER_BACKEND == "celery":
+        from dispatcher import CeleryDispatcher
+
+        print("🕐 Celery sync loop started" + (f" (election: {leader.name})" if leader else ""))
+        CeleryDispatcher().run_sync(leader)
+        return
+
+    from scheduler import deadline_queue, run_scheduler
+
+    deadline_queue.shard = shard
+    run_scheduler(leader)
+
+
+def run_worker_command(args) -> None:
+    from dispatcher import CELERY_QUEUE_PER_ACCOUNT, DISPATCHER_BACKEND
+
+    if DISPATCHER_BACKEND != "celery":
+        sys.exit("With the thread backend uploads run inside `cli.py scheduler`; set DISPATCHER_BACKEND=celery")
+
+    from tasks import celery_app
+
+    queues = args.queues
+    if not queues:
+        accounts = parse_shard(args.accounts or DISPATCH_ACCOUNTS)
+        if CELERY_QUEUE_PER_ACCOUNT and accounts:
+            queues = ",".join(f"uploads.{key}" for key in sorted(accounts))
+        else:
+            queues = "uploads"
+    argv = ["worker", "-Q", queues, "--loglevel=info"]
+    if args.concurrency:
+        argv += ["-c", str(args.concurrency)]
+    celery_app.worker_main(argv)
+
+
+def _release_on_exit(leader) -> None:
+    """Hand leadership over immediately on Ctrl+C / docker stop"""
+    if leader is None:
+        return
+
+    def stop(signum, frame):
+        leader.release()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="TikTok scheduler dispatch processes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scheduler = commands.add_parser("scheduler", help="dispatch due uploads")
+    scheduler.add_argument(
+        "accounts", nargs="*", help='account ids to serve ("default" for schedules without one); all if omitted'
+    )
+    scheduler.add_argument("--no-leader", action="store_true", help="skip leader election")
+    scheduler.set_defaults(run=run_scheduler_command)
+
+    worker = commands.add_parser("worker", help="Celery worker for the upload queues")
+    worker.add_argument("accounts", nargs="*", help="with CELERY_QUEUE_PER_ACCOUNT, consume only these accounts")
+    worker.add_argument("-Q", "--queues", default=None, help="comma-separated queues (overrides accounts)")
+    worker.add_argument("-c", "--concurrency", type=int, default=None)
+    worker.set_defaults(run=run_worker_command)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Description generation off the request path - batched backend calls behind an LRU cache"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import literal
+
+from ai_description import get_backend
+from database import SessionLocal
+from models import Video
+
+DESCRIPTION_BATCH_SIZE = int(os.getenv("DESCRIPTION_BATCH_SIZE", "16"))
+# How long the first job in a batch waits for company before the batch is sent
+DESCRIPTION_BATCH_WINDOW_SECONDS = float(os.getenv("DESCRIPTION_BATCH_WINDOW_SECONDS", "0.5"))
+DESCRIPTION_CACHE_SIZE = int(os.getenv("DESCRIPTION_CACHE_SIZE", "1024"))
+
+
+def placeholder_description(filename: str) -> str:
+    return f"Video: {filename}"
+
+
+class DescriptionService:
+    """Fills in ``Video.description`` asynchronously.
+
+    Results are cached on ``(content_hash, filename)`` so re-uploads of the same
+    clip under the same name never reach the backend.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        batch_size: int = DESCRIPTION_BATCH_SIZE,
+        batch_window: float = DESCRIPTION_BATCH_WINDOW_SECONDS,
+        cache_size: int = DESCRIPTION_CACHE_SIZE,
+    ):
+        self.backend = backend or get_backend()
+        self.batch_size = max(batch_size, 1)
+        self.batch_window = batch_window
+        self.cache_size = max(cache_size, 1)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._stats = {"hits": 0, "misses": 0, "batches": 0, "generated": 0}
+
+    def cached(self, content_hash: str, filename: str, count: bool = True) -> str | None:
+        key = (content_hash, filename)
+        with self._cache_lock:
+            description = self._cache.get(key)
+            if description is not None:
+                self._cache.move_to_end(key)
+            if count:
+                self._stats["hits" if description is not None else "misses"] += 1
+            return description
+
+    def _remember(self, content_hash: str, filename: str, description: str) -> None:
+        with self._cache_lock:
+            self._cache[(content_hash, filename)] = description
+            self._cache.move_to_end((content_hash, filename))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def submit(self, video_id: int, content_hash: str, filename: str, video_path: str) -> None:
+        """Queue a video whose row currently holds the placeholder description"""
+        with self._cache_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="description-jobs", daemon=True)
+                self._thread.start()
+        self._jobs.put((video_id, content_hash, filename, video_path))
+
+    def requeue_placeholders(self) -> int:
+        """Queue every video still showing the placeholder.
+
+        The job queue lives in memory, so this is what finishes the jobs a
+        restart dropped. Rows without a content hash predate the queue and are
+        left alone.
+        """
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Video.id, Video.content_hash, Video.original_filename, Video.file_path)
+                .filter(
+                    Video.content_hash.isnot(None),
+                    Video.description == literal(placeholder_description("")) + Video.original_filename,
+                )
+                .all()
+            )
+        finally:
+            db.close()
+        for row in rows:
+            self.submit(row.id, row.content_hash, row.original_filename, row.file_path)
+        if rows:
+            print(f"[descriptions] Re-queued {len(rows)} video(s) still on the placeholder")
+        return len(rows)
+
+    def stats(self) -> dict:
+        with self._cache_lock:
+            total = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "cached": len(self._cache),
+                "hit_rate": self._stats["hits"] / total if total else 0.0,
+                "queued": self._jobs.qsize(),
+            }
+
+    def _next_batch(self) -> list:
+        batch = [self._jobs.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._jobs.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                self._process(batch)
+            except Exception as exc:  # noqa: BLE001
+                print(f"[descriptions] Batch of {len(batch)} failed: {exc}")
+
+    def _process(self, batch: list) -> None:
+        # Identical (hash, filename) jobs in one batch share a single backend slot
+        pending = {}
+        for video_id, content_hash, filename, video_path in batch:
+            pending.setdefault((content_hash, filename), (video_path, []))[1].append(video_id)
+
+        results = {}
+        to_generate = []
+        for key, (video_path, _) in pending.items():
+            # Filled by an earlier batch since this job was queued
+            description = self.cached(*key, count=False)
+            if description is None:
+                to_generate.append((key, video_path))
+            else:
+                results[key] = description
+
+        if to_generate:
+            generated = self.backend.generate_batch(
+                [(filename, video_path) for (_, filename), video_path in to_generate]
+            )
+            with self._cache_lock:
+                self._stats["batches"] += 1
+                self._stats["generated"] += len(to_generate)
+            for (key, _), description in zip(to_generate, generated):
+                self._remember(*key, description)
+                results[key] = description
+
+        db = SessionLocal()
+        try:
+            for key, description in results.items():
+                _, filename = key
+                (
+                    db.query(Video)
+                    .filter(
+                        Video.id.in_(pending[key][1]),
+                        Video.description == placeholder_description(filename),
+                    )
+                    .update({Video.description: description}, synchronize_session=False)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+
+description_service = DescriptionService()
@@ -0,0 +1,326 @@
+"""Dispatcher backends: what runs an upload once it comes due.
+
+``thread`` (default) keeps the deadline heap and worker pool inside the API
+process. ``celery`` enqueues ETA tasks instead, so uploads run in Celery
+workers and never in uvicorn; with ``CELERY_EAGER=1`` the tasks run on
+in-memory timers so the whole flow works without Redis.
+
+With ``DISPATCH_IN_API=0`` the API process dispatches nothing: thread-mode
+schedules are only written to the DB, and ``python cli.py scheduler`` picks
+them up from the change feed.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_
+
+from accounts import account_key
+from database import SessionLocal
+from models import ScheduledUpload
+from rate_limit import dispatch_limiter
+from recurrence import materialize
+from leader import LeaderElection
+from scheduler import _naive, deadline_queue, start_scheduler_thread
+from upload_pool import upload_pool
+from upload_worker import recover_orphaned_uploads
+
+DISPATCHER_BACKEND = os.getenv("DISPATCHER_BACKEND", "thread")
+CELERY_EAGER = os.getenv("CELERY_EAGER", "0") == "1"
+# Only uploads due within this window get an ETA task; the periodic sync enqueues
+# the rest as they come into range (keeps ETAs short enough for Redis redelivery)
+CELERY_ETA_HORIZON_SECONDS = int(os.getenv("CELERY_ETA_HORIZON_SECONDS", "3600"))
+CELERY_SYNC_SECONDS = int(os.getenv("CELERY_SYNC_SECONDS", "300"))
+# Route each account to its own queue ("uploads.account-3") instead of "uploads"
+CELERY_QUEUE_PER_ACCOUNT = os.getenv("CELERY_QUEUE_PER_ACCOUNT", "0") == "1"
+# 0: the API only records schedules; a separate `python cli.py scheduler` dispatches them
+DISPATCH_IN_API = os.getenv("DISPATCH_IN_API", "1") == "1"
+# A pending row this far past due with a task token is assumed to have lost its task
+LOST_TASK_GRACE_SECONDS = 10 * 60
+
+
+class ThreadDispatcher:
+    """In-process scheduler thread, deadline heap and upload pool"""
+
+    name = "thread"
+
+    def start(self) -> None:
+        start_scheduler_thread()
+
+    def schedule(self, schedule_id: int, when: datetime, account_id: int | None = None) -> None:
+        deadline_queue.push(schedule_id, when, account_id)
+
+    def schedule_many(self, items) -> None:
+        """``items``: iterable of ``(schedule_id, when, account_id)``"""
+        for schedule_id, when, account_id in items:
+            deadline_queue.push(schedule_id, when, account_id)
+
+    def cancel(self, *schedule_ids: int) -> None:
+        for schedule_id in schedule_ids:
+            deadline_queue.discard(schedule_id)
+
+    def dispatch_now(self, schedule_id: int, account_id: int | None = None) -> None:
+        # An explicit "post now" skips the rate limit but still counts against it
+        account = account_key(account_id)
+        deadline_queue.discard(schedule_id)
+        dispatch_limiter.take(account, datetime.now())
+        upload_pool.submit(schedule_id, account=account)
+
+    def stats(self) -> dict:
+        return {"backend": self.name, **upload_pool.stats(), "rate_limit": dispatch_limiter.stats()}
+
+    def queue_depth(self) -> dict:
+        pool = upload_pool.stats()
+        return {"deadline": len(deadline_queue), "pool_queued": pool["queued"], "pool_running": pool["running"]}
+
+
+class ExternalDispatcher:
+    """Thread backend with dispatch running in another process (``cli.py scheduler``).
+
+    The database is the hand-off: the scheduler follows the change feed, so
+    scheduling and cancelling need nothing beyond the row writes the API
+    already makes.
+    """
+
+    name = "external"
+
+    def start(self) -> None:
+        pass
+
+    def schedule(self, schedule_id: int, when: datetime, account_id: int | None = None) -> None:
+        pass
+
+    def schedule_many(self, items) -> None:
+        pass
+
+    def cancel(self, *schedule_ids: int) -> None:
+        pass
+
+    def dispatch_now(self, schedule_id: int, account_id: int | None = None) -> None:
+        # Due immediately; the scheduler sees the change within SCHEDULER_POLL_SECONDS.
+        # Unlike in-process dispatch, the account's rate limit still applies.
+        db = SessionLocal()
+        try:
+            schedule = db.get(ScheduledUpload, schedule_id)
+            if schedule is not None and schedule.status == "pending":
+                schedule.next_attempt_at = datetime.now()
+                db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {"backend": self.name, **self.queue_depth()}
+
+    def queue_depth(self) -> dict:
+        db = SessionLocal()
+        try:
+            counts = dict(
+                db.query(ScheduledUpload.status, func.count(ScheduledUpload.id))
+                .filter(ScheduledUpload.status.in_(("pending", "uploading")))
+                .group_by(ScheduledUpload.status)
+                .all()
+            )
+        finally:
+            db.close()
+        return {"pending": counts.get("pending", 0), "uploading": counts.get("uploading", 0)}
+
+
+class CeleryDispatcher:
+    """ETA tasks on a Celery broker; the row's ``dispatch_token`` is the live task id"""
+
+    name = "celery"
+
+    def __init__(self, eager: bool = CELERY_EAGER, horizon_seconds: int = CELERY_ETA_HORIZON_SECONDS):
+        self.eager = eager
+        self.horizon = timedelta(seconds=horizon_seconds)
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        # Celery beat or `cli.py scheduler` runs sync() in production; eager mode has neither
+        if self.eager:
+            threading.Thread(target=self.run_sync, daemon=True).start()
+
+    def schedule(self, schedule_id: int, when: datetime, account_id: int | None = None) -> None:
+        self.schedule_many([(schedule_id, when, account_id)])
+
+    def schedule_many(self, items) -> None:
+        items = list(items)
+        self.cancel(*(schedule_id for schedule_id, _, _ in items))
+        cutoff = datetime.now() + self.horizon
+        # Anything further out is picked up by sync() once it is within the horizon
+        self._enqueue([item for item in items if _naive(item[1]) <= cutoff])
+
+    def cancel(self, *schedule_ids: int) -> None:
+        """Revoke the live tasks for these schedules"""
+        if not schedule_ids:
+            return
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(ScheduledUpload.id, ScheduledUpload.dispatch_token)
+                .filter(ScheduledUpload.id.in_(schedule_ids), ScheduledUpload.dispatch_token.isnot(None))
+                .all()
+            )
+            if rows:
+                (
+                    db.query(ScheduledUpload)
+                    .filter(ScheduledUpload.id.in_([row.id for row in rows]))
+                    .update({ScheduledUpload.dispatch_token: None}, synchronize_session=False)
+                )
+                db.commit()
+        finally:
+            db.close()
+        for row in rows:
+            self._revoke(row.dispatch_token)
+
+    def dispatch_now(self, schedule_id: int, account_id: int | None = None) -> None:
+        from tasks import schedule_tiktok_upload
+
+        # The task takes the rate-limit token once it knows the account has room
+        self.cancel(schedule_id)
+        if self.eager:
+            threading.Thread(target=schedule_tiktok_upload.apply, args=([schedule_id],), daemon=True).start()
+        else:
+            schedule_tiktok_upload.apply_async(args=[schedule_id], queue=queue_name(account_id))
+
+    def defer(self, schedule_id: int, when: datetime, account_id: int | None = None) -> None:
+        """Re-enqueue a schedule whose task ran but was held back by the rate limit"""
+        self._enqueue([(schedule_id, when, account_id)])
+
+    def sync(self) -> int:
+        """Periodic pass: recover leases, roll recurrences forward, enqueue uploads entering the horizon"""
+        recover_orphaned_uploads()
+        now = datetime.now()
+        due = func.coalesce(ScheduledUpload.next_attempt_at, ScheduledUpload.scheduled_time)
+        db = SessionLocal()
+        try:
+            materialize(db)
+            db.commit()
+            rows = (
+                db.query(ScheduledUpload.id, due.label("due"), ScheduledUpload.account_id)
+                .filter(
+                    ScheduledUpload.status == "pending",
+                    due <= now + self.horizon,
+                    or_(
+                        ScheduledUpload.dispatch_token.is_(None),
+                        due < now - timedelta(seconds=LOST_TASK_GRACE_SECONDS),
+                    ),
+                )
+                .all()
+            )
+        finally:
+            db.close()
+        self._enqueue([(row.id, row.due, row.account_id) for row in rows])
+        return len(rows)
+
+    def queue_depth(self) -> dict:
+        return {"enqueued": self._enqueued_count()}
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "eager": self.eager,
+            "enqueued": self._enqueued_count(),
+            "rate_limit": dispatch_limiter.stats(),
+        }
+
+    def _enqueued_count(self) -> int:
+        db = SessionLocal()
+        try:
+            return (
+                db.query(func.count(ScheduledUpload.id))
+                .filter(ScheduledUpload.status == "pending", ScheduledUpload.dispatch_token.isnot(None))
+                .scalar()
+            )
+        finally:
+            db.close()
+
+    def _enqueue(self, items) -> None:
+        from tasks import dispatch_upload
+
+        tasks = [
+            (schedule_id, _naive(when), account_id, f"upload-{schedule_id}-{uuid.uuid4().hex[:12]}")
+            for schedule_id, when, account_id in items
+        ]
+        if not tasks:
+            return
+
+        # Tokens are committed before anything is enqueued: a task only runs if its
+        # id is still the row's token, so a replaced or revoked task is a no-op
+        db = SessionLocal()
+        try:
+            for schedule_id, _, _, task_id in tasks:
+                (
+                    db.query(ScheduledUpload)
+                    .filter(ScheduledUpload.id == schedule_id)
+                    .update({ScheduledUpload.dispatch_token: task_id}, synchronize_session=False)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+        for schedule_id, when, account_id, task_id in tasks:
+            if self.eager:
+                delay = max((when - datetime.now()).total_seconds(), 0)
+                timer = threading.Timer(delay, self._run_eager, args=(dispatch_upload, schedule_id, task_id))
+                timer.daemon = True
+                with self._lock:
+                    self._timers[task_id] = timer
+                timer.start()
+            else:
+                dispatch_upload.apply_async(
+                    args=[schedule_id],
+                    eta=when.astimezone(),
+                    task_id=task_id,
+                    queue=queue_name(account_id),
+                )
+
+    def _run_eager(self, task, schedule_id: int, task_id: str) -> None:
+        with self._lock:
+            self._timers.pop(task_id, None)
+        task.apply(args=[schedule_id], task_id=task_id)
+
+    def _revoke(self, task_id: str) -> None:
+        if self.eager:
+            with self._lock:
+                timer = self._timers.pop(task_id, None)
+            if timer:
+                timer.cancel()
+            return
+        from tasks import celery_app
+
+        celery_app.control.revoke(task_id)
+
+    def run_sync(self, leader: LeaderElection | None = None) -> None:
+        """Call sync() every CELERY_SYNC_SECONDS, only while holding ``leader`` if given"""
+        last_sync = None
+        while True:
+            if leader is not None and not leader.hold():
+                last_sync = None
+            elif last_sync is None or time.monotonic() - last_sync >= CELERY_SYNC_SECONDS:
+                last_sync = time.monotonic()
+                try:
+                    self.sync()
+                except Exception as exc:  # noqa: BLE001
+                    print(f"[dispatcher] Sync failed: {exc}")
+            time.sleep(min(CELERY_SYNC_SECONDS, leader.renew_seconds) if leader else CELERY_SYNC_SECONDS)
+
+
+def queue_name(account_id: int | None) -> str:
+    return f"uploads.{account_key(account_id)}" if CELERY_QUEUE_PER_ACCOUNT else "uploads"
+
+
+def get_dispatcher():
+    if DISPATCHER_BACKEND == "celery":
+        return CeleryDispatcher()
+    if DISPATCHER_BACKEND != "thread":
+        raise ValueError(f"Unknown DISPATCHER_BACKEND: {DISPATCHER_BACKEND}")
+    return ThreadDispatcher() if DISPATCH_IN_API else ExternalDispatcher()
+
+
+dispatcher = get_dispatcher()
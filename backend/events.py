@@ -0,0 +1,117 @@
+"""In-process pub/sub bus for schedule status events"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import defaultdict, deque
+
+# Events buffered per subscriber before it is considered too slow to keep up
+SUBSCRIBER_QUEUE_SIZE = 256
+# Change-feed positions of recently published events, so the relay doesn't repeat them
+ANNOUNCED_SEQS = 4096
+
+
+class Subscription:
+    """One async consumer's queue; iterate with ``await sub.get()``"""
+
+    def __init__(self, bus: "EventBus", loop: asyncio.AbstractEventLoop, maxsize: int):
+        self._bus = bus
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def _deliver(self, event: dict) -> None:
+        # Runs on the subscriber's loop. A full queue means the client is too far
+        # behind; drop its backlog and ask it to resync instead of blocking the bus.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": "resync"}
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+
+class EventBus:
+    """Thread-safe fan-out from publisher threads to asyncio subscribers.
+
+    Publishers (upload workers, request handlers) never block: each publish
+    schedules a single callback per subscriber event loop, which then fans out
+    to that loop's queues.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._by_loop = defaultdict(list)
+        self._lock = threading.Lock()
+        self._announced = deque()
+        self._announced_set = set()
+
+    def subscribe(self) -> Subscription:
+        """Must be called from inside the subscriber's running event loop"""
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(self, loop, self.queue_size)
+        with self._lock:
+            self._by_loop[loop].append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._by_loop.get(subscription.loop, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._by_loop.pop(subscription.loop, None)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._by_loop.values())
+
+    def announced(self, change_seq: int) -> bool:
+        """Whether an event carrying this change-feed position was published here"""
+        with self._lock:
+            return change_seq in self._announced_set
+
+    def publish(self, event_type: str, payload: dict) -> None:
+        event = {"type": event_type, **payload}
+        change_seq = payload.get("change_seq")
+        with self._lock:
+            if change_seq is not None and change_seq not in self._announced_set:
+                self._announced.append(change_seq)
+                self._announced_set.add(change_seq)
+                if len(self._announced) > ANNOUNCED_SEQS:
+                    self._announced_set.discard(self._announced.popleft())
+            targets = [(loop, list(subscribers)) for loop, subscribers in self._by_loop.items()]
+        for loop, subscribers in targets:
+            try:
+                loop.call_soon_threadsafe(_fan_out, subscribers, event)
+            except RuntimeError:
+                # Loop already closed; its subscribers are gone
+                pass
+
+
+def _fan_out(subscribers, event: dict) -> None:
+    for subscription in subscribers:
+        subscription._deliver(event)
+
+
+def schedule_event(schedule) -> dict:
+    """Payload for a ScheduledUpload row"""
+    return {
+        "id": schedule.id,
+        "video_id": schedule.video_id,
+        "account_id": schedule.account_id,
+        "status": schedule.status,
+        "scheduled_time": schedule.scheduled_time.isoformat() if schedule.scheduled_time else None,
+        "uploaded_at": schedule.uploaded_at.isoformat() if schedule.uploaded_at else None,
+        "error_message": schedule.error_message,
+        "attempt_count": schedule.attempt_count or 0,
+        "next_attempt_at": schedule.next_attempt_at.isoformat() if schedule.next_attempt_at else None,
+        "change_seq": schedule.change_seq,
+    }
+
+
+event_bus = EventBus()
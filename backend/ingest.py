@@ -0,0 +1,200 @@
+"""Streaming video ingest - fixed-size chunk writes off the event loop, hashed as they land"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator
+
+from starlette.concurrency import run_in_threadpool
+
+CHUNK_SIZE = 1024 * 1024
+ALLOWED_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv')
+# Chunked uploads untouched for this long are abandoned and their partial data removed
+CHUNKED_UPLOAD_TTL_SECONDS = int(os.getenv("CHUNKED_UPLOAD_TTL_HOURS", "24")) * 3600
+# How often create() checks for abandoned uploads
+SWEEP_INTERVAL_SECONDS = 3600
+# Bytes of already-stored content a client must send back to skip the transfer
+PROOF_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """A streamed body went past the size it was allowed"""
+
+
+def _write_chunk(handle, hasher, chunk: bytes) -> None:
+    # hashlib releases the GIL for large buffers, so this runs truly off-loop
+    handle.write(chunk)
+    hasher.update(chunk)
+
+
+def _hash_file(path: Path) -> "hashlib._Hash":
+    hasher = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher
+
+
+async def iter_upload_file(file) -> AsyncIterator[bytes]:
+    """Read a FastAPI ``UploadFile`` in ``CHUNK_SIZE`` pieces"""
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
+
+
+async def rechunk(stream: AsyncIterator[bytes], size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Coalesce arbitrarily sized body pieces into fixed-size chunks"""
+    buffer = bytearray()
+    async for piece in stream:
+        buffer.extend(piece)
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+async def stream_to_file(
+    chunks: AsyncIterator[bytes], path: Path, hasher=None, append: bool = False, max_bytes: int | None = None
+) -> int:
+    """Write chunks to ``path`` in a worker thread, updating ``hasher`` as they go.
+
+    Returns the number of bytes written. Raises ``UploadTooLarge`` before
+    writing the chunk that would take it past ``max_bytes``.
+    """
+    hasher = hasher if hasher is not None else hashlib.sha256()
+    handle = await run_in_threadpool(open, path, "ab" if append else "wb")
+    written = 0
+    try:
+        async for chunk in chunks:
+            if max_bytes is not None and written + len(chunk) > max_bytes:
+                raise UploadTooLarge(f"more than {max_bytes} bytes")
+            await run_in_threadpool(_write_chunk, handle, hasher, chunk)
+            written += len(chunk)
+    finally:
+        await run_in_threadpool(handle.close)
+    return written
+
+
+class ChunkedUploadStore:
+    """Resumable uploads: init -> PUT chunk at offset -> finalize.
+
+    Partial data lives in ``<dir>/<upload_id>.part`` with a JSON sidecar, so a
+    dropped connection (or a server restart) resumes from the bytes on disk.
+    Uploads idle for CHUNKED_UPLOAD_TTL_SECONDS are swept away.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._hashers = {}  # upload_id -> (hasher, offset it covers)
+        self._locks = {}
+        self._swept_at = None
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.json"
+
+    def create(self, filename: str, total_size: int, proof: dict | None = None) -> dict:
+        """Start an upload; ``proof`` (see ``take_proof``) offers a shortcut for stored content"""
+        if self._swept_at is None or time.monotonic() - self._swept_at >= SWEEP_INTERVAL_SECONDS:
+            self.sweep()
+        upload_id = uuid.uuid4().hex
+        meta = {"upload_id": upload_id, "filename": filename, "total_size": total_size}
+        if proof:
+            meta["proof"] = proof
+        self._meta_path(upload_id).write_text(json.dumps(meta))
+        self._part_path(upload_id).touch()
+        self._hashers[upload_id] = (hashlib.sha256(), 0)
+        return {**meta, "received": 0, "chunk_size": CHUNK_SIZE}
+
+    def get(self, upload_id: str) -> dict | None:
+        # upload_id comes from the URL; only accept ids this store could have made
+        if not upload_id.isalnum():
+            return None
+        meta_path = self._meta_path(upload_id)
+        if not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text())
+        meta["received"] = self._part_path(upload_id).stat().st_size
+        meta["chunk_size"] = CHUNK_SIZE
+        return meta
+
+    def take_proof(self, upload_id: str) -> dict | None:
+        """Remove and return the upload's proof challenge: one attempt per upload"""
+        meta_path = self._meta_path(upload_id)
+        meta = json.loads(meta_path.read_text())
+        proof = meta.pop("proof", None)
+        if proof is not None:
+            meta_path.write_text(json.dumps(meta))
+        return proof
+
+    def lock(self, upload_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(upload_id, asyncio.Lock())
+
+    async def _hasher_at(self, upload_id: str, offset: int):
+        hasher, covered = self._hashers.get(upload_id, (None, -1))
+        if hasher is None or covered != offset:
+            # Restarted process or interrupted write: rebuild from what is on disk
+            hasher = await run_in_threadpool(_hash_file, self._part_path(upload_id))
+        return hasher
+
+    async def append(
+        self, upload_id: str, offset: int, chunks: AsyncIterator[bytes], max_bytes: int | None = None
+    ) -> int:
+        """Append a chunk stream at ``offset`` (must equal bytes received so far).
+
+        A stream longer than ``max_bytes`` raises ``UploadTooLarge`` and leaves
+        the upload as it was before the call.
+        """
+        hasher = await self._hasher_at(upload_id, offset)
+        self._hashers.pop(upload_id, None)
+        part_path = self._part_path(upload_id)
+        try:
+            written = await stream_to_file(chunks, part_path, hasher, append=True, max_bytes=max_bytes)
+        except UploadTooLarge:
+            await run_in_threadpool(os.truncate, part_path, offset)
+            raise
+        self._hashers[upload_id] = (hasher, offset + written)
+        return offset + written
+
+    async def finalize(self, upload_id: str, destination: Path) -> str:
+        """Move the completed upload to ``destination`` and return its SHA-256 hex digest"""
+        size = self._part_path(upload_id).stat().st_size
+        hasher = await self._hasher_at(upload_id, size)
+        await run_in_threadpool(os.replace, self._part_path(upload_id), destination)
+        self.discard(upload_id)
+        return hasher.hexdigest()
+
+    def sweep(self, max_age_seconds: int = CHUNKED_UPLOAD_TTL_SECONDS) -> int:
+        """Remove abandoned uploads, plus temp files left by interrupted ingests"""
+        self._swept_at = time.monotonic()
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for path in self.directory.iterdir():
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            if path.suffix == ".part":
+                # The sidecar is written once at create, so only the data file shows activity
+                self.discard(path.stem)
+                removed += 1
+            elif path.suffix == ".upload" or (path.suffix == ".json" and not self._part_path(path.stem).exists()):
+                path.unlink(missing_ok=True)
+        if removed:
+            print(f"[ingest] Removed {removed} abandoned chunked upload(s)")
+        return removed
+
+    def discard(self, upload_id: str) -> None:
+        self._part_path(upload_id).unlink(missing_ok=True)
+        self._meta_path(upload_id).unlink(missing_ok=True)
+        self._hashers.pop(upload_id, None)
+        self._locks.pop(upload_id, None)
@@ -0,0 +1,106 @@
+"""Leader election over a database lease, so one scheduler fires per shard"""
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import LeaderLease
+from upload_worker import WORKER_ID
+
+LEADER_ELECTION = os.getenv("LEADER_ELECTION", "1") == "1"
+# A leader that stops renewing for this long is replaced
+LEADER_LEASE_SECONDS = int(os.getenv("LEADER_LEASE_SECONDS", "30"))
+
+
+class LeaderElection:
+    """Call ``hold()`` before leader-only work; it is True while this process leads.
+
+    Leadership is one ``leader_leases`` row per name. It is taken with a
+    conditional UPDATE (or the first INSERT), the same pattern as upload leases.
+    The leader renews every third of the lease, so a dead one is replaced within
+    LEADER_LEASE_SECONDS.
+    """
+
+    def __init__(self, name: str, owner: str = WORKER_ID, lease_seconds: int = LEADER_LEASE_SECONDS):
+        self.name = name
+        self.owner = owner
+        self.lease = timedelta(seconds=lease_seconds)
+        self.renew_seconds = max(lease_seconds / 3, 1)
+        self._renewed_at = None  # monotonic time of the last successful renewal
+
+    @classmethod
+    def for_shard(cls, shard) -> "LeaderElection":
+        """One leader per shard, so differently-sharded schedulers don't block each other"""
+        return cls(f"scheduler:{','.join(sorted(shard))}" if shard else "scheduler")
+
+    def hold(self) -> bool:
+        """Take or renew the lease; False means another process leads"""
+        if self._renewed_at is not None and time.monotonic() - self._renewed_at < self.renew_seconds:
+            return True
+
+        attempted_at = time.monotonic()
+        now = datetime.now()
+        db = SessionLocal()
+        try:
+            taken = (
+                db.query(LeaderLease)
+                .filter(
+                    LeaderLease.name == self.name,
+                    or_(LeaderLease.owner == self.owner, LeaderLease.expires_at < now),
+                )
+                .update(
+                    {LeaderLease.owner: self.owner, LeaderLease.expires_at: now + self.lease},
+                    synchronize_session=False,
+                )
+            )
+            if not taken:
+                db.add(LeaderLease(name=self.name, owner=self.owner, expires_at=now + self.lease))
+            db.commit()
+        except IntegrityError:
+            # The row exists and someone else holds it
+            db.rollback()
+            return self._lost()
+        except Exception as exc:  # noqa: BLE001
+            # Can't prove we still lead, so stop acting as leader
+            db.rollback()
+            print(f"[leader] {self.name}: renewal failed: {exc}")
+            return self._lost()
+        finally:
+            db.close()
+
+        if self._renewed_at is None:
+            print(f"[leader] {self.name}: now led by {self.owner}")
+        self._renewed_at = attempted_at
+        return True
+
+    def release(self) -> None:
+        """Step down so a standby takes over without waiting out the lease"""
+        if self._renewed_at is None:
+            return
+        self._renewed_at = None
+        db = SessionLocal()
+        try:
+            (
+                db.query(LeaderLease)
+                .filter(LeaderLease.name == self.name, LeaderLease.owner == self.owner)
+                .update({LeaderLease.expires_at: datetime.now()}, synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _lost(self) -> bool:
+        if self._renewed_at is not None:
+            print(f"[leader] {self.name}: lost leadership")
+        self._renewed_at = None
+        return False
+
+
+def scheduler_leader(shard) -> LeaderElection | None:
+    """The election a scheduler for ``shard`` should run under; None when disabled"""
+    return LeaderElection.for_shard(shard) if LEADER_ELECTION else None
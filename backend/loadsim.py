@@ -0,0 +1,426 @@
+"""Load simulation: API, scheduler and upload pool against a fake uploader.
+
+    python loadsim.py --videos 20 --schedules 300 --spread 60 --output results.json
+
+Runs in a scratch directory (fresh SQLite database, uploads and cookie dirs),
+swaps ``upload_video`` for a fake with log-normal latency and configurable
+failure rates, seeds videos / accounts / schedules, then drives the API from
+several client threads while the dispatcher works through the schedules.
+
+Prints one JSON document on stdout (worker logs go to stderr): dispatch
+lateness percentiles, uploads per minute, per-route API p50/p99 latency and
+SQL statements per request. Dispatcher and pool settings come from the usual
+environment variables (``UPLOAD_MAX_WORKERS``, ``UPLOAD_MAX_PER_ACCOUNT``, ...).
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import types
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+
+class FakeUploader:
+    """Stand-in for ``tiktok_uploader.upload.upload_video``.
+
+    Latency is log-normal around ``median_seconds``. Failures mimic what the
+    real uploader produces: a returned list of failed videos (transient), an
+    expired-session error (auth) or a rejection (permanent).
+    """
+
+    def __init__(
+        self,
+        median_seconds: float = 2.0,
+        sigma: float = 0.5,
+        failure_rate: float = 0.0,
+        auth_failure_rate: float = 0.0,
+        permanent_failure_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.median_seconds = median_seconds
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.auth_failure_rate = auth_failure_rate
+        self.permanent_failure_rate = permanent_failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def __call__(self, filename=None, description=None, cookies=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            latency = self.median_seconds * math.exp(self._random.gauss(0, self.sigma)) if self.median_seconds > 0 else 0
+            roll = self._random.random()
+        time.sleep(latency)
+
+        if roll < self.permanent_failure_rate:
+            raise Exception("Video rejected: violates community guidelines")
+        roll -= self.permanent_failure_rate
+        if roll < self.auth_failure_rate:
+            raise Exception("sessionid cookie expired, please log in")
+        roll -= self.auth_failure_rate
+        if roll < self.failure_rate:
+            return [{"path": filename, "description": description}]
+        return []
+
+
+def percentiles(values, points=(50, 90, 99)) -> dict:
+    """Nearest-rank percentiles plus max and count"""
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    result = {f"p{point}": round(values[max(math.ceil(point / 100 * len(values)) - 1, 0)], 4) for point in points}
+    result["max"] = round(values[-1], 4)
+    result["count"] = len(values)
+    return result
+
+
+def stub_tiktok_uploader(upload_video) -> bool:
+    """Register stand-in ``tiktok_uploader`` modules when the checkout is missing.
+
+    ``upload_video`` becomes ``tiktok_uploader.upload.upload_video``. Returns
+    False (and changes nothing) if the real package imports.
+    """
+    if (BACKEND_DIR.parent / "tiktok-uploader" / "src" / "tiktok_uploader").is_dir():
+        # The checkout upload_worker puts on sys.path
+        return False
+    try:
+        import tiktok_uploader.upload  # noqa: F401
+        return False
+    except ModuleNotFoundError as exc:
+        if not (exc.name or "").startswith("tiktok_uploader"):
+            raise
+    package = types.ModuleType("tiktok_uploader")
+    config = types.ModuleType("tiktok_uploader.config")
+    config.implicit_wait, config.explicit_wait, config.uploading_wait = 5, 60, 180
+    config.add_hashtag_wait, config.headless = 2, True
+    upload = types.ModuleType("tiktok_uploader.upload")
+    upload.upload_video = upload_video
+    package.config, package.upload = config, upload
+    sys.modules.update({"tiktok_uploader": package, "tiktok_uploader.config": config, "tiktok_uploader.upload": upload})
+    return True
+
+
+def _install_fake_uploader(fake: FakeUploader):
+    """Import upload_worker with ``fake`` as its uploader, even without tiktok-uploader checked out"""
+    stub_tiktok_uploader(fake)
+    import upload_worker
+
+    upload_worker.upload_video = fake
+    return upload_worker
+
+
+def _seed(args, now: datetime) -> tuple[list[int], list[int]]:
+    """Create videos, accounts and schedules; returns (schedule ids, video ids)"""
+    from accounts import store_cookies
+    from database import SessionLocal
+    from models import Account, ScheduledUpload, Video
+
+    rng = random.Random(args.seed)
+    upload_dir = Path("uploads")
+    upload_dir.mkdir(exist_ok=True)
+    db = SessionLocal()
+    try:
+        videos = []
+        for index in range(args.videos):
+            path = upload_dir / f"loadsim-{index}.mp4"
+            path.write_bytes(b"\x00" * 1024)
+            videos.append(
+                Video(
+                    original_filename=path.name,
+                    stored_filename=path.name,
+                    file_path=str(path),
+                    description=f"Load test video {index}",
+                    file_size=1024,
+                )
+            )
+        accounts = [Account(name=f"loadsim-{index}") for index in range(args.accounts)]
+        db.add_all(videos + accounts)
+        db.flush()
+        for account in accounts:
+            account.cookies_path = str(store_cookies(account.id, b"# Netscape HTTP Cookie File\n"))
+
+        start = now + timedelta(seconds=args.lead)
+        account_ids = [account.id for account in accounts] or [None]
+        schedules = [
+            ScheduledUpload(
+                video_id=rng.choice(videos).id,
+                account_id=account_ids[index % len(account_ids)],
+                scheduled_time=start + timedelta(seconds=rng.uniform(0, args.spread)),
+                description=f"Load test schedule {index}",
+                status="pending",
+            )
+            for index in range(args.schedules)
+        ]
+        db.add_all(schedules)
+        db.commit()
+        return [schedule.id for schedule in schedules], [video.id for video in videos]
+    finally:
+        db.close()
+
+
+def _api_client(client, video_ids, stop: threading.Event, timings: list, lock: threading.Lock, args, seed: int):
+    """Mixed read-heavy traffic, like a few open calendars plus the odd new schedule"""
+    rng = random.Random(seed)
+
+    def calendar_window():
+        start = datetime.now() - timedelta(hours=1)
+        return client.get("/schedules", params={"from": start.isoformat(), "to": (start + timedelta(days=7)).isoformat()})
+
+    def new_schedule():
+        # Far enough out that it never competes with the simulated backlog
+        return client.post(
+            "/schedules",
+            json={
+                "video_id": rng.choice(video_ids),
+                "scheduled_time": (datetime.now() + timedelta(days=rng.randint(2, 30))).isoformat(),
+                "description": "Load test",
+            },
+        )
+
+    workload = [
+        (40, "GET /schedules?from&to", calendar_window),
+        (15, "GET /schedules", lambda: client.get("/schedules", params={"limit": 100})),
+        (15, "GET /queue", lambda: client.get("/queue")),
+        (20, "GET /videos", lambda: client.get("/videos")),
+        (10, "POST /schedules", new_schedule),
+    ]
+    weights = [weight for weight, _, _ in workload]
+    while not stop.is_set():
+        _, label, request = rng.choices(workload, weights)[0]
+        started = time.perf_counter()
+        status = request().status_code
+        elapsed = time.perf_counter() - started
+        with lock:
+            timings.append((label, elapsed, status))
+        stop.wait(args.api_interval)
+
+
+def _unfinished(schedule_ids) -> int:
+    from database import SessionLocal
+    from models import ScheduledUpload
+
+    db = SessionLocal()
+    try:
+        return (
+            db.query(ScheduledUpload)
+            .filter(ScheduledUpload.id.in_(schedule_ids), ScheduledUpload.status.in_(("pending", "uploading")))
+            .count()
+        )
+    finally:
+        db.close()
+
+
+def _upload_results(schedule_ids) -> dict:
+    from sqlalchemy import func
+
+    from database import SessionLocal
+    from models import ScheduledUpload, UploadAttempt
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(UploadAttempt, ScheduledUpload.scheduled_time)
+            .join(ScheduledUpload, ScheduledUpload.id == UploadAttempt.schedule_id)
+            .filter(UploadAttempt.schedule_id.in_(schedule_ids))
+            .all()
+        )
+        statuses = dict(
+            db.query(ScheduledUpload.status, func.count())
+            .filter(ScheduledUpload.id.in_(schedule_ids))
+            .group_by(ScheduledUpload.status)
+            .all()
+        )
+    finally:
+        db.close()
+
+    lateness = [
+        (attempt.started_at - scheduled_time.replace(tzinfo=None)).total_seconds()
+        for attempt, scheduled_time in rows
+        if attempt.attempt == 1
+    ]
+    completed = [attempt for attempt, _ in rows if attempt.outcome == "completed"]
+    window = None
+    if completed:
+        first = min(attempt.started_at for attempt, _ in rows)
+        last = max(attempt.finished_at for attempt in completed)
+        window = max((last - first).total_seconds(), 1e-6)
+    return {
+        "statuses": statuses,
+        "attempts": len(rows),
+        "retried": sum(1 for attempt, _ in rows if attempt.attempt == 2),
+        "dispatch_lateness_seconds": percentiles(lateness),
+        "uploads_per_minute": round(len(completed) / window * 60, 2) if window else 0.0,
+    }
+
+
+def _api_results(timings, queries_before: dict) -> dict:
+    from metrics import db_queries_per_request
+
+    by_label = {}
+    for label, elapsed, status in timings:
+        entry = by_label.setdefault(label, {"latencies": [], "errors": 0})
+        entry["latencies"].append(elapsed)
+        entry["errors"] += status >= 500
+    routes = {
+        label: {**percentiles(entry["latencies"], (50, 99)), "errors": entry["errors"]}
+        for label, entry in sorted(by_label.items())
+    }
+
+    queries = {}
+    for (route,), (count, total) in db_queries_per_request.totals().items():
+        before_count, before_total = queries_before.get((route,), (0, 0))
+        if count > before_count:
+            queries[route] = {
+                "requests": count - before_count,
+                "mean": round((total - before_total) / (count - before_count), 2),
+            }
+    return {"routes": routes, "db_queries_per_request": queries}
+
+
+def run(args) -> dict:
+    """Seed, run the dispatcher and API load until the backlog drains, and collect results"""
+    fake = FakeUploader(
+        args.latency_median,
+        args.latency_sigma,
+        args.failure_rate,
+        args.auth_failure_rate,
+        args.permanent_failure_rate,
+        args.seed,
+    )
+    upload_worker = _install_fake_uploader(fake)
+
+    from fastapi.testclient import TestClient
+
+    import main
+    import upload_pool
+    from metrics import db_queries_per_request, db_queries_total
+
+    # The pool and Celery tasks call process_schedule with its default initial delay
+    delayed = functools.partial(upload_worker.process_schedule, initial_delay_seconds=args.initial_delay)
+    upload_pool.process_schedule = delayed
+    if "tasks" in sys.modules:
+        sys.modules["tasks"].process_schedule = delayed
+
+    schedule_ids, video_ids = _seed(args, datetime.now())
+    queries_before = db_queries_per_request.totals()
+    total_queries_before = db_queries_total.value()
+
+    timings, lock, stop = [], threading.Lock(), threading.Event()
+    started = time.monotonic()
+    with TestClient(main.app) as client:
+        clients = [
+            threading.Thread(
+                target=_api_client,
+                args=(client, video_ids, stop, timings, lock, args, (args.seed or 0) + index),
+                daemon=True,
+            )
+            for index in range(args.api_clients)
+        ]
+        for thread in clients:
+            thread.start()
+        deadline = started + (args.timeout or args.lead + args.spread + 300)
+        remaining = len(schedule_ids)
+        while remaining and time.monotonic() < deadline:
+            time.sleep(0.5)
+            remaining = _unfinished(schedule_ids)
+        stop.set()
+        for thread in clients:
+            thread.join()
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+        "backend": main.dispatcher.name,
+        "elapsed_seconds": round(time.monotonic() - started, 2),
+        "timed_out": remaining > 0,
+        "offered_uploads_per_minute": round(args.schedules / max(args.spread, 1e-6) * 60, 2),
+        "uploader_calls": fake.calls,
+        "uploads": _upload_results(schedule_ids),
+        "api": _api_results(timings, queries_before),
+        "db_queries_total": db_queries_total.value() - total_queries_before,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--schedules", type=int, default=200)
+    parser.add_argument("--accounts", type=int, default=2, help="0 puts every schedule on the default account")
+    parser.add_argument("--lead", type=float, default=5, help="seconds before the first schedule is due")
+    parser.add_argument("--spread", type=float, default=60, help="schedules are due uniformly over this many seconds")
+    parser.add_argument("--latency-median", type=float, default=2.0, help="fake upload time, seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread of the upload time")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="transient failures")
+    parser.add_argument("--auth-failure-rate", type=float, default=0.0)
+    parser.add_argument("--permanent-failure-rate", type=float, default=0.0)
+    parser.add_argument("--initial-delay", type=float, default=0, help="worker pause before a first attempt")
+    parser.add_argument("--api-clients", type=int, default=4)
+    parser.add_argument("--api-interval", type=float, default=0.05, help="pause between one client's requests")
+    parser.add_argument("--backend", choices=("thread", "celery"), default="thread", help="celery runs eagerly")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the configured per-account rate limits")
+    parser.add_argument("--timeout", type=float, default=None, help="give up after this many seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workdir", default=None, help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default=None, help="also write the JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    output = Path(args.output).resolve() if args.output else None
+
+    # Everything below reads its configuration at import time
+    os.environ["BROWSER_POOL_ENABLED"] = "0"
+    os.environ["DISPATCHER_BACKEND"] = args.backend
+    os.environ["DISPATCH_IN_API"] = "1"
+    os.environ["CELERY_EAGER"] = "1"
+    if not args.rate_limit:
+        os.environ["UPLOAD_POSTS_PER_HOUR"] = "0"
+        os.environ["UPLOAD_MIN_SPACING_SECONDS"] = "0"
+    # Production backoff is minutes long; keep retries inside the run
+    os.environ.setdefault("UPLOAD_RETRY_BASE_SECONDS", "1")
+    os.environ.setdefault("UPLOAD_RETRY_MAX_SECONDS", "10")
+    os.environ.setdefault("UPLOAD_AUTH_RETRY_SECONDS", "5")
+    os.environ.setdefault("UPLOAD_ACCOUNT_BUSY_RETRY_SECONDS", "1")
+    os.environ.setdefault("CELERY_SYNC_SECONDS", "5")
+
+    return report_in_scratch(run, args, "loadsim-", output)
+
+
+def report_in_scratch(run, args, prefix: str, output: Path | None = None) -> dict:
+    """Call ``run(args)`` inside a scratch directory and print its report as JSON.
+
+    The backend keeps its database, uploads and cookies relative to the working
+    directory, so this must happen before any backend module is imported.
+    Shared by the benchmark scripts (bench_*.py).
+    """
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix=prefix))
+    workdir.mkdir(parents=True, exist_ok=True)
+    os.chdir(workdir)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+    report["workdir"] = str(workdir)
+
+    text = json.dumps(report, indent=2, default=str)
+    if output:
+        output.write_text(text + "\n")
+    print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
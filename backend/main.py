@@ -1,27 +1,64 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
-import shutil
-import os
+from datetime import datetime, timedelta
+from typing import Literal, Optional
 from pathlib import Path
+import asyncio
+import hashlib
+import hmac
+import json
+import secrets
+from datetime import time as time_of_day
 import uuid
 
+from sqlalchemy import and_, bindparam, exists, func, insert, or_, select, update
+from sqlalchemy.orm import joinedload
+from starlette.concurrency import run_in_threadpool
+
 from database import SessionLocal, init_db
-from models import Video, ScheduledUpload
-from ai_description import generate_description
-from scheduler import start_scheduler_thread
-from upload_worker import process_schedule
+from models import Account, RecurrenceRule, Video, VideoBlob, ScheduledUpload, UploadAttempt
+from description_jobs import description_service, placeholder_description
+from blob_store import BlobStore
+from events import event_bus, schedule_event
+from change_feed import SCHEDULES_PURGED, change_relay, current_change_seq, next_change_seq, record_purge
+from media_response import media_response
+from ingest import (
+    ALLOWED_EXTENSIONS, PROOF_BYTES, ChunkedUploadStore, UploadTooLarge, iter_upload_file, rechunk, stream_to_file,
+)
+from scheduler import predicted_post_times
+from slot_index import slot_index
+from dispatcher import DISPATCH_IN_API, dispatcher
+from upload_worker import recover_orphaned_uploads
+from recurrence import materialize, remove_video, virtual_occurrences
+from accounts import store_cookies
+from media_pipeline import media_pipeline
+from preflight import NEEDS_PROBE, NEEDS_TRANSCODE, check_video, transcode_queue
+from browser_pool import browser_pool
+from metrics import CONTENT_TYPE, Gauge, MetricsMiddleware, registry
 
 app = FastAPI(title="TikTok Scheduler API")
 
-# Start background scheduler
+# Start background dispatch (scheduler thread, or nothing but an eager sync loop with Celery)
 @app.on_event("startup")
 def startup_event():
-    start_scheduler_thread()
-    print("✅ Background scheduler started")
+    # Ingest happens here whichever process dispatches, so its background jobs do
+    # too; pick up whatever a previous run left unfinished
+    chunked_uploads.sweep()
+    media_pipeline.backfill()
+    description_service.requeue_placeholders()
+    transcode_queue.start()
+    # Uploads run by other processes reach this process's SSE clients through the change feed
+    change_relay.start()
+    if not DISPATCH_IN_API:
+        # `cli.py scheduler` owns dispatch and recovery
+        print(f"✅ Dispatch runs outside the API ({dispatcher.name})")
+        return
+    # Settle uploads a previous run died in the middle of before anything is dispatched
+    recover_orphaned_uploads(startup=True)
+    dispatcher.start()
+    print(f"✅ Dispatcher started ({dispatcher.name})")
 
 # CORS
 app.add_middleware(
@@ -30,29 +67,65 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
+)
+app.add_middleware(MetricsMiddleware)
+
+# Evaluated on scrape only, so nothing is counted on the hot path
+Gauge(
+    "tiktok_dispatch_queue_depth",
+    "Uploads waiting in or running from the dispatcher",
+    labels=("queue",),
+    callback=lambda: {(name,): depth for name, depth in dispatcher.queue_depth().items()},
+)
+Gauge(
+    "tiktok_description_queue_depth",
+    "Description generation jobs waiting",
+    callback=lambda: description_service.stats()["queued"],
 )
 
 # Create directories
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-# Serve uploaded files
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Partial data for resumable chunked uploads, and the deduplicated files themselves
+INCOMING_DIR = Path("uploads_incoming")
+chunked_uploads = ChunkedUploadStore(INCOMING_DIR)
+blob_store = BlobStore(UPLOAD_DIR)
+
 
 # Initialize database
 init_db()
 
 
+# Keyset pagination - the next page's cursor is returned in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+MAX_BULK_OPERATIONS = 10000
+# POST /schedules due sooner than this is treated as "post now"
+POST_NOW_SECONDS = 120
+
 # Pydantic models
 class VideoCreate(BaseModel):
     filename: str
     description: Optional[str] = None
 
 
+class ChunkedUploadInit(BaseModel):
+    filename: str
+    total_size: int
+    sha256: Optional[str] = None  # known content can skip the transfer, given proof (see prove_chunked_upload)
+
+
+class AccountCreate(BaseModel):
+    name: str
+
+
 class ScheduleCreate(BaseModel):
     video_id: int
     scheduled_time: datetime
     description: str
+    account_id: Optional[int] = None  # None: the default cookies file
 
 
 class ScheduleUpdate(BaseModel):
@@ -60,77 +133,329 @@ class ScheduleUpdate(BaseModel):
     description: Optional[str] = None
 
 
+class RecurrenceCreate(BaseModel):
+    video_ids: list[int]  # one video, or a playlist rotated through occurrence by occurrence
+    description: str
+    frequency: Literal["daily", "weekly"]
+    interval: int = 1
+    times: list[str]  # "HH:MM", local time
+    weekdays: Optional[list[int]] = None  # weekly only, Monday = 0
+    starts_at: datetime
+    ends_at: Optional[datetime] = None
+    count: Optional[int] = None
+    account_id: Optional[int] = None
+
+
+class BulkScheduleOperation(BaseModel):
+    op: Literal["create", "reschedule", "cancel"]
+    id: Optional[int] = None  # reschedule / cancel
+    video_id: Optional[int] = None  # create
+    account_id: Optional[int] = None  # create
+    scheduled_time: Optional[datetime] = None
+    description: Optional[str] = None
+
+
+class BulkScheduleRequest(BaseModel):
+    operations: list[BulkScheduleOperation]
+    all_or_nothing: bool = False
+
+
 @app.get("/")
 def root():
     return {"message": "TikTok Scheduler API"}
 
 
-@app.post("/videos/upload")
-async def upload_video(file: UploadFile = File(...)):
-    """Upload a video file"""
-    if not file.filename.endswith(('.mp4', '.mov', '.avi', '.mkv')):
-        raise HTTPException(status_code=400, detail="Invalid video format")
-    
-    # Generate unique filename
-    file_id = str(uuid.uuid4())
-    file_ext = Path(file.filename).suffix
-    new_filename = f"{file_id}{file_ext}"
-    file_path = UPLOAD_DIR / new_filename
-    
-    # Save file
-    with file_path.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Generate AI description
-    try:
-        ai_description = generate_description(file.filename, str(file_path))
-    except Exception as e:
-        ai_description = f"Video: {file.filename}"
+def _media_url(video: Video) -> str:
+    """Public URL of a video's file (shared by every Video with the same content)"""
+    return f"/uploads/{Path(video.file_path).name}"
+
+
+def _asset_url(path: Optional[str]) -> Optional[str]:
+    """Poster/preview files sit beside the original and are named after its content"""
+    return f"/uploads/{Path(path).name}" if path else None
+
+
+def _preflight_dict(video: Video) -> dict:
+    return {
+        "duration_seconds": video.duration_seconds,
+        "video_codec": video.video_codec,
+        "width": video.width,
+        "height": video.height,
+        "bitrate": video.bitrate,
+        "preflight_status": video.preflight_status,
+        "preflight_error": video.preflight_error,
+    }
+
+
+def _create_video(original_filename: str, sha256: str, temp_path: Optional[Path] = None) -> dict:
+    """Record an ingested file, storing its content only if it is new.
+
+    ``temp_path`` may be None when the client proved the content already exists.
+    """
+    file_ext = Path(original_filename).suffix
     
-    # Save to database
     db = SessionLocal()
     try:
+        if temp_path is None:
+            blob, deduplicated = blob_store.add_reference(db, sha256), True
+            if blob is None:
+                return None
+        else:
+            blob, deduplicated = blob_store.adopt(db, sha256, file_ext, temp_path)
+        
+        # AI description comes from the cache, or later from a background batch
+        cached_description = description_service.cached(sha256, original_filename)
+        
         video = Video(
-            original_filename=file.filename,
-            stored_filename=new_filename,
-            file_path=str(file_path),
-            description=ai_description,
-            thumbnail_path=None,  # TODO: Generate thumbnail
-            file_size=os.path.getsize(file_path),
+            original_filename=original_filename,
+            stored_filename=f"{uuid.uuid4()}{file_ext}",
+            file_path=blob.file_path,
+            description=cached_description or placeholder_description(original_filename),
+            thumbnail_path=None,  # filled in by media_pipeline
+            file_size=blob.file_size,
+            content_hash=sha256,
         )
+        check_video(db, video)
         db.add(video)
         db.commit()
         db.refresh(video)
         
+        media_pipeline.submit(video.id, video.file_path)
+        if video.preflight_status in (NEEDS_PROBE, NEEDS_TRANSCODE):
+            transcode_queue.notify()
+        if cached_description is None:
+            description_service.submit(video.id, sha256, original_filename, video.file_path)
+        
         return {
             "id": video.id,
             "filename": video.original_filename,
             "stored_filename": video.stored_filename,
             "description": video.description,
-            "file_path": f"/uploads/{video.stored_filename}",
+            "file_path": _media_url(video),
+            "sha256": sha256,
+            "deduplicated": deduplicated,
+            **_preflight_dict(video),
             "created_at": video.created_at,
         }
     finally:
         db.close()
 
 
+@app.post("/videos/upload")
+async def upload_video(file: UploadFile = File(...)):
+    """Upload a video file"""
+    if not file.filename.endswith(ALLOWED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Invalid video format")
+    
+    temp_path = INCOMING_DIR / f"{uuid.uuid4().hex}.upload"
+    
+    # Save file in fixed-size chunks off the event loop, hashing as we go
+    hasher = hashlib.sha256()
+    try:
+        await stream_to_file(iter_upload_file(file), temp_path, hasher)
+        return await run_in_threadpool(
+            _create_video, file.filename, hasher.hexdigest(), temp_path
+        )
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+@app.post("/videos/chunked")
+def init_chunked_upload(upload: ChunkedUploadInit):
+    """Start a resumable upload; send chunks with PUT, then finalize"""
+    if not upload.filename.endswith(ALLOWED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Invalid video format")
+    if upload.total_size <= 0:
+        raise HTTPException(status_code=400, detail="total_size must be positive")
+    
+    # Known content: the client may skip the transfer by proving it has the file, since a
+    # digest alone is no proof - it can be learnt without the content
+    proof = None
+    if upload.sha256:
+        sha256 = upload.sha256.lower()
+        db = SessionLocal()
+        try:
+            blob = db.get(VideoBlob, sha256)
+        finally:
+            db.close()
+        if blob is not None and blob.file_size == upload.total_size:
+            length = min(PROOF_BYTES, blob.file_size)
+            proof = {"sha256": sha256, "offset": secrets.randbelow(blob.file_size - length + 1), "length": length}
+    
+    session = chunked_uploads.create(upload.filename, upload.total_size, proof)
+    if proof:
+        session["proof"] = {"offset": proof["offset"], "length": proof["length"]}
+    return {"duplicate": False, **session}
+
+
+@app.post("/videos/chunked/{upload_id}/proof")
+async def prove_chunked_upload(upload_id: str, request: Request):
+    """Skip the transfer of stored content: the body is the byte range named in ``proof``.
+
+    One attempt per upload; on a mismatch, upload the file as usual.
+    """
+    if not chunked_uploads.get(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    async with chunked_uploads.lock(upload_id):
+        session = chunked_uploads.get(upload_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        proof = chunked_uploads.take_proof(upload_id)
+        if proof is None:
+            raise HTTPException(status_code=409, detail="No proof pending for this upload")
+        if int(request.headers.get("content-length") or 0) > proof["length"]:
+            raise HTTPException(status_code=403, detail="Proof does not match; upload the file instead")
+        body = await request.body()
+        expected = await run_in_threadpool(_read_blob_range, proof["sha256"], proof["offset"], proof["length"])
+        if expected is None:
+            raise HTTPException(status_code=409, detail="Content is no longer stored; upload the file instead")
+        if not hmac.compare_digest(body, expected):
+            raise HTTPException(status_code=403, detail="Proof does not match; upload the file instead")
+        
+        video = await run_in_threadpool(_create_video, session["filename"], proof["sha256"])
+        if video is None:
+            raise HTTPException(status_code=409, detail="Content is no longer stored; upload the file instead")
+        chunked_uploads.discard(upload_id)
+    return {"duplicate": True, "video": video}
+
+
+def _read_blob_range(sha256: str, offset: int, length: int) -> bytes | None:
+    db = SessionLocal()
+    try:
+        return blob_store.read_range(db, sha256, offset, length)
+    finally:
+        db.close()
+
+
+@app.get("/videos/chunked/{upload_id}")
+def get_chunked_upload(upload_id: str):
+    """How many bytes have arrived - resume from ``received`` after a dropped connection"""
+    session = chunked_uploads.get(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+
+@app.put("/videos/chunked/{upload_id}")
+async def put_chunk(upload_id: str, offset: int, request: Request):
+    """Append the raw request body at ``offset``"""
+    if not chunked_uploads.get(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    async with chunked_uploads.lock(upload_id):
+        session = chunked_uploads.get(upload_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        
+        if offset != session["received"]:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Offset mismatch", "received": session["received"]},
+            )
+        
+        # Refuse an oversized chunk up front when it says how big it is, and
+        # stop reading the moment a body without a length runs past the end
+        remaining = session["total_size"] - offset
+        if int(request.headers.get("content-length") or 0) > remaining:
+            raise HTTPException(status_code=400, detail="Upload exceeds declared total_size")
+        try:
+            received = await chunked_uploads.append(
+                upload_id, offset, rechunk(request.stream()), max_bytes=remaining
+            )
+        except UploadTooLarge:
+            raise HTTPException(status_code=400, detail="Upload exceeds declared total_size")
+        
+        return {"upload_id": upload_id, "received": received, "total_size": session["total_size"]}
+
+
+@app.post("/videos/chunked/{upload_id}/finalize")
+async def finalize_chunked_upload(upload_id: str):
+    """Assemble a completed chunked upload into a video"""
+    if not chunked_uploads.get(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    async with chunked_uploads.lock(upload_id):
+        session = chunked_uploads.get(upload_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        
+        if session["received"] != session["total_size"]:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Upload incomplete", "received": session["received"]},
+            )
+        
+        temp_path = INCOMING_DIR / f"{upload_id}.upload"
+        sha256 = await chunked_uploads.finalize(upload_id, temp_path)
+    
+    try:
+        return await run_in_threadpool(_create_video, session["filename"], sha256, temp_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+@app.delete("/videos/chunked/{upload_id}")
+def abort_chunked_upload(upload_id: str):
+    """Abandon a chunked upload and free its partial data"""
+    if not chunked_uploads.get(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    chunked_uploads.discard(upload_id)
+    return {"message": "Upload aborted"}
+
+
+@app.api_route("/uploads/{filename}", methods=["GET", "HEAD"])
+def serve_media(filename: str, request: Request):
+    """Serve an uploaded video, poster or preview with Range and ETag support.
+
+    Files are named by content hash (or UUID for older uploads) and never
+    rewritten, so the name doubles as a strong ETag and caches may keep them forever.
+    """
+    path = UPLOAD_DIR / filename
+    if filename.startswith(".") or path.parent != UPLOAD_DIR or not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    return media_response(request, path, f'"{filename}"')
+
+
 @app.get("/videos")
-def get_videos():
-    """Get all videos"""
+def get_videos(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+):
+    """Get videos, optionally a page at a time (``cursor`` = last id seen)"""
     db = SessionLocal()
     try:
-        videos = db.query(Video).all()
+        # One query: pending-schedule flag as a correlated EXISTS instead of loading v.schedules
+        is_scheduled = (
+            exists()
+            .where(ScheduledUpload.video_id == Video.id, ScheduledUpload.status == "pending")
+            .label("is_scheduled")
+        )
+        query = db.query(Video, is_scheduled).order_by(Video.id)
+        if cursor is not None:
+            query = query.filter(Video.id > cursor)
+        if limit is not None:
+            query = query.limit(limit)
+        rows = query.all()
+        
+        if limit is not None and len(rows) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = str(rows[-1].Video.id)
+        
         return [
             {
                 "id": v.id,
                 "filename": v.original_filename,
                 "stored_filename": v.stored_filename,
                 "description": v.description,
-                "file_path": f"/uploads/{v.stored_filename}",
+                "file_path": _media_url(v),
+                "thumbnail_url": _asset_url(v.thumbnail_path),
+                "preview_url": _asset_url(v.preview_path),
+                **_preflight_dict(v),
                 "created_at": v.created_at,
-                "is_scheduled": any(s.status == "pending" for s in v.schedules),
+                "is_scheduled": scheduled,
             }
-            for v in videos
+            for v, scheduled in rows
         ]
     finally:
         db.close()
@@ -149,7 +474,10 @@ def get_video(video_id: int):
             "id": video.id,
             "filename": video.original_filename,
             "description": video.description,
-            "file_path": f"/uploads/{video.stored_filename}",
+            "file_path": _media_url(video),
+            "thumbnail_url": _asset_url(video.thumbnail_path),
+            "preview_url": _asset_url(video.preview_path),
+            **_preflight_dict(video),
             "created_at": video.created_at,
         }
     finally:
@@ -165,26 +493,138 @@ def delete_video(video_id: int):
         if not video:
             raise HTTPException(status_code=404, detail="Video not found")
         
-        # Delete file
-        if os.path.exists(video.file_path):
-            os.remove(video.file_path)
+        dispatcher.cancel(*(schedule.id for schedule in video.schedules))
+        # Series posting it move on to their other videos, or stop
+        remove_video(db, video.id)
+        
+        # Its schedules vanish with it; tell change-feed clients to refetch
+        if video.schedules:
+            record_purge(db)
+        
+        # Shared content is only unlinked once its last Video is gone
+        if video.content_hash:
+            orphaned_path = blob_store.release(db, video.content_hash)
+        else:
+            orphaned_path = Path(video.file_path)
+        derived_paths = [video.thumbnail_path, video.preview_path, video.upload_path]
         
         # Delete from DB
         db.delete(video)
-        db.commit()
+        try:
+            db.commit()
+        except Exception:
+            if video.content_hash and orphaned_path:
+                blob_store.restore(orphaned_path)
+            raise
+        
+        # Delete file, plus its poster/preview
+        if orphaned_path:
+            for path in (orphaned_path, *derived_paths):
+                if path:
+                    Path(path).unlink(missing_ok=True)
         
         return {"message": "Video deleted"}
     finally:
         db.close()
 
 
-def upload_video_task(schedule_id: int):
-    """Background task wrapper"""
-    process_schedule(schedule_id, headless=False)
+MAX_COOKIES_BYTES = 1024 * 1024
+
+
+def _account_dict(account: Account) -> dict:
+    return {
+        "id": account.id,
+        "name": account.name,
+        "active": account.active,
+        "has_cookies": bool(account.cookies_path) and Path(account.cookies_path).exists(),
+        "created_at": account.created_at,
+    }
+
+
+def _check_account(db, account_id: Optional[int]) -> None:
+    """404 for an unknown account, 400 for a disabled one; None is the default account"""
+    if account_id is None:
+        return
+    account = db.get(Account, account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+    if not account.active:
+        raise HTTPException(status_code=400, detail="Account is disabled")
+
+
+@app.post("/accounts")
+def create_account(account: AccountCreate):
+    """Add a TikTok account; upload its cookies with PUT /accounts/{id}/cookies"""
+    name = account.name.strip()
+    if not name:
+        raise HTTPException(status_code=400, detail="Name is required")
+    db = SessionLocal()
+    try:
+        if db.query(Account.id).filter(Account.name == name).first():
+            raise HTTPException(status_code=400, detail="Account name already in use")
+        new_account = Account(name=name, active=True)
+        db.add(new_account)
+        db.commit()
+        db.refresh(new_account)
+        return _account_dict(new_account)
+    finally:
+        db.close()
+
+
+@app.get("/accounts")
+def get_accounts():
+    """Get all accounts"""
+    db = SessionLocal()
+    try:
+        return [_account_dict(account) for account in db.query(Account).order_by(Account.name)]
+    finally:
+        db.close()
+
+
+@app.put("/accounts/{account_id}/cookies")
+async def upload_account_cookies(account_id: int, file: UploadFile = File(...)):
+    """Replace an account's cookies file (Netscape cookies.txt export)"""
+    data = await file.read(MAX_COOKIES_BYTES + 1)
+    if not data or len(data) > MAX_COOKIES_BYTES:
+        raise HTTPException(status_code=400, detail="Cookies file is empty or too large")
+    return await run_in_threadpool(_replace_account_cookies, account_id, data)
+
+
+def _replace_account_cookies(account_id: int, data: bytes) -> dict:
+    db = SessionLocal()
+    try:
+        account = db.get(Account, account_id)
+        if not account:
+            raise HTTPException(status_code=404, detail="Account not found")
+        account.cookies_path = str(store_cookies(account_id, data))
+        db.commit()
+        db.refresh(account)
+        return _account_dict(account)
+    finally:
+        db.close()
+
+
+@app.delete("/accounts/{account_id}")
+def delete_account(account_id: int):
+    """Disable an account and drop its cookies; its pending schedules will fail"""
+    db = SessionLocal()
+    try:
+        account = db.get(Account, account_id)
+        if not account:
+            raise HTTPException(status_code=404, detail="Account not found")
+        cookies_path = account.cookies_path
+        account.active = False
+        account.cookies_path = None
+        db.commit()
+        if cookies_path:
+            Path(cookies_path).unlink(missing_ok=True)
+        return {"message": "Account disabled"}
+    finally:
+        db.close()
 
 
 @app.post("/schedules")
-def create_schedule(schedule: ScheduleCreate, background_tasks: BackgroundTasks):
+def create_schedule(schedule: ScheduleCreate):
     """Schedule a video for upload"""
     db = SessionLocal()
     try:
@@ -192,6 +632,7 @@ def create_schedule(schedule: ScheduleCreate, background_tasks: BackgroundTasks)
         video = db.query(Video).filter(Video.id == schedule.video_id).first()
         if not video:
             raise HTTPException(status_code=404, detail="Video not found")
+        _check_account(db, schedule.account_id)
         
         # Parse the datetime (no timezone conversion - user local time)
         if isinstance(schedule.scheduled_time, str):
@@ -203,13 +644,10 @@ def create_schedule(schedule: ScheduleCreate, background_tasks: BackgroundTasks)
         if scheduled_time.tzinfo:
             scheduled_time = scheduled_time.astimezone().replace(tzinfo=None)
         
-        # Check if "post now" (scheduled within next 2 minutes)
-        now = datetime.now()
-        time_diff = (scheduled_time - now).total_seconds()
-        
         # Create schedule
         new_schedule = ScheduledUpload(
             video_id=schedule.video_id,
+            account_id=schedule.account_id,
             scheduled_time=scheduled_time,
             description=schedule.description,
             status="pending",
@@ -217,11 +655,14 @@ def create_schedule(schedule: ScheduleCreate, background_tasks: BackgroundTasks)
         db.add(new_schedule)
         db.commit()
         db.refresh(new_schedule)
+        event_bus.publish("schedule.created", schedule_event(new_schedule))
         
-        # If scheduled for very soon (< 2 min), upload immediately in background
-        # Otherwise, the background scheduler will pick it up when time comes
-        if time_diff < 120:
-            background_tasks.add_task(upload_video_task, new_schedule.id)
+        # "Post now" (due within 2 minutes) is dispatched straight away, like
+        # POST /schedules/{id}/upload-now; anything later waits for its deadline
+        if (scheduled_time - datetime.now()).total_seconds() < POST_NOW_SECONDS:
+            dispatcher.dispatch_now(new_schedule.id, new_schedule.account_id)
+        else:
+            dispatcher.schedule(new_schedule.id, new_schedule.scheduled_time, new_schedule.account_id)
         
         return {
             "id": new_schedule.id,
@@ -229,35 +670,426 @@ def create_schedule(schedule: ScheduleCreate, background_tasks: BackgroundTasks)
             "scheduled_time": new_schedule.scheduled_time.isoformat(),
             "description": new_schedule.description,
             "status": new_schedule.status,
+            "account_id": new_schedule.account_id,
         }
     finally:
         db.close()
 
 
-@app.get("/schedules")
-def get_schedules():
-    """Get all scheduled uploads"""
+@app.post("/schedules/bulk")
+def bulk_schedules(request: BulkScheduleRequest):
+    """Create, reschedule and cancel many schedules in one transaction.
+
+    Every operation is validated up front with one query per table; valid ones
+    are applied with one executemany per kind. Updates only touch rows that are
+    still pending, so one the dispatcher claimed in between is reported as a
+    per-item error. With ``all_or_nothing`` a single invalid operation rejects
+    the whole batch.
+    """
+    operations = request.operations
+    if len(operations) > MAX_BULK_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_OPERATIONS} operations per request")
+    
+    now = datetime.now()
+    db = SessionLocal()
+    try:
+        video_ids = {op.video_id for op in operations if op.op == "create" and op.video_id is not None}
+        schedule_ids = {op.id for op in operations if op.op != "create" and op.id is not None}
+        account_ids = {op.account_id for op in operations if op.op == "create" and op.account_id is not None}
+        known_videos = {
+            row.id for row in db.query(Video.id).filter(Video.id.in_(video_ids))
+        } if video_ids else set()
+        active_accounts = {
+            row.id for row in db.query(Account.id).filter(Account.id.in_(account_ids), Account.active.is_(True))
+        } if account_ids else set()
+        schedule_rows = {
+            row.id: row
+            for row in db.query(ScheduledUpload.id, ScheduledUpload.status, ScheduledUpload.account_id)
+            .filter(ScheduledUpload.id.in_(schedule_ids))
+        } if schedule_ids else {}
+        schedule_status = {schedule_id: row.status for schedule_id, row in schedule_rows.items()}
+        
+        results = []
+        creates, reschedules, cancels = [], [], []
+        touched = set()
+        for index, op in enumerate(operations):
+            scheduled_time = _local_naive(op.scheduled_time) if op.scheduled_time else None
+            error = None
+            if op.op == "create":
+                if op.video_id not in known_videos:
+                    error = "Video not found"
+                elif op.account_id is not None and op.account_id not in active_accounts:
+                    error = "Account not found or disabled"
+                elif scheduled_time is None or scheduled_time <= now:
+                    error = "Scheduled time must be in the future"
+                elif not op.description:
+                    error = "Description is required"
+            else:
+                if op.id not in schedule_status:
+                    error = "Schedule not found"
+                elif schedule_status[op.id] != "pending":
+                    error = "Schedule is not pending"
+                elif op.id in touched:
+                    error = "Schedule appears more than once in this batch"
+                elif op.op == "reschedule" and scheduled_time is not None and scheduled_time <= now:
+                    error = "Scheduled time must be in the future"
+                elif op.op == "reschedule" and scheduled_time is None and not op.description:
+                    error = "Nothing to update"
+            
+            results.append({"index": index, "op": op.op, "id": op.id, "ok": error is None, "error": error})
+            if error:
+                continue
+            if op.op == "create":
+                creates.append((index, {
+                    "video_id": op.video_id,
+                    "account_id": op.account_id,
+                    "scheduled_time": scheduled_time,
+                    "description": op.description,
+                    "status": "pending",
+                }))
+            elif op.op == "reschedule":
+                touched.add(op.id)
+                values = {"id": op.id}
+                if scheduled_time is not None:
+                    values["scheduled_time"] = scheduled_time
+                    values["next_attempt_at"] = None
+                if op.description:
+                    values["description"] = op.description
+                reschedules.append(values)
+            else:
+                touched.add(op.id)
+                cancels.append({"id": op.id, "status": "cancelled"})
+        
+        failed = sum(not result["ok"] for result in results)
+        if failed and request.all_or_nothing:
+            return {"applied": False, "failed": failed, "results": results}
+        
+        # Bulk statements skip ORM events, so stamp the change counter once for the batch
+        change_seq = next_change_seq(db.connection()) if creates or reschedules or cancels else None
+        
+        # Rows sharing a key set go through one executemany. Each UPDATE re-checks
+        # status, so a row the dispatcher claimed since validation is left alone.
+        table = ScheduledUpload.__table__
+        matched = 0
+        for values_list in _group_by_keys(reschedules + cancels):
+            result = db.execute(
+                update(table).where(table.c.id == bindparam("row_id"), table.c.status == "pending"),
+                [
+                    {"row_id": values["id"], **{k: v for k, v in values.items() if k != "id"}, "change_seq": change_seq}
+                    for values in values_list
+                ],
+            )
+            matched += result.rowcount
+        if matched < len(reschedules) + len(cancels):
+            # Only this batch stamps change_seq, so rows without it were not updated
+            missed = set(db.scalars(
+                select(ScheduledUpload.id).where(
+                    ScheduledUpload.id.in_(touched), ScheduledUpload.change_seq != change_seq
+                )
+            ))
+            for result in results:
+                if result["op"] != "create" and result["ok"] and result["id"] in missed:
+                    result["ok"], result["error"] = False, "Schedule is not pending"
+                    failed += 1
+            if request.all_or_nothing:
+                db.rollback()
+                return {"applied": False, "failed": failed, "results": results}
+            reschedules = [values for values in reschedules if values["id"] not in missed]
+            cancels = [values for values in cancels if values["id"] not in missed]
+        
+        if creates:
+            # SQLite can't order RETURNING rows of a batched INSERT, so insert with
+            # one executemany and read the ids back: this transaction holds the
+            # write lock, and each row gets the next rowid after the current max.
+            last_id = db.scalar(select(func.max(ScheduledUpload.id))) or 0
+            db.execute(insert(ScheduledUpload), [{**values, "change_seq": change_seq} for _, values in creates])
+            new_ids = db.scalars(
+                select(ScheduledUpload.id).where(ScheduledUpload.id > last_id).order_by(ScheduledUpload.id)
+            ).all()
+            for (index, _), new_id in zip(creates, new_ids):
+                results[index]["id"] = new_id
+        db.commit()
+        
+        dispatcher.schedule_many(
+            [(results[index]["id"], values["scheduled_time"], values["account_id"]) for index, values in creates]
+            + [
+                (values["id"], values["scheduled_time"], schedule_rows[values["id"]].account_id)
+                for values in reschedules
+                if "scheduled_time" in values
+            ]
+        )
+        dispatcher.cancel(*(values["id"] for values in cancels))
+        
+        if change_seq is not None:
+            event_bus.publish("schedule.bulk", {
+                "created": len(creates),
+                "rescheduled": len(reschedules),
+                "cancelled": len(cancels),
+                "change_seq": change_seq,
+            })
+        
+        return {
+            "applied": True,
+            "failed": failed,
+            "created": len(creates),
+            "rescheduled": len(reschedules),
+            "cancelled": len(cancels),
+            "results": results,
+        }
+    finally:
+        db.close()
+
+
+def _group_by_keys(rows: list) -> list:
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return list(groups.values())
+
+
+def _schedule_dict(s: ScheduledUpload) -> dict:
+    return {
+        "id": s.id,
+        "video_id": s.video_id,
+        "video_filename": s.video.original_filename,
+        "video_file_url": _media_url(s.video),
+        "thumbnail_url": _asset_url(s.video.thumbnail_path),
+        "preview_url": _asset_url(s.video.preview_path),
+        "scheduled_time": s.scheduled_time,
+        "description": s.description,
+        "status": s.status,
+        "uploaded_at": s.uploaded_at,
+        "error_message": s.error_message,
+        "account_id": s.account_id,
+        "attempt_count": s.attempt_count or 0,
+        "next_attempt_at": s.next_attempt_at,
+    }
+
+
+@app.get("/schedules/changes")
+def get_schedule_changes(since: int = Query(0, ge=0)):
+    """Rows inserted, updated or cancelled after ``since`` (a previous ``cursor``).
+
+    ``reset`` means rows were hard-deleted since then; refetch GET /schedules.
+    """
+    db = SessionLocal()
+    try:
+        cursor = current_change_seq(db)
+        if since < current_change_seq(db, SCHEDULES_PURGED):
+            return {"cursor": cursor, "reset": True, "changes": []}
+        
+        changed = []
+        if since < cursor:
+            changed = (
+                db.query(ScheduledUpload)
+                .options(joinedload(ScheduledUpload.video))
+                .filter(ScheduledUpload.change_seq > since)
+                .order_by(ScheduledUpload.change_seq)
+                .all()
+            )
+        return {
+            "cursor": cursor,
+            "reset": False,
+            "changes": [_schedule_dict(s) for s in changed],
+        }
+    finally:
+        db.close()
+
+
+@app.get("/schedules/slots")
+def get_schedule_slots(
+    time: datetime,
+    account_id: Optional[int] = None,
+    window_minutes: int = Query(15, ge=0, le=24 * 60),
+    spacing_minutes: int = Query(15, ge=1, le=24 * 60),
+    count: int = Query(3, ge=1, le=20),
+    exclude_id: Optional[int] = None,
+):
+    """Pending posts of the account within ±window_minutes of ``time``, and the next
+    ``count`` free slots from ``time`` that keep spacing_minutes between posts.
+
+    Pass ``exclude_id`` when moving an existing schedule so it doesn't clash with itself.
+    """
+    when = _local_naive(time)
+    conflicts = slot_index.conflicts(account_id, when, timedelta(minutes=window_minutes), exclude_id)
+    # Suggestions start on a whole minute, never in the past
+    start = max(when, datetime.now())
+    if start.second or start.microsecond:
+        start = start.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    suggestions = slot_index.free_slots(
+        account_id, start, timedelta(minutes=spacing_minutes), count, exclude_id
+    )
+    return {
+        "time": when.isoformat(),
+        "account_id": account_id,
+        "conflicts": [{"id": schedule_id, "scheduled_time": at.isoformat()} for at, schedule_id in conflicts],
+        "suggestions": [at.isoformat() for at in suggestions],
+    }
+
+
+@app.get("/schedules/predictions")
+def get_schedule_predictions(
+    response: Response,
+    until: Optional[datetime] = None,
+    account_id: Optional[int] = None,
+):
+    """When each pending post (due by ``until``) will actually go out once rate limiting is applied.
+
+    Served apart from GET /schedules: predictions move with the clock and the
+    limiter, not the change counter, so they can't share its ETag.
+    """
+    response.headers["Cache-Control"] = "no-store"
     db = SessionLocal()
     try:
-        schedules = db.query(ScheduledUpload).all()
+        predicted = predicted_post_times(db, _local_naive(until) if until else None, account_id)
         return [
-            {
-                "id": s.id,
-                "video_id": s.video_id,
-                "video_filename": s.video.original_filename,
-                "video_file_url": f"/uploads/{s.video.stored_filename}",
-                "scheduled_time": s.scheduled_time,
-                "description": s.description,
-                "status": s.status,
-                "uploaded_at": s.uploaded_at,
-                "error_message": s.error_message,
-            }
-            for s in schedules
+            {"id": schedule_id, "predicted_post_time": at}
+            for schedule_id, at in sorted(predicted.items(), key=lambda item: (item[1], item[0]))
         ]
     finally:
         db.close()
 
 
+# Comment line sent on idle SSE streams so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
+
+
+@app.get("/schedules/events")
+async def stream_schedule_events(request: Request):
+    """Server-Sent Events stream of schedule changes (created/updated/cancelled/status)"""
+    subscription = event_bus.subscribe()
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/schedules")
+def get_schedules(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    account_id: Optional[int] = None,
+):
+    """Get scheduled uploads, optionally within [from, to), for one account and a page at a time.
+
+    The ETag is the schedules change counter, so unchanged data answers 304.
+    """
+    db = SessionLocal()
+    try:
+        etag = f'"schedules-{current_change_seq(db)}"'
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        
+        query = (
+            db.query(ScheduledUpload)
+            .options(joinedload(ScheduledUpload.video))
+            .order_by(ScheduledUpload.scheduled_time, ScheduledUpload.id)
+        )
+        if from_ is not None:
+            query = query.filter(ScheduledUpload.scheduled_time >= _local_naive(from_))
+        if to is not None:
+            query = query.filter(ScheduledUpload.scheduled_time < _local_naive(to))
+        if account_id is not None:
+            query = query.filter(ScheduledUpload.account_id == account_id)
+        if cursor:
+            after_time, after_id = _parse_schedule_cursor(cursor)
+            query = query.filter(
+                or_(
+                    ScheduledUpload.scheduled_time > after_time,
+                    and_(
+                        ScheduledUpload.scheduled_time == after_time,
+                        ScheduledUpload.id > after_id,
+                    ),
+                )
+            )
+        if limit is not None:
+            query = query.limit(limit)
+        schedules = query.all()
+        
+        if limit is not None and len(schedules) == limit:
+            last = schedules[-1]
+            response.headers[NEXT_CURSOR_HEADER] = f"{last.scheduled_time.isoformat()}|{last.id}"
+        
+        results = [_schedule_dict(s) for s in schedules]
+        
+        # Recurring series are expanded for the requested window only
+        if from_ is not None and to is not None and limit is None and not cursor:
+            virtual = virtual_occurrences(db, _local_naive(from_), _local_naive(to))
+            if account_id is not None:
+                virtual = [o for o in virtual if o["account_id"] == account_id]
+            if virtual:
+                videos = {
+                    v.id: v
+                    for v in db.query(Video).filter(Video.id.in_({o["video_id"] for o in virtual}))
+                }
+                results.extend(
+                    _occurrence_dict(o, videos[o["video_id"]]) for o in virtual if o["video_id"] in videos
+                )
+                results.sort(key=lambda item: item["scheduled_time"])
+        
+        return results
+    finally:
+        db.close()
+
+
+def _occurrence_dict(occurrence: dict, video: Video) -> dict:
+    """A not-yet-materialized occurrence, shaped like a schedule row"""
+    return {
+        "id": f"rule-{occurrence['rule_id']}-{occurrence['occurrence_index']}",
+        "video_id": video.id,
+        "video_filename": video.original_filename,
+        "video_file_url": _media_url(video),
+        "thumbnail_url": _asset_url(video.thumbnail_path),
+        "preview_url": _asset_url(video.preview_path),
+        "scheduled_time": occurrence["scheduled_time"],
+        "description": occurrence["description"],
+        "status": "pending",
+        "uploaded_at": None,
+        "error_message": None,
+        "account_id": occurrence["account_id"],
+        "attempt_count": 0,
+        "next_attempt_at": None,
+        "rule_id": occurrence["rule_id"],
+        "virtual": True,
+    }
+
+
+def _local_naive(value: datetime) -> datetime:
+    """Schedules are stored as naive local time"""
+    if value.tzinfo:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _parse_schedule_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw_time, raw_id = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(raw_time), int(raw_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.patch("/schedules/{schedule_id}")
 def update_schedule(schedule_id: int, update: ScheduleUpdate):
     """Update a scheduled upload"""
@@ -274,12 +1106,15 @@ def update_schedule(schedule_id: int, update: ScheduleUpdate):
             if update.scheduled_time <= datetime.utcnow():
                 raise HTTPException(status_code=400, detail="Scheduled time must be in the future")
             schedule.scheduled_time = update.scheduled_time
+            schedule.next_attempt_at = None  # an explicit new time overrides any retry backoff
         
         if update.description:
             schedule.description = update.description
         
         db.commit()
         db.refresh(schedule)
+        dispatcher.schedule(schedule.id, schedule.next_attempt_at or schedule.scheduled_time, schedule.account_id)
+        event_bus.publish("schedule.updated", schedule_event(schedule))
         
         return {
             "id": schedule.id,
@@ -302,14 +1137,129 @@ def delete_schedule(schedule_id: int):
         if schedule.status == "pending":
             schedule.status = "cancelled"
             db.commit()
+            dispatcher.cancel(schedule_id)
+            event_bus.publish("schedule.cancelled", schedule_event(schedule))
         
         return {"message": "Schedule cancelled"}
     finally:
         db.close()
 
 
+def _recurrence_dict(rule: RecurrenceRule) -> dict:
+    return {
+        "id": rule.id,
+        "video_ids": json.loads(rule.video_ids),
+        "description": rule.description,
+        "frequency": rule.frequency,
+        "interval": rule.interval,
+        "times": json.loads(rule.times),
+        "weekdays": json.loads(rule.weekdays) if rule.weekdays else None,
+        "starts_at": rule.starts_at,
+        "ends_at": rule.ends_at,
+        "count": rule.count,
+        "account_id": rule.account_id,
+        "active": rule.active,
+    }
+
+
+@app.post("/recurrences")
+def create_recurrence(recurrence: RecurrenceCreate):
+    """Create a repeating series; rows are materialized only inside the scheduler horizon"""
+    if not recurrence.video_ids or not recurrence.times:
+        raise HTTPException(status_code=400, detail="video_ids and times must not be empty")
+    if recurrence.interval < 1:
+        raise HTTPException(status_code=400, detail="interval must be at least 1")
+    if recurrence.count is not None and recurrence.count < 1:
+        raise HTTPException(status_code=400, detail="count must be at least 1")
+    if any(day not in range(7) for day in recurrence.weekdays or []):
+        raise HTTPException(status_code=400, detail="weekdays must be 0 (Monday) to 6")
+    try:
+        times = sorted({time_of_day.fromisoformat(value).strftime("%H:%M") for value in recurrence.times})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="times must be HH:MM")
+    
+    db = SessionLocal()
+    try:
+        found = db.query(Video.id).filter(Video.id.in_(recurrence.video_ids)).count()
+        if found != len(set(recurrence.video_ids)):
+            raise HTTPException(status_code=404, detail="Video not found")
+        _check_account(db, recurrence.account_id)
+        
+        rule = RecurrenceRule(
+            video_ids=json.dumps(recurrence.video_ids),
+            description=recurrence.description,
+            frequency=recurrence.frequency,
+            interval=recurrence.interval,
+            times=json.dumps(times),
+            weekdays=json.dumps(sorted(set(recurrence.weekdays))) if recurrence.weekdays else None,
+            starts_at=_local_naive(recurrence.starts_at),
+            ends_at=_local_naive(recurrence.ends_at) if recurrence.ends_at else None,
+            count=recurrence.count,
+            account_id=recurrence.account_id,
+            active=True,
+        )
+        db.add(rule)
+        db.flush()
+        created = materialize(db, rule_ids=[rule.id])
+        db.commit()
+        db.refresh(rule)
+        
+        dispatcher.schedule_many(created)
+        event_bus.publish("recurrence.created", {"id": rule.id, "materialized": len(created)})
+        
+        return _recurrence_dict(rule)
+    finally:
+        db.close()
+
+
+@app.get("/recurrences")
+def get_recurrences():
+    """Get all recurring series"""
+    db = SessionLocal()
+    try:
+        return [_recurrence_dict(rule) for rule in db.query(RecurrenceRule).all()]
+    finally:
+        db.close()
+
+
+@app.delete("/recurrences/{rule_id}")
+def delete_recurrence(rule_id: int):
+    """Stop a series and cancel its already-materialized pending occurrences"""
+    db = SessionLocal()
+    try:
+        rule = db.query(RecurrenceRule).filter(RecurrenceRule.id == rule_id).first()
+        if not rule:
+            raise HTTPException(status_code=404, detail="Recurrence not found")
+        
+        rule.active = False
+        pending_ids = [
+            row.id
+            for row in db.query(ScheduledUpload.id).filter(
+                ScheduledUpload.rule_id == rule_id, ScheduledUpload.status == "pending"
+            )
+        ]
+        cancelled_ids = []
+        if pending_ids:
+            # Re-check status: an occurrence the dispatcher claimed meanwhile is left to finish
+            cancelled_ids = db.scalars(
+                update(ScheduledUpload)
+                .where(ScheduledUpload.id.in_(pending_ids), ScheduledUpload.status == "pending")
+                .values(status="cancelled", change_seq=next_change_seq(db.connection()))
+                .returning(ScheduledUpload.id)
+                .execution_options(synchronize_session=False)
+            ).all()
+        db.commit()
+        
+        dispatcher.cancel(*cancelled_ids)
+        event_bus.publish("recurrence.cancelled", {"id": rule_id, "cancelled": len(cancelled_ids)})
+        
+        return {"message": "Recurrence cancelled", "cancelled": len(cancelled_ids)}
+    finally:
+        db.close()
+
+
 @app.post("/schedules/{schedule_id}/upload-now")
-def upload_now(schedule_id: int, background_tasks: BackgroundTasks):
+def upload_now(schedule_id: int):
     """Trigger immediate upload for a scheduled video"""
     db = SessionLocal()
     try:
@@ -321,13 +1271,60 @@ def upload_now(schedule_id: int, background_tasks: BackgroundTasks):
             raise HTTPException(status_code=400, detail="Can only upload pending schedules")
         
         # Trigger upload in background
-        background_tasks.add_task(upload_video_task, schedule_id)
+        dispatcher.dispatch_now(schedule_id, schedule.account_id)
         
-        return {"message": "Upload started"}
+        return {"message": "Upload started", "queue": dispatcher.stats()}
     finally:
         db.close()
 
 
+@app.get("/schedules/{schedule_id}/attempts")
+def get_schedule_attempts(schedule_id: int):
+    """Upload attempt history, oldest first"""
+    db = SessionLocal()
+    try:
+        if db.get(ScheduledUpload, schedule_id) is None:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        attempts = (
+            db.query(UploadAttempt)
+            .filter(UploadAttempt.schedule_id == schedule_id)
+            .order_by(UploadAttempt.attempt)
+            .all()
+        )
+        return [
+            {
+                "attempt": a.attempt,
+                "started_at": a.started_at,
+                "finished_at": a.finished_at,
+                "outcome": a.outcome,
+                "failure_class": a.failure_class,
+                "error_message": a.error_message,
+                "retry_at": a.retry_at,
+                "posted_at": a.posted_at,
+            }
+            for a in attempts
+        ]
+    finally:
+        db.close()
+
+
+@app.get("/queue")
+def get_upload_queue():
+    """Dispatch backlog and concurrency, for spotting backpressure"""
+    return {
+        **dispatcher.stats(),
+        "browsers": browser_pool.stats(),
+        "descriptions": description_service.stats(),
+        "transcodes": transcode_queue.stats(),
+    }
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -7,18 +7,22 @@ from datetime import datetime
 TIKTOK_UPLOADER_PATH = Path(__file__).parent.parent / "tiktok-uploader" / "src"
 sys.path.insert(0, str(TIKTOK_UPLOADER_PATH))
 
-from upload_worker import process_schedule
+from accounts import account_key
+from upload_pool import upload_pool
+from upload_worker import recover_orphaned_uploads
 from database import SessionLocal
 from models import ScheduledUpload
 
 
 def upload_pending() -> None:
-    """Upload all pending schedules immediately using the shared worker."""
+    """Upload all pending schedules immediately using the shared worker pool."""
+    recover_orphaned_uploads(startup=True)
     db = SessionLocal()
     try:
         schedules = (
             db.query(ScheduledUpload)
             .filter(ScheduledUpload.status == "pending")
+            .order_by(ScheduledUpload.scheduled_time)
             .all()
         )
 
@@ -28,14 +32,28 @@ def upload_pending() -> None:
 
         print(f"Found {len(schedules)} pending upload(s)")
 
+        futures = []
         for schedule in schedules:
-            print(f"\n📤 Uploading: {schedule.video.original_filename}")
+            print(f"\n📤 Queueing: {schedule.video.original_filename}")
             print(f"   Description: {schedule.description}")
-            success = process_schedule(schedule.id, headless=False)
+            futures.append(
+                (
+                    schedule.id,
+                    upload_pool.submit(
+                        schedule.id, schedule.scheduled_time, account_key(schedule.account_id)
+                    ),
+                )
+            )
+
+        for schedule_id, future in futures:
+            try:
+                success = future.result()
+            except Exception:  # noqa: BLE001
+                success = False
             if success:
-                print("✅ Success!")
+                print(f"✅ Schedule {schedule_id}: success!")
             else:
-                print("❌ Failed — check schedule status for details")
+                print(f"❌ Schedule {schedule_id}: failed — check schedule status for details")
 
         print("\n✅ All done!")
     finally:
@@ -0,0 +1,184 @@
+"""Background poster-frame and preview-clip generation (ffmpeg in a bounded process pool)"""
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import or_
+
+from change_feed import next_change_seq
+from database import SessionLocal
+from models import ScheduledUpload, Video
+
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+# Jobs allowed in flight; further submissions are dropped until a slot frees up
+MEDIA_QUEUE_SIZE = int(os.getenv("MEDIA_QUEUE_SIZE", "32"))
+FFMPEG = shutil.which("ffmpeg")
+
+POSTER_WIDTH = 480
+PREVIEW_WIDTH = 360
+PREVIEW_SECONDS = 15
+
+
+def _ffmpeg(*args: str) -> bool:
+    completed = subprocess.run(
+        [FFMPEG, "-hide_banner", "-loglevel", "error", "-y", *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        timeout=300,
+    )
+    return completed.returncode == 0
+
+
+def render_media(source_path: str) -> tuple[str | None, str | None]:
+    """Write ``<stem>.jpg`` and ``<stem>.preview.mp4`` next to the source.
+
+    Runs in a worker process. Outputs are named after the content-addressed
+    source, so files that already exist are reused rather than re-rendered.
+    """
+    source = Path(source_path)
+    poster = source.with_suffix(".jpg")
+    preview = source.with_name(f"{source.stem}.preview.mp4")
+
+    if not poster.exists():
+        # Skip the usual black first frame; very short clips fall back to frame 0
+        for offset in ("1", "0"):
+            if _ffmpeg(
+                "-ss", offset, "-i", str(source),
+                "-frames:v", "1", "-vf", f"scale={POSTER_WIDTH}:-2",
+                str(poster),
+            ) and poster.exists():
+                break
+
+    if not preview.exists():
+        partial = preview.with_name(f"{preview.name}.part")
+        if _ffmpeg(
+            "-i", str(source), "-t", str(PREVIEW_SECONDS),
+            "-vf", f"scale={PREVIEW_WIDTH}:-2", "-an",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "32",
+            "-movflags", "+faststart", "-f", "mp4", str(partial),
+        ):
+            os.replace(partial, preview)
+        else:
+            partial.unlink(missing_ok=True)
+
+    return (
+        str(poster) if poster.exists() else None,
+        str(preview) if preview.exists() else None,
+    )
+
+
+class MediaPipeline:
+    """Renders previews off the request path with a bounded number of queued jobs.
+
+    Jobs dropped while the queue is full are picked up again by ``backfill()``
+    once a slot frees, and at startup. ``render`` and ``executor_factory`` are
+    replaceable so tests can run a stub renderer in threads.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MEDIA_WORKERS,
+        queue_size: int = MEDIA_QUEUE_SIZE,
+        render=render_media,
+        executor_factory=ProcessPoolExecutor,
+    ):
+        self.max_workers = max(max_workers, 1)
+        self.render = render
+        self.executor_factory = executor_factory
+        self._slots = threading.BoundedSemaphore(max(queue_size, 1))
+        self._executor = None
+        self._lock = threading.Lock()
+        self._attempted = set()  # video ids rendered (or tried) by this process
+        self._dropped = False
+
+    @property
+    def enabled(self) -> bool:
+        return FFMPEG is not None
+
+    def submit(self, video_id: int, source_path: str) -> bool:
+        """Queue preview generation; False if ffmpeg is missing or the queue is full"""
+        if not self.enabled:
+            return False
+        if not self._slots.acquire(blocking=False):
+            print(f"[media] Queue full, deferring previews for video {video_id}")
+            self._dropped = True
+            return False
+
+        with self._lock:
+            self._attempted.add(video_id)
+            if self._executor is None:
+                self._executor = self.executor_factory(max_workers=self.max_workers)
+            future = self._executor.submit(self.render, source_path)
+        future.add_done_callback(lambda f: self._finished(video_id, f))
+        return True
+
+    def backfill(self) -> int:
+        """Queue videos still missing a poster or preview that this process hasn't tried.
+
+        Covers jobs dropped on a full queue and uploads a previous run never
+        got to. Stops at the first full-queue refusal; the next free slot
+        resumes it.
+        """
+        if not self.enabled:
+            return 0
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Video.id, Video.file_path)
+                .filter(or_(Video.thumbnail_path.is_(None), Video.preview_path.is_(None)))
+                .order_by(Video.id)
+                .all()
+            )
+        finally:
+            db.close()
+
+        queued = 0
+        for row in rows:
+            if row.id in self._attempted or not Path(row.file_path).exists():
+                continue
+            if not self.submit(row.id, row.file_path):
+                break
+            queued += 1
+        if queued:
+            print(f"[media] Queued previews for {queued} video(s) missing them")
+        return queued
+
+    def _finished(self, video_id: int, future) -> None:
+        self._slots.release()
+        if self._dropped:
+            self._dropped = False
+            # Not on this callback's thread: it belongs to the executor
+            threading.Thread(target=self.backfill, daemon=True).start()
+        try:
+            poster, preview = future.result()
+        except Exception as exc:  # noqa: BLE001
+            print(f"[media] Preview generation failed for video {video_id}: {exc}")
+            return
+
+        db = SessionLocal()
+        try:
+            video = db.get(Video, video_id)
+            if video and (video.thumbnail_path, video.preview_path) != (poster, preview):
+                video.thumbnail_path = poster
+                video.preview_path = preview
+                # Schedule rows embed the preview URLs: move them forward in the change
+                # feed so ETags change and /schedules/changes clients refetch them
+                (
+                    db.query(ScheduledUpload)
+                    .filter(ScheduledUpload.video_id == video_id)
+                    .update(
+                        {ScheduledUpload.change_seq: next_change_seq(db.connection())},
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+        finally:
+            db.close()
+
+
+media_pipeline = MediaPipeline()
@@ -0,0 +1,114 @@
+"""HTTP Range / conditional responses for immutable media files"""
+from __future__ import annotations
+
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+
+# UUID / content-hash named files are never rewritten in place
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 1024 * 1024
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class FileRangeResponse(Response):
+    """Sends ``[start, end]`` of a file.
+
+    Uses the ASGI zero-copy send extension (sendfile) when the server offers
+    it, otherwise large chunked reads in a worker thread.
+    """
+
+    def __init__(self, path: Path, start: int, end: int, status_code: int, headers: dict, send_body: bool = True):
+        self.path = path
+        self.start = start
+        self.length = end - start + 1
+        self.status_code = status_code
+        self.send_body = send_body
+        self.background = None
+        self.media_type = mimetypes.guess_type(str(path))[0] or "application/octet-stream"
+        self.init_headers({**headers, "Content-Length": str(self.length)})
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or not self.length:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        with open(self.path, "rb") as handle:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": handle.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+                return
+
+            await anyio.to_thread.run_sync(handle.seek, self.start)
+            remaining = self.length
+            while remaining:
+                chunk = await anyio.to_thread.run_sync(handle.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining:
+                # File shrank underneath us; close the stream rather than hang
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _parse_range(header: str, size: int):
+    """Single ``bytes=`` range -> (start, end); None to ignore; ValueError if unsatisfiable"""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None  # multi-range / other units: serve the whole file
+    first, _, last = spec.strip().partition("-")
+    if not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None  # malformed: ignore, as RFC 9110 allows
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+def media_response(request: Request, path: Path, etag: str) -> Response:
+    """200 / 206 / 304 / 416 for an immutable file with a strong ETag"""
+    stat = os.stat(path)
+    size = stat.st_size
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    send_body = request.method != "HEAD"
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            return FileRangeResponse(path, start, end, 206, headers, send_body)
+
+    return FileRangeResponse(path, 0, size - 1, 200, headers, send_body)
@@ -0,0 +1,273 @@
+"""Minimal Prometheus-style metrics (text exposition format 0.0.4).
+
+Recording is a dict lookup and an add under a per-metric lock, so it is cheap
+enough for hot paths. Gauges can be callbacks evaluated only when scraped.
+"""
+from __future__ import annotations
+
+import bisect
+import contextvars
+import threading
+from time import perf_counter
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+INF_LABEL = 'le="+Inf"'
+# Seconds; covers fast API routes through slow browser uploads
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _label_text(self, key: tuple, extra: str = "") -> str:
+        parts = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._label_text(key)} {_number(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Set directly, or pass ``callback`` returning ``{label tuple: value}`` / a number"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), callback=None):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self):
+        if self._callback is not None:
+            values = self._callback()
+            items = values.items() if isinstance(values, dict) else [((), values)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{self._label_text(tuple(key))} {_number(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels) -> "_Timer":
+        """``with histogram.time(phase="upload"): ...``"""
+        return _Timer(self, labels)
+
+    def totals(self) -> dict:
+        """``{label tuple: (count, sum)}`` for every series"""
+        with self._lock:
+            return {key: (series[-1], series[-2]) for key, series in self._series.items()}
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{self._label_text(key, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._label_text(key, INF_LABEL)} {series[-1]}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {series[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(perf_counter() - self.started, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as exc:  # noqa: BLE001
+                # A broken gauge callback must not take the whole scrape down
+                lines.append(f"# {metric.name} unavailable: {exc}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+registry = Registry()
+
+
+# Per-request query counting: the middleware installs a holder, the engine hook
+# bumps it. A mutable holder survives the context copy into the threadpool that
+# runs sync endpoints.
+_request_queries = contextvars.ContextVar("request_queries", default=None)
+
+
+def start_query_count() -> tuple[list, contextvars.Token]:
+    holder = [0]
+    return holder, _request_queries.set(holder)
+
+
+def stop_query_count(token: contextvars.Token) -> None:
+    _request_queries.reset(token)
+
+
+def count_query() -> None:
+    holder = _request_queries.get()
+    if holder is not None:
+        holder[0] += 1
+    db_queries_total.inc()
+
+
+# Shared metric definitions
+dispatch_lateness_seconds = Histogram(
+    "tiktok_dispatch_lateness_seconds",
+    "Upload start minus scheduled_time, first attempts only",
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+)
+upload_phase_seconds = Histogram(
+    "tiktok_upload_phase_seconds",
+    "Time spent in each phase of an upload attempt",
+    labels=("phase",),
+)
+upload_attempts_total = Counter(
+    "tiktok_upload_attempts_total",
+    "Upload attempts by outcome and failure class",
+    labels=("outcome", "failure_class"),
+)
+http_request_duration_seconds = Histogram(
+    "tiktok_http_request_duration_seconds",
+    "API request latency by route",
+    labels=("method", "route", "status"),
+)
+db_queries_per_request = Histogram(
+    "tiktok_db_queries_per_request",
+    "SQL statements executed per API request",
+    labels=("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+db_queries_total = Counter("tiktok_db_queries_total", "SQL statements executed by this process")
+dispatch_deferred_total = Counter(
+    "tiktok_dispatch_deferred_total",
+    "Due uploads pushed back by the per-account rate limit",
+    labels=("account",),
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and query count per route.
+
+    Messages pass through untouched, so streaming and zero-copy responses
+    behave exactly as without it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        queries, token = start_query_count()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            stop_query_count(token)
+            # The router stores the matched route in the scope; use its template
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_duration_seconds.observe(
+                perf_counter() - started, method=scope["method"], route=route, status=status[0]
+            )
+            db_queries_per_request.observe(queries[0], route=route)
@@ -1,9 +1,45 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
 
 
+class ChangeCounter(Base):
+    """Named monotonic counters; see change_feed.py"""
+    __tablename__ = "change_counters"
+    
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class LeaderLease(Base):
+    """Which process runs a singleton loop, until ``expires_at``; see leader.py"""
+    __tablename__ = "leader_leases"
+    
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class RateLimitState(Base):
+    """Token bucket state per account, shared by every dispatching process; see rate_limit.py"""
+    __tablename__ = "rate_limit_state"
+    
+    account = Column(String, primary_key=True)
+    tat = Column(DateTime(timezone=True), nullable=True)  # theoretical arrival time (GCRA)
+    last = Column(DateTime(timezone=True), nullable=True)  # last post
+
+
+class VideoBlob(Base):
+    __tablename__ = "video_blobs"
+    
+    sha256 = Column(String, primary_key=True)
+    file_path = Column(String, nullable=False)
+    file_size = Column(Integer)
+    ref_count = Column(Integer, nullable=False, default=0)  # Videos sharing this file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class Video(Base):
     __tablename__ = "videos"
     
@@ -13,18 +49,76 @@ class Video(Base):
     file_path = Column(String, nullable=False)
     description = Column(Text)
     thumbnail_path = Column(String, nullable=True)
+    preview_path = Column(String, nullable=True)  # low-bitrate clip for library/calendar tiles
+    upload_path = Column(String, nullable=True)  # TikTok-ready transcode, when the original isn't
+    
+    # Pre-flight probe (see preflight.py); None until probed or when ffprobe is missing
+    duration_seconds = Column(Float, nullable=True)
+    video_codec = Column(String, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    bitrate = Column(Integer, nullable=True)  # bits per second
+    preflight_status = Column(String, nullable=True, index=True)  # needs_probe, probing, probe_timeout, ok, needs_transcode, transcoding, transcoded, transcode_failed, rejected
+    preflight_error = Column(Text, nullable=True)
+    # Lease on a running probe or transcode, renewed by its worker; for probe_timeout, the retry time.
+    # See preflight.TranscodeQueue
+    preflight_owner = Column(String, nullable=True)
+    preflight_lease_expires_at = Column(DateTime(timezone=True), nullable=True)
     file_size = Column(Integer)
+    content_hash = Column(String, ForeignKey("video_blobs.sha256"), nullable=True, index=True)  # None for pre-dedup uploads
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     schedules = relationship("ScheduledUpload", back_populates="video", cascade="all, delete-orphan")
 
 
+class Account(Base):
+    """A TikTok account; each has its own cookie file (see accounts.py)"""
+    __tablename__ = "accounts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    cookies_path = Column(String, nullable=True)  # None until cookies are uploaded
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    schedules = relationship("ScheduledUpload", back_populates="account")
+
+
+class RecurrenceRule(Base):
+    """A repeating post series; occurrences are materialized lazily (see recurrence.py)"""
+    __tablename__ = "recurrence_rules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_ids = Column(Text, nullable=False)  # JSON list; occurrences rotate through it
+    description = Column(Text, nullable=False)
+    frequency = Column(String, nullable=False)  # daily, weekly
+    interval = Column(Integer, nullable=False, default=1)  # every N days / weeks
+    times = Column(Text, nullable=False)  # JSON list of "HH:MM"
+    weekdays = Column(Text, nullable=True)  # JSON list of 0-6 (Monday = 0), weekly only
+    starts_at = Column(DateTime(timezone=True), nullable=False)
+    ends_at = Column(DateTime(timezone=True), nullable=True)
+    count = Column(Integer, nullable=True)  # stop after this many occurrences
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
+    active = Column(Boolean, nullable=False, default=True)
+    materialized_until = Column(DateTime(timezone=True), nullable=True)  # rows exist before this
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class ScheduledUpload(Base):
     __tablename__ = "scheduled_uploads"
+    __table_args__ = (
+        # Scheduler due scan (status = 'pending' AND scheduled_time <= now)
+        Index("ix_scheduled_uploads_status_time", "status", "scheduled_time"),
+        # Calendar range queries and keyset pagination
+        Index("ix_scheduled_uploads_time_id", "scheduled_time", "id"),
+        # One row per rule occurrence, however many times the horizon is re-expanded
+        Index("ux_scheduled_uploads_rule_occurrence", "rule_id", "occurrence_index", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    video_id = Column(Integer, ForeignKey("videos.id"), nullable=False)
+    video_id = Column(Integer, ForeignKey("videos.id"), nullable=False, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True, index=True)  # None: default cookies
     scheduled_time = Column(DateTime(timezone=True), nullable=False)
     description = Column(Text, nullable=False)
     status = Column(String, default="pending")  # pending, uploading, completed, failed, cancelled
@@ -32,6 +126,51 @@ class ScheduledUpload(Base):
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Dispatch lease - only the claim owner may upload; see upload_worker.claim_schedule
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Celery dispatcher: id of the live ETA task; any other task for this row is stale
+    dispatch_token = Column(String, nullable=True)
+    
+    # Retry state; a pending row is not due before next_attempt_at (see retry_policy.py)
+    attempt_count = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Set when the row was materialized from a RecurrenceRule
+    rule_id = Column(Integer, ForeignKey("recurrence_rules.id"), nullable=True)
+    occurrence_index = Column(Integer, nullable=True)
+    
+    # Value of the "schedules" change counter when this row last changed visibly
+    change_seq = Column(Integer, nullable=True, index=True)
+    
     # Relationships
     video = relationship("Video", back_populates="schedules")
+    account = relationship("Account", back_populates="schedules")
+    attempts = relationship(
+        "UploadAttempt",
+        back_populates="schedule",
+        cascade="all, delete-orphan",
+        order_by="UploadAttempt.attempt",
+    )
+
+
+class UploadAttempt(Base):
+    """One try at posting a schedule, kept for history and retry decisions"""
+    __tablename__ = "upload_attempts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    schedule_id = Column(Integer, ForeignKey("scheduled_uploads.id"), nullable=False, index=True)
+    attempt = Column(Integer, nullable=False)
+    worker = Column(String, nullable=True)  # lease token of the worker that ran it
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    outcome = Column(String, nullable=False)  # completed, failed
+    failure_class = Column(String, nullable=True)  # transient, auth, permanent
+    error_message = Column(Text, nullable=True)
+    retry_at = Column(DateTime(timezone=True), nullable=True)  # when the next attempt was scheduled for
+    posted_at = Column(DateTime(timezone=True), nullable=True)  # set the moment TikTok accepted the post
+    
+    schedule = relationship("ScheduledUpload", back_populates="attempts")
 
@@ -0,0 +1,529 @@
+"""Pre-flight checks: probe videos after ingest and transcode non-compliant ones before they're due.
+
+A file TikTok won't take otherwise fails only at post time, after several slow
+browser attempts. Probing up front turns unfixable files into an immediate
+permanent failure and gives the transcode queue time to fix the rest. Probes
+run on the same background workers as transcodes, so an upload request never
+waits on ffprobe.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import threading
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import and_, func, or_
+
+from database import SessionLocal
+from models import ScheduledUpload, Video
+from retry_policy import PERMANENT, UploadFailure
+
+FFPROBE = shutil.which("ffprobe")
+FFMPEG = shutil.which("ffmpeg")
+
+TRANSCODE_ENABLED = os.getenv("TRANSCODE_ENABLED", "1") == "1"
+_CPUS = os.cpu_count() or 2
+# Concurrent ffmpeg processes; each gets an equal share of the cores
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", str(max(_CPUS // 2, 1))))
+# Idle workers recheck the DB this often for jobs queued by other processes
+TRANSCODE_POLL_SECONDS = 60
+# A claimed probe or transcode is valid until its lease expires; the worker renews it while
+# ffprobe/ffmpeg runs, so a job left behind by a dead process is picked up once the lease lapses
+TRANSCODE_LEASE_SECONDS = int(os.getenv("TRANSCODE_LEASE_SECONDS", "300"))
+TRANSCODE_HEARTBEAT_SECONDS = max(TRANSCODE_LEASE_SECONDS // 3, 1)
+TRANSCODE_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+PROBE_TIMEOUT_SECONDS = 60
+# A probe that timed out (often just a loaded host) is tried again after this long
+PROBE_RETRY_SECONDS = int(os.getenv("PROBE_RETRY_SECONDS", "600"))
+
+# What the TikTok web uploader reliably accepts
+MAX_DURATION_SECONDS = 600
+MIN_DURATION_SECONDS = 1
+MAX_FILE_BYTES = 4 * 1024**3
+MAX_BITRATE = 50_000_000
+MAX_LONG_SIDE = 4096
+TRANSCODE_LONG_SIDE = 1920
+VIDEO_CODECS = {"h264", "hevc"}
+AUDIO_CODECS = {"aac", "mp3"}
+CONTAINERS = {"mov", "mp4"}
+
+NEEDS_PROBE = "needs_probe"
+PROBING = "probing"
+PROBE_TIMEOUT = "probe_timeout"
+OK = "ok"
+NEEDS_TRANSCODE = "needs_transcode"
+TRANSCODING = "transcoding"
+TRANSCODED = "transcoded"
+TRANSCODE_FAILED = "transcode_failed"
+REJECTED = "rejected"
+# Not a verdict on the content: a new copy is probed afresh rather than inheriting it
+UNPROBED = (PROBE_TIMEOUT,)
+# Statuses of a video whose probe is queued, running or due a retry
+PROBE_JOBS = (NEEDS_PROBE, PROBING, PROBE_TIMEOUT)
+# Running jobs, and the status each goes back to when its worker is gone
+RUNNING = {PROBING: NEEDS_PROBE, TRANSCODING: NEEDS_TRANSCODE}
+
+# Copied from a Video with the same content; a copy queued or running is finished with it
+PROBE_FIELDS = (
+    "duration_seconds", "video_codec", "width", "height", "bitrate",
+    "preflight_status", "preflight_error", "upload_path",
+    "preflight_owner", "preflight_lease_expires_at",
+)
+
+
+def probe(path: str) -> dict | None:
+    """Duration, codecs, resolution and bitrate via ffprobe; None if it can't read the file.
+
+    Raises subprocess.TimeoutExpired if ffprobe hangs for PROBE_TIMEOUT_SECONDS.
+    """
+    completed = subprocess.run(
+        [FFPROBE, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        capture_output=True,
+        timeout=PROBE_TIMEOUT_SECONDS,
+    )
+    if completed.returncode != 0:
+        return None
+    try:
+        data = json.loads(completed.stdout or b"{}")
+    except ValueError:
+        return None
+
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        return None
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    fmt = data.get("format", {})
+    return {
+        "duration_seconds": _number(fmt.get("duration") or video.get("duration"), float),
+        "video_codec": video.get("codec_name"),
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "pix_fmt": video.get("pix_fmt"),
+        "width": _number(video.get("width"), int),
+        "height": _number(video.get("height"), int),
+        "bitrate": _number(fmt.get("bit_rate"), int),
+        "containers": set((fmt.get("format_name") or "").split(",")),
+        "size": _number(fmt.get("size"), int),
+    }
+
+
+def _number(value, kind):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def assess(meta: dict | None) -> tuple[str, str | None]:
+    """``(preflight_status, reason)`` for probe output"""
+    if meta is None:
+        return REJECTED, "Not a readable video file"
+
+    duration = meta["duration_seconds"]
+    if duration is not None and duration > MAX_DURATION_SECONDS:
+        return REJECTED, f"Video is {duration:.0f}s long; TikTok allows at most {MAX_DURATION_SECONDS}s"
+    if duration is not None and duration < MIN_DURATION_SECONDS:
+        return REJECTED, f"Video is {duration:.1f}s long; TikTok needs at least {MIN_DURATION_SECONDS}s"
+
+    reasons = []
+    if meta["video_codec"] not in VIDEO_CODECS:
+        reasons.append(f"video codec {meta['video_codec']}")
+    if meta["audio_codec"] is not None and meta["audio_codec"] not in AUDIO_CODECS:
+        reasons.append(f"audio codec {meta['audio_codec']}")
+    if meta["pix_fmt"] not in (None, "yuv420p", "yuvj420p"):
+        reasons.append(f"pixel format {meta['pix_fmt']}")
+    if not CONTAINERS & meta["containers"]:
+        reasons.append("container " + ",".join(sorted(meta["containers"])))
+    width, height = meta["width"] or 0, meta["height"] or 0
+    if max(width, height) > MAX_LONG_SIDE:
+        reasons.append(f"resolution {width}x{height}")
+    if (meta["bitrate"] or 0) > MAX_BITRATE:
+        reasons.append(f"bitrate {meta['bitrate'] // 1000} kb/s")
+    if (meta["size"] or 0) > MAX_FILE_BYTES:
+        reasons.append("file size")
+    if reasons:
+        return NEEDS_TRANSCODE, "Needs transcoding: " + ", ".join(reasons)
+    return OK, None
+
+
+def check_video(db, video: Video) -> None:
+    """Set up pre-flight for a new Video (caller commits, then notifies ``transcode_queue``).
+
+    Content seen before (same ``content_hash``) reuses that result and any
+    transcode. Anything else is marked ``needs_probe`` for the transcode
+    workers. Without ffprobe the fields stay None and uploads go ahead
+    unchecked.
+    """
+    if video.content_hash:
+        sibling = (
+            db.query(Video)
+            .filter(
+                Video.content_hash == video.content_hash,
+                Video.preflight_status.isnot(None),
+                Video.preflight_status.notin_(UNPROBED),
+            )
+            .first()
+        )
+        if sibling is not None:
+            for field in PROBE_FIELDS:
+                setattr(video, field, getattr(sibling, field))
+            if video.preflight_status == TRANSCODE_FAILED:
+                video.preflight_status = NEEDS_TRANSCODE
+            # A queued or running copy is finished along with the sibling's job
+            return
+    if FFPROBE is not None:
+        video.preflight_status = NEEDS_PROBE
+
+
+def apply_probe(video: Video, meta: dict | None) -> None:
+    """Record probe output (or an unreadable file) on ``video``"""
+    video.preflight_status, video.preflight_error = assess(meta)
+    if meta is not None:
+        video.duration_seconds = meta["duration_seconds"]
+        video.video_codec = meta["video_codec"]
+        video.width = meta["width"]
+        video.height = meta["height"]
+        video.bitrate = meta["bitrate"]
+
+
+def upload_source(video: Video) -> str:
+    """The file to hand to the uploader; raises a permanent UploadFailure for rejected files"""
+    if video.preflight_status == REJECTED:
+        raise UploadFailure(f"Pre-flight check failed: {video.preflight_error}", PERMANENT)
+    if video.preflight_status in (NEEDS_PROBE, PROBING, PROBE_TIMEOUT):
+        print(f"[preflight] Video {video.id} not probed ({video.preflight_status}); uploading unchecked")
+    elif video.preflight_status in (NEEDS_TRANSCODE, TRANSCODING, TRANSCODE_FAILED):
+        print(f"[preflight] Video {video.id} not transcoded ({video.preflight_status}); uploading the original")
+    return video.upload_path or video.file_path
+
+
+def transcode(source_path: str, threads: int) -> str:
+    """Write ``<stem>.tiktok.mp4`` (H.264/AAC, yuv420p, long side <= 1920) beside the source.
+
+    The output is named after the content-addressed source, so an existing one
+    is reused. Raises RuntimeError with ffmpeg's message on failure.
+    """
+    source = Path(source_path)
+    output = source.with_name(f"{source.stem}.tiktok.mp4")
+    if output.exists():
+        return str(output)
+
+    partial = output.with_name(f"{output.name}.{os.getpid()}-{threading.get_ident()}.part")
+    # Shrink only; keep dimensions even for yuv420p
+    scale = f"scale=trunc(iw*min(1\\,{TRANSCODE_LONG_SIDE}/max(iw\\,ih))/2)*2:-2"
+    completed = subprocess.run(
+        [
+            FFMPEG, "-hide_banner", "-loglevel", "error", "-y",
+            "-i", str(source),
+            "-map", "0:v:0", "-map", "0:a:0?",
+            "-vf", scale, "-pix_fmt", "yuv420p",
+            "-c:v", "libx264", "-preset", "medium", "-crf", "20", "-profile:v", "high",
+            "-c:a", "aac", "-b:a", "128k", "-ar", "44100",
+            "-movflags", "+faststart", "-threads", str(threads),
+            "-f", "mp4", str(partial),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        timeout=3600,
+    )
+    if completed.returncode != 0:
+        partial.unlink(missing_ok=True)
+        raise RuntimeError(completed.stderr.decode(errors="replace").strip()[-500:] or "ffmpeg failed")
+    os.replace(partial, output)
+    return str(output)
+
+
+class TranscodeQueue:
+    """Probes new videos and transcodes those marked ``needs_transcode``.
+
+    The queue lives in the DB: each free worker claims a job with a
+    conditional UPDATE - probes first, since they are quick and decide what
+    else needs doing, then the video whose earliest pending schedule is
+    closest (unscheduled videos last). Priorities therefore follow
+    reschedules without any bookkeeping, and a restart loses nothing.
+    """
+
+    def __init__(self, max_workers: int = TRANSCODE_WORKERS):
+        self.max_workers = max(max_workers, 1)
+        self.ffmpeg_threads = max(_CPUS // self.max_workers, 1)
+        self._wake = threading.Condition()
+        self._threads = []
+        self._stats = {"probed": 0, "transcoded": 0, "failed": 0}
+
+    @property
+    def probing(self) -> bool:
+        return FFPROBE is not None
+
+    @property
+    def transcoding(self) -> bool:
+        return TRANSCODE_ENABLED and FFMPEG is not None
+
+    @property
+    def enabled(self) -> bool:
+        return self.probing or self.transcoding
+
+    def start(self) -> None:
+        """Requeue jobs whose worker stopped renewing its lease and start the workers.
+
+        Jobs still leased belong to a live process (another replica, or the
+        previous run of this one until its lease lapses) and are left alone;
+        workers claim them once the lease expires.
+        """
+        if not self.enabled:
+            return
+        now = datetime.now()
+        requeued = 0
+        db = SessionLocal()
+        try:
+            for running, queued in RUNNING.items():
+                requeued += (
+                    db.query(Video)
+                    .filter(_stale(running, now))
+                    .update(
+                        {
+                            Video.preflight_status: queued,
+                            Video.preflight_owner: None,
+                            Video.preflight_lease_expires_at: None,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+            db.commit()
+        finally:
+            db.close()
+        if requeued:
+            print(f"[transcode] Requeued {requeued} interrupted job(s)")
+        self.notify()
+
+    def notify(self) -> None:
+        """Wake idle workers after marking a video ``needs_probe`` or ``needs_transcode``"""
+        if not self.enabled:
+            return
+        with self._wake:
+            while len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, name=f"transcode-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._wake.notify_all()
+
+    def stats(self) -> dict:
+        db = SessionLocal()
+        try:
+            counts = dict(
+                db.query(Video.preflight_status, func.count(Video.id))
+                .filter(Video.preflight_status.in_((NEEDS_PROBE, PROBING, NEEDS_TRANSCODE, TRANSCODING)))
+                .group_by(Video.preflight_status)
+                .all()
+            )
+        finally:
+            db.close()
+        return {
+            "enabled": self.enabled,
+            "transcoding": self.transcoding,
+            "workers": self.max_workers,
+            "probes_queued": counts.get(NEEDS_PROBE, 0),
+            "probing": counts.get(PROBING, 0),
+            "queued": counts.get(NEEDS_TRANSCODE, 0),
+            "running": counts.get(TRANSCODING, 0),
+            **self._stats,
+        }
+
+    def _claimable(self, now: datetime):
+        jobs = []
+        if self.probing:
+            jobs += [
+                Video.preflight_status == NEEDS_PROBE,
+                # A timed-out probe holds its retry time in the lease column
+                and_(Video.preflight_status == PROBE_TIMEOUT, Video.preflight_lease_expires_at < now),
+                _stale(PROBING, now),
+            ]
+        if self.transcoding:
+            jobs += [Video.preflight_status == NEEDS_TRANSCODE, _stale(TRANSCODING, now)]
+        return or_(*jobs)
+
+    def _claim(self) -> tuple[int, str, str, str] | None:
+        """Take the most urgent job; ``(video_id, file_path, lease token, PROBING or TRANSCODING)``, or None"""
+        if not self.enabled:
+            return None
+        now = datetime.now()
+        claimable = self._claimable(now)
+        token = f"{TRANSCODE_WORKER_ID}:{uuid.uuid4().hex[:8]}"
+        db = SessionLocal()
+        try:
+            due = (
+                db.query(ScheduledUpload.video_id, func.min(ScheduledUpload.scheduled_time).label("due"))
+                .filter(ScheduledUpload.status == "pending")
+                .group_by(ScheduledUpload.video_id)
+                .subquery()
+            )
+            candidates = (
+                db.query(Video.id, Video.file_path, Video.preflight_status)
+                .outerjoin(due, due.c.video_id == Video.id)
+                .filter(claimable)
+                .order_by(Video.preflight_status.notin_(PROBE_JOBS), due.c.due.is_(None), due.c.due, Video.id)
+                .limit(self.max_workers + 1)
+                .all()
+            )
+            for video_id, file_path, status in candidates:
+                running = PROBING if status in PROBE_JOBS else TRANSCODING
+                claimed = (
+                    db.query(Video)
+                    .filter(Video.id == video_id, claimable)
+                    .update(
+                        {
+                            Video.preflight_status: running,
+                            Video.preflight_owner: token,
+                            Video.preflight_lease_expires_at: now + timedelta(seconds=TRANSCODE_LEASE_SECONDS),
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if claimed:
+                    return video_id, file_path, token, running
+            return None
+        finally:
+            db.close()
+
+    def _work(self) -> None:
+        while True:
+            try:
+                job = self._claim()
+            except Exception as exc:  # noqa: BLE001
+                print(f"[transcode] Claim failed: {exc}")
+                job = None
+            if job is None:
+                with self._wake:
+                    self._wake.wait(TRANSCODE_POLL_SECONDS)
+                continue
+
+            video_id, file_path, token, running = job
+            done = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(file_path, token, running, done), daemon=True)
+            heartbeat.start()
+            try:
+                if running == PROBING:
+                    self._run_probe(video_id, file_path)
+                else:
+                    self._run_transcode(video_id, file_path)
+            finally:
+                done.set()
+                heartbeat.join()
+
+    def _heartbeat(self, file_path: str, token: str, running: str, done: threading.Event) -> None:
+        """Renew the lease while the job runs, on every copy of the content it covers"""
+        while not done.wait(TRANSCODE_HEARTBEAT_SECONDS):
+            db = SessionLocal()
+            try:
+                (
+                    db.query(Video)
+                    .filter(
+                        Video.file_path == file_path,
+                        Video.preflight_status == running,
+                        Video.preflight_owner == token,
+                    )
+                    .update(
+                        {Video.preflight_lease_expires_at: datetime.now() + timedelta(seconds=TRANSCODE_LEASE_SECONDS)},
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+            except Exception as exc:  # noqa: BLE001
+                print(f"[transcode] Lease renewal failed: {exc}")
+            finally:
+                db.close()
+
+    def _run_transcode(self, video_id: int, file_path: str) -> None:
+        started = datetime.now()
+        try:
+            output, error = transcode(file_path, self.ffmpeg_threads), None
+        except Exception as exc:  # noqa: BLE001
+            output, error = None, str(exc)
+        self._finished(video_id, file_path, output, error)
+        print(
+            f"[transcode] Video {video_id}: {'done' if output else 'failed'} "
+            f"in {(datetime.now() - started).total_seconds():.0f}s"
+        )
+
+    def _run_probe(self, video_id: int, file_path: str) -> None:
+        try:
+            meta, error = probe(file_path), None
+        except subprocess.TimeoutExpired:
+            meta, error = None, f"ffprobe did not finish reading the file within {PROBE_TIMEOUT_SECONDS}s"
+        except Exception as exc:  # noqa: BLE001
+            meta, error = None, f"ffprobe failed: {exc}"
+        status = self._probed(file_path, meta, error)
+        if status is None:
+            # Deleted while it was probed
+            return
+        if status == NEEDS_TRANSCODE:
+            self.notify()
+        print(f"[preflight] Video {video_id}: {status}" + (f" ({error}); retrying later" if error else ""))
+
+    def _probed(self, file_path: str, meta: dict | None, error: str | None) -> str | None:
+        """Record a probe on every copy of the content awaiting one; returns the new status (None if none are left).
+
+        ``error`` means the probe itself failed rather than the file: the
+        copies become ``probe_timeout`` and are probed again after
+        PROBE_RETRY_SECONDS.
+        """
+        with self._wake:
+            self._stats["probed"] += 1
+        db = SessionLocal()
+        try:
+            videos = db.query(Video).filter(
+                Video.file_path == file_path,
+                Video.preflight_status.in_(PROBE_JOBS),
+            )
+            status = None
+            for video in videos:
+                video.preflight_owner = video.preflight_lease_expires_at = None
+                if error:
+                    video.preflight_status, video.preflight_error = PROBE_TIMEOUT, error
+                    video.preflight_lease_expires_at = datetime.now() + timedelta(seconds=PROBE_RETRY_SECONDS)
+                else:
+                    apply_probe(video, meta)
+                status = video.preflight_status
+            db.commit()
+            return status
+        finally:
+            db.close()
+
+    def _finished(self, video_id: int, file_path: str, output: str | None, error: str | None) -> None:
+        with self._wake:
+            self._stats["transcoded" if output else "failed"] += 1
+        db = SessionLocal()
+        try:
+            # Every Video sharing the content shares the transcode
+            videos = db.query(Video).filter(
+                Video.file_path == file_path,
+                Video.preflight_status.in_((NEEDS_TRANSCODE, TRANSCODING)),
+            )
+            for video in videos:
+                video.preflight_owner = video.preflight_lease_expires_at = None
+                if output:
+                    video.upload_path = output
+                    video.preflight_status = TRANSCODED
+                else:
+                    video.preflight_status = TRANSCODE_FAILED
+                    video.preflight_error = f"Transcode failed: {error}"
+            db.commit()
+        finally:
+            db.close()
+
+
+def _stale(running: str, now: datetime):
+    """Videos left ``running`` (probing or transcoding) by a worker that stopped renewing its lease"""
+    return and_(
+        Video.preflight_status == running,
+        or_(Video.preflight_lease_expires_at.is_(None), Video.preflight_lease_expires_at < now),
+    )
+
+
+transcode_queue = TranscodeQueue()
@@ -0,0 +1,196 @@
+"""Per-account posting rate limits for the dispatch path, shared across processes through the DB"""
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from database import SessionLocal
+from models import RateLimitState
+
+# Sustained posting rate per account; 0 disables the rate limit
+POSTS_PER_HOUR = float(os.getenv("UPLOAD_POSTS_PER_HOUR", "10"))
+# Posts an idle account may make back to back before the rate applies
+POSTS_BURST = int(os.getenv("UPLOAD_POSTS_BURST", "3"))
+# Minimum gap between any two posts on one account; 0 disables
+MIN_SPACING_SECONDS = float(os.getenv("UPLOAD_MIN_SPACING_SECONDS", "120"))
+
+
+class TokenBucket:
+    """Token bucket kept as a theoretical arrival time (GCRA), plus a minimum spacing.
+
+    ``slot(t)`` is the earliest time at or after ``t`` a post conforms;
+    ``take(t)`` records a post made at ``t``.
+    """
+
+    def __init__(self, posts_per_hour: float, burst: int, min_spacing_seconds: float):
+        self.interval = timedelta(seconds=3600 / posts_per_hour) if posts_per_hour > 0 else timedelta(0)
+        self.tolerance = self.interval * (max(burst, 1) - 1)
+        self.spacing = timedelta(seconds=max(min_spacing_seconds, 0))
+        self.tat = None
+        self.last = None
+
+    def slot(self, when: datetime, state=None) -> datetime:
+        tat, last = state if state is not None else (self.tat, self.last)
+        earliest = when
+        if tat is not None:
+            earliest = max(earliest, tat - self.tolerance)
+        if last is not None:
+            earliest = max(earliest, last + self.spacing)
+        return earliest
+
+    def take(self, when: datetime, state=None):
+        tat, last = state if state is not None else (self.tat, self.last)
+        tat = max(tat or when, when) + self.interval
+        last = max(last or when, when)
+        if state is None:
+            self.tat, self.last = tat, last
+        return tat, last
+
+    def refund(self, when: datetime, state=None):
+        """Undo ``take(when)`` for a post that didn't happen.
+
+        Exact for every later slot: removing one interval from the arrival
+        time is what the take added, and a ``last`` of ``when - spacing``
+        constrains nothing at or after ``when``, as the post before it didn't.
+        """
+        tat, last = state if state is not None else (self.tat, self.last)
+        if tat is not None:
+            tat = tat - self.interval
+        if last == when:
+            last = when - self.spacing
+        if state is None:
+            self.tat, self.last = tat, last
+        return tat, last
+
+    def plan(self, due_times: list[datetime], state=None) -> list[datetime]:
+        """Predicted post time for each due time (in order) without consuming tokens"""
+        state = state if state is not None else (self.tat, self.last)
+        slots = []
+        for due in due_times:
+            slot = self.slot(due, state)
+            state = self.take(slot, state)
+            slots.append(slot)
+        return slots
+
+
+class RateLimiter:
+    """One ``TokenBucket`` per account, shared by every dispatching process.
+
+    Bucket state lives in the ``rate_limit_state`` table, so the API, any
+    number of schedulers and every Celery worker draw on the same tokens.
+    ``acquire`` checks and takes a token in one write transaction; SQLite's
+    write lock makes that atomic across processes.
+    """
+
+    def __init__(
+        self,
+        posts_per_hour: float = POSTS_PER_HOUR,
+        burst: int = POSTS_BURST,
+        min_spacing_seconds: float = MIN_SPACING_SECONDS,
+        session_factory=SessionLocal,
+    ):
+        self.posts_per_hour = posts_per_hour
+        self.burst = burst
+        self.min_spacing_seconds = min_spacing_seconds
+        self._bucket = TokenBucket(posts_per_hour, burst, min_spacing_seconds)
+        self._session_factory = session_factory
+
+    @property
+    def enabled(self) -> bool:
+        return self.posts_per_hour > 0 or self.min_spacing_seconds > 0
+
+    def _session(self):
+        return self._session_factory()
+
+    @staticmethod
+    def _state(row) -> tuple:
+        if row is None:
+            return None, None
+        return _naive(row.tat), _naive(row.last)
+
+    def _locked_state(self, db, account: str):
+        """The account's row, created if missing; the INSERT takes the write lock first"""
+        db.execute(insert(RateLimitState).prefix_with("OR IGNORE").values(account=account))
+        return db.get(RateLimitState, account, populate_existing=True)
+
+    def plan(self, account: str, due_times: list[datetime], now: datetime) -> list[datetime]:
+        """Post slots for due times sorted ascending; overdue items are planned from ``now``"""
+        due_times = [max(due, now) for due in due_times]
+        if not self.enabled:
+            return due_times
+        db = self._session()
+        try:
+            state = self._state(db.get(RateLimitState, account))
+        finally:
+            db.close()
+        return self._bucket.plan(due_times, state)
+
+    def take(self, account: str, when: datetime) -> None:
+        """Record a post at ``when`` whether or not it conforms (e.g. "post now")"""
+        if not self.enabled:
+            return
+        db = self._session()
+        try:
+            row = self._locked_state(db, account)
+            row.tat, row.last = self._bucket.take(when, self._state(row))
+            db.commit()
+        finally:
+            db.close()
+
+    def acquire(self, account: str, now: datetime) -> datetime | None:
+        """Take a token for a post at ``now`` if it conforms; otherwise the slot when it will"""
+        if not self.enabled:
+            return None
+        db = self._session()
+        try:
+            row = self._locked_state(db, account)
+            state = self._state(row)
+            slot = self._bucket.slot(now, state)
+            if slot > now:
+                db.rollback()
+                return slot
+            row.tat, row.last = self._bucket.take(now, state)
+            db.commit()
+            return None
+        finally:
+            db.close()
+
+    def refund(self, account: str, when: datetime) -> None:
+        """Give back the token taken for a post at ``when`` that was not made"""
+        if not self.enabled:
+            return
+        db = self._session()
+        try:
+            row = self._locked_state(db, account)
+            row.tat, row.last = self._bucket.refund(when, self._state(row))
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        now = datetime.now()
+        db = self._session()
+        try:
+            rows = db.query(RateLimitState).all() if self.enabled else []
+            next_slot = {row.account: self._bucket.slot(now, self._state(row)) for row in rows}
+        finally:
+            db.close()
+        return {
+            "enabled": self.enabled,
+            "posts_per_hour": self.posts_per_hour,
+            "burst": self.burst,
+            "min_spacing_seconds": self.min_spacing_seconds,
+            "next_slot": next_slot,
+        }
+
+
+def _naive(value: datetime | None) -> datetime | None:
+    """Stored as naive local time; normalise aware values to match"""
+    if value is not None and value.tzinfo:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+dispatch_limiter = RateLimiter()
@@ -0,0 +1,156 @@
+"""Recurring schedules - expand RecurrenceRule occurrences on demand, materialize a rolling horizon"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import insert
+
+from change_feed import next_change_seq
+from models import RecurrenceRule, ScheduledUpload, Video
+
+# The scheduler keeps concrete ScheduledUpload rows this far ahead of now
+RECURRENCE_HORIZON_HOURS = int(os.getenv("RECURRENCE_HORIZON_HOURS", "48"))
+
+
+def _slot_layout(rule: RecurrenceRule):
+    """(anchor date, period length in days, day offsets within a period, times of day)"""
+    times = sorted(time.fromisoformat(value) for value in json.loads(rule.times))
+    start_day = rule.starts_at.date()
+    if rule.frequency == "weekly":
+        weekdays = sorted(set(json.loads(rule.weekdays or "[]"))) or [start_day.weekday()]
+        anchor = start_day - timedelta(days=start_day.weekday())
+        return anchor, 7 * rule.interval, weekdays, times
+    return start_day, rule.interval, [0], times
+
+
+def occurrences(rule: RecurrenceRule, window_start: datetime, window_end: datetime):
+    """Yield ``(index, scheduled_time, video_id)`` for occurrences in [window_start, window_end).
+
+    Cost is proportional to the window, not to how far it is from ``starts_at``:
+    the first period is found arithmetically and the index follows from it.
+    """
+    video_ids = json.loads(rule.video_ids)
+    anchor, period_days, day_offsets, times = _slot_layout(rule)
+    per_period = len(day_offsets) * len(times)
+    window_start = max(window_start, rule.starts_at)
+
+    # Slots in the first period that fall before starts_at don't count as occurrences
+    skipped = sum(
+        datetime.combine(anchor + timedelta(days=offset), at) < rule.starts_at
+        for offset in day_offsets
+        for at in times
+    )
+
+    period = max((window_start.date() - anchor).days // period_days, 0)
+    while True:
+        period_start = anchor + timedelta(days=period * period_days)
+        if datetime.combine(period_start, time.min) >= window_end:
+            return
+        for day_position, offset in enumerate(day_offsets):
+            day = period_start + timedelta(days=offset)
+            for time_position, at in enumerate(times):
+                when = datetime.combine(day, at)
+                if when < rule.starts_at:
+                    continue
+                index = period * per_period + day_position * len(times) + time_position - skipped
+                if when >= window_end:
+                    return
+                if rule.ends_at and when > rule.ends_at:
+                    return
+                if rule.count is not None and index >= rule.count:
+                    return
+                if when >= window_start:
+                    yield index, when, video_ids[index % len(video_ids)]
+        period += 1
+
+
+def _existing_video_ids(db, rules) -> set[int]:
+    """Ids among the rules' rotations that still have a Video row"""
+    wanted = {video_id for rule in rules for video_id in json.loads(rule.video_ids)}
+    if not wanted:
+        return set()
+    return {row.id for row in db.query(Video.id).filter(Video.id.in_(wanted))}
+
+
+def remove_video(db, video_id: int) -> list[int]:
+    """Take a deleted video out of every active rule's rotation.
+
+    A rule left without videos is deactivated. Does not commit. Returns the ids
+    of the rules that changed.
+    """
+    changed = []
+    for rule in db.query(RecurrenceRule).filter(RecurrenceRule.active.is_(True)).all():
+        video_ids = json.loads(rule.video_ids)
+        if video_id not in video_ids:
+            continue
+        remaining = [other for other in video_ids if other != video_id]
+        if remaining:
+            rule.video_ids = json.dumps(remaining)
+        else:
+            rule.active = False
+        changed.append(rule.id)
+    return changed
+
+
+def virtual_occurrences(db, window_start: datetime, window_end: datetime) -> list[dict]:
+    """Occurrences in the window that have no ScheduledUpload row yet"""
+    expanded = []
+    rules = db.query(RecurrenceRule).filter(RecurrenceRule.active.is_(True)).all()
+    for rule in rules:
+        start = max(window_start, rule.materialized_until or window_start)
+        for index, when, video_id in occurrences(rule, start, window_end):
+            expanded.append({
+                "rule_id": rule.id,
+                "occurrence_index": index,
+                "video_id": video_id,
+                "scheduled_time": when,
+                "description": rule.description,
+                "account_id": rule.account_id,
+            })
+    return expanded
+
+
+def materialize(db, until: datetime | None = None, rule_ids=None) -> list[tuple[int, datetime]]:
+    """Insert rows for occurrences up to ``until`` (default: now + horizon).
+
+    Does not commit. Returns ``(schedule_id, scheduled_time, account_id)`` for the new rows.
+    """
+    until = until or datetime.now() + timedelta(hours=RECURRENCE_HORIZON_HOURS)
+    query = db.query(RecurrenceRule).filter(RecurrenceRule.active.is_(True))
+    if rule_ids is not None:
+        query = query.filter(RecurrenceRule.id.in_(rule_ids))
+
+    rules = [rule for rule in query.all() if (rule.materialized_until or rule.starts_at) < until]
+    # A video deleted out from under a rule is skipped rather than left dangling
+    existing = _existing_video_ids(db, rules)
+    rows = []
+    for rule in rules:
+        start = rule.materialized_until or rule.starts_at
+        rows.extend(
+            {
+                "video_id": video_id,
+                "scheduled_time": when,
+                "description": rule.description,
+                "status": "pending",
+                "rule_id": rule.id,
+                "occurrence_index": index,
+                "account_id": rule.account_id,
+            }
+            for index, when, video_id in occurrences(rule, start, until)
+            if video_id in existing
+        )
+        rule.materialized_until = until
+
+    if not rows:
+        return []
+    change_seq = next_change_seq(db.connection())
+    # Re-expanding an overlapping window is harmless: existing occurrences are skipped
+    created = db.execute(
+        insert(ScheduledUpload)
+        .prefix_with("OR IGNORE")
+        .returning(ScheduledUpload.id, ScheduledUpload.scheduled_time, ScheduledUpload.account_id),
+        [{**row, "change_seq": change_seq} for row in rows],
+    ).all()
+    return [(row.id, row.scheduled_time, row.account_id) for row in created]
@@ -0,0 +1,100 @@
+"""Failure classification and backoff policy for upload attempts"""
+from __future__ import annotations
+
+import os
+import random
+
+TRANSIENT = "transient"  # timeouts, flaky page loads, network hiccups
+AUTH = "auth"  # expired / invalid cookies, login walls
+PERMANENT = "permanent"  # TikTok rejected the content or the file is unusable
+
+_AUTH_MARKERS = (
+    "cookie",
+    "sessionid",
+    "login",
+    "log in",
+    "logged out",
+    "not logged",
+    "authenticat",
+    "unauthori",
+)
+_PERMANENT_MARKERS = (
+    "no such file",
+    "file not found",
+    "unsupported",
+    "invalid file",
+    "too large",
+    "too long",
+    "too short",
+    "violat",
+    "community guidelines",
+    "copyright",
+    "rejected",
+    "not eligible",
+)
+_PERMANENT_EXCEPTIONS = (FileNotFoundError, IsADirectoryError, PermissionError)
+
+
+class RetryPolicy:
+    """Retry budget with exponential backoff and equal jitter"""
+
+    def __init__(self, max_attempts: int, base_delay_seconds: float, max_delay_seconds: float):
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+
+    def next_delay(self, attempt: int, rng=random) -> float | None:
+        """Seconds to wait before the attempt after ``attempt``; None when out of attempts"""
+        if attempt >= self.max_attempts:
+            return None
+        ceiling = min(self.max_delay_seconds, self.base_delay_seconds * 2 ** (attempt - 1))
+        # Half fixed, half random: spreads out retries of a burst of failures
+        # without ever retrying almost immediately
+        return ceiling / 2 + rng.uniform(0, ceiling / 2)
+
+
+POLICIES = {
+    TRANSIENT: RetryPolicy(
+        max_attempts=int(os.getenv("UPLOAD_RETRY_MAX_ATTEMPTS", "5")),
+        base_delay_seconds=float(os.getenv("UPLOAD_RETRY_BASE_SECONDS", "30")),
+        max_delay_seconds=float(os.getenv("UPLOAD_RETRY_MAX_SECONDS", "1800")),
+    ),
+    # Retrying soon cannot fix bad cookies; leave time for them to be refreshed
+    AUTH: RetryPolicy(
+        max_attempts=int(os.getenv("UPLOAD_AUTH_RETRY_MAX_ATTEMPTS", "2")),
+        base_delay_seconds=float(os.getenv("UPLOAD_AUTH_RETRY_SECONDS", "900")),
+        max_delay_seconds=float(os.getenv("UPLOAD_AUTH_RETRY_SECONDS", "900")),
+    ),
+    PERMANENT: RetryPolicy(max_attempts=1, base_delay_seconds=0, max_delay_seconds=0),
+}
+
+
+class UploadFailure(Exception):
+    """A failure detected before or around the upload whose class is already known"""
+
+    def __init__(self, message: str, failure_class: str):
+        super().__init__(message)
+        self.failure_class = failure_class
+
+
+def classify_failure(failure) -> str:
+    """Classify an exception raised by, or a failure value returned from, ``upload_video``.
+
+    A returned failure list only says the upload didn't go through; it carries
+    the video's own fields (caption included), so it is not searched for
+    markers and counts as transient. Exceptions are matched on their type and
+    message only.
+    """
+    if isinstance(failure, UploadFailure):
+        return failure.failure_class
+    if not isinstance(failure, BaseException):
+        return TRANSIENT
+    if isinstance(failure, _PERMANENT_EXCEPTIONS):
+        return PERMANENT
+
+    text = f"{type(failure).__name__}: {failure}".lower()
+    if any(marker in text for marker in _AUTH_MARKERS):
+        return AUTH
+    if any(marker in text for marker in _PERMANENT_MARKERS):
+        return PERMANENT
+    return TRANSIENT
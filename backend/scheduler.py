@@ -1,66 +1,338 @@
-"""Simple background scheduler - checks every minute for pending uploads"""
+"""Background scheduler - sleeps until the next pending upload is due"""
+from __future__ import annotations
+
+import heapq
+import os
+import sys
 import time
 from datetime import datetime
 import threading
+from collections import defaultdict
+
+from sqlalchemy import func
 
+from change_feed import current_change_seq
 from database import SessionLocal
+from leader import LeaderElection, scheduler_leader
 from models import ScheduledUpload
-from upload_worker import process_schedule
+from upload_pool import upload_pool
+from metrics import dispatch_deferred_total
+from rate_limit import dispatch_limiter
+from upload_worker import recover_orphaned_uploads
+from accounts import DISPATCH_ACCOUNTS, account_key, parse_shard
+from recurrence import materialize
+
+# Safety net for rows written outside this process (manual_upload.py, Celery, sqlite CLI)
+# and for leases abandoned by crashed workers; also rolls the recurrence horizon forward
+RESYNC_INTERVAL_SECONDS = 15 * 60
+# How often a standalone scheduler (cli.py scheduler) checks the change feed for rows the API wrote
+SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "5"))
+# The same for the scheduler inside the API. Its own writes reach the queue directly, so by
+# default it relies on the periodic resync; set it when several API replicas dispatch
+API_SCHEDULER_POLL_SECONDS = float(os.getenv("API_SCHEDULER_POLL_SECONDS", "0"))
+
+
+class DeadlineQueue:
+    """In-memory min-heap of pending schedule deadlines.
+
+    Entries are invalidated lazily: the heap may hold stale (time, id) pairs,
+    but only the pair matching ``_deadlines[id]`` is ever dispatched.
+
+    ``shard`` (account keys, see accounts.py) restricts the queue to those
+    accounts so separate processes can each drain their own accounts.
+    """
+
+    def __init__(self, shard=None):
+        self.shard = shard
+        self._heap = []
+        self._deadlines = {}
+        self._accounts = {}
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._deadlines)
+
+    def load(self) -> int:
+        """Replace the queue contents with every pending schedule in the DB"""
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(
+                    ScheduledUpload.id,
+                    func.coalesce(ScheduledUpload.next_attempt_at, ScheduledUpload.scheduled_time).label("due"),
+                    ScheduledUpload.account_id,
+                )
+                .filter(ScheduledUpload.status == "pending")
+                .all()
+            )
+        finally:
+            db.close()
+
+        rows = [row for row in rows if self._serves(account_key(row.account_id))]
+        with self._cond:
+            # Rows waiting out a retry backoff are due at next_attempt_at
+            self._deadlines = {row.id: _naive(row.due) for row in rows}
+            self._accounts = {row.id: account_key(row.account_id) for row in rows}
+            self._heap = [(when, schedule_id) for schedule_id, when in self._deadlines.items()]
+            heapq.heapify(self._heap)
+            self._cond.notify_all()
+        return len(rows)
+
+    def _serves(self, key: str) -> bool:
+        return self.shard is None or key in self.shard
+
+    def push(self, schedule_id: int, scheduled_time: datetime, account_id: int | None = None) -> None:
+        """Add or reschedule a pending upload and wake the scheduler if it is now first"""
+        self.requeue(schedule_id, scheduled_time, account_key(account_id))
+
+    def requeue(self, schedule_id: int, scheduled_time: datetime, key: str) -> None:
+        """``push`` by account key, e.g. for an entry just returned by ``pop_due``"""
+        if not self._serves(key):
+            self.discard(schedule_id)
+            return
+        when = _naive(scheduled_time)
+        with self._cond:
+            self._deadlines[schedule_id] = when
+            self._accounts[schedule_id] = key
+            heapq.heappush(self._heap, (when, schedule_id))
+            if self._heap[0] == (when, schedule_id):
+                self._cond.notify_all()
+
+    def discard(self, schedule_id: int) -> None:
+        """Forget a schedule (cancelled, deleted or dispatched elsewhere)"""
+        with self._cond:
+            self._deadlines.pop(schedule_id, None)
+            self._accounts.pop(schedule_id, None)
+
+    def next_deadline(self):
+        with self._cond:
+            self._prune()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> list:
+        """Remove and return ``(scheduled_time, id, account key)`` for every schedule due by ``now``"""
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                when, schedule_id = heapq.heappop(self._heap)
+                if self._deadlines.get(schedule_id) == when:
+                    del self._deadlines[schedule_id]
+                    due.append((when, schedule_id, self._accounts.pop(schedule_id)))
+        return due
+
+    def wait(self, max_seconds: float) -> None:
+        """Block until the next deadline, a queue change or ``max_seconds``"""
+        with self._cond:
+            self._prune()
+            timeout = max_seconds
+            if self._heap:
+                until_due = (self._heap[0][0] - datetime.now()).total_seconds()
+                timeout = min(timeout, max(until_due, 0))
+            if timeout > 0:
+                self._cond.wait(timeout)
+
+    def _prune(self) -> None:
+        # Drop stale heap heads so waits are computed from a live deadline
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+
+def _naive(value: datetime) -> datetime:
+    """Schedules are stored in naive local time; normalise aware values to match"""
+    if value.tzinfo:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+deadline_queue = DeadlineQueue(parse_shard(DISPATCH_ACCOUNTS))
+
+
+def materialize_recurrences() -> int:
+    """Turn recurring-rule occurrences inside the horizon into pending rows"""
+    db = SessionLocal()
+    try:
+        created = materialize(db)
+        db.commit()
+    finally:
+        db.close()
+    for schedule_id, scheduled_time, account_id in created:
+        deadline_queue.push(schedule_id, scheduled_time, account_id)
+    return len(created)
+
 
 def check_and_upload():
-    """Check for uploads that are due and process them"""
+    """Hand every upload whose deadline has passed to the worker pool.
+
+    Posts beyond the account's rate limit go back on the deadline queue at the
+    slot the token bucket predicts for them, so bursts are spread out rather
+    than fired back to back.
+    """
+    # Use local time (no timezone)
+    now = datetime.now()
+    due = deadline_queue.pop_due(now)
+
+    if not due:
+        return
+
+    print(f"[{now.strftime('%H:%M:%S')}] Found {len(due)} upload(s) to process")
+
+    by_account = defaultdict(list)
+    for scheduled_time, schedule_id, account in due:
+        by_account[account].append((scheduled_time, schedule_id))
+
+    deferred = []
+    for account, items in by_account.items():
+        slots = dispatch_limiter.plan(account, [when for when, _ in items], now)
+        for (scheduled_time, schedule_id), slot in zip(items, slots):
+            if slot <= now:
+                # Another process may have taken the token since the plan was read
+                slot = dispatch_limiter.acquire(account, now) or slot
+            if slot > now:
+                deadline_queue.requeue(schedule_id, slot, account)
+                dispatch_deferred_total.inc(account=account)
+                deferred.append(slot)
+                continue
+            print(f"  📤 Queueing schedule {schedule_id} ({account})")
+            upload_pool.submit(schedule_id, scheduled_time, account)
+
+    if deferred:
+        print(f"  ⏳ {len(deferred)} upload(s) deferred by the rate limit, next at {min(deferred):%H:%M:%S}")
+
+
+def predicted_post_times(db, until: datetime | None = None, account_id: int | None = None) -> dict:
+    """Predicted actual post time for pending schedules due by ``until``, keyed by id.
+
+    Replays the pending queue, in due order, through the rate limiter without
+    consuming any tokens. ``account_id`` limits it to one account's posts.
+    """
+    due = func.coalesce(ScheduledUpload.next_attempt_at, ScheduledUpload.scheduled_time)
+    query = db.query(ScheduledUpload.id, due.label("due"), ScheduledUpload.account_id).filter(
+        ScheduledUpload.status == "pending"
+    )
+    if until is not None:
+        query = query.filter(due <= until)
+    if account_id is not None:
+        query = query.filter(ScheduledUpload.account_id == account_id)
+    rows = query.order_by(due, ScheduledUpload.id).all()
+    if not rows:
+        return {}
+
+    by_account = defaultdict(list)
+    for row in rows:
+        by_account[account_key(row.account_id)].append(row)
+
+    now = datetime.now()
+    predicted = {}
+    for account, account_rows in by_account.items():
+        slots = dispatch_limiter.plan(account, [_naive(row.due) for row in account_rows], now)
+        predicted.update((row.id, slot) for row, slot in zip(account_rows, slots))
+    return predicted
+
+
+def follow_changes(cursor: int) -> int:
+    """Apply schedule rows changed since ``cursor`` to the deadline queue; returns the new cursor.
+
+    Keeps this scheduler in step with writes from other processes (the API when
+    it doesn't dispatch, other replicas, Celery retries) without a full reload.
+    """
     db = SessionLocal()
-    
     try:
-        # Use local time (no timezone)
-        now = datetime.now()
-
-        # Get pending schedules that are due
-        due_schedules = (
-            db.query(ScheduledUpload)
-            .filter(
-                ScheduledUpload.status == "pending",
-                ScheduledUpload.scheduled_time <= now,
+        latest = current_change_seq(db)
+        if latest <= cursor:
+            return cursor
+        rows = (
+            db.query(
+                ScheduledUpload.id,
+                func.coalesce(ScheduledUpload.next_attempt_at, ScheduledUpload.scheduled_time).label("due"),
+                ScheduledUpload.account_id,
+                ScheduledUpload.status,
             )
+            .filter(ScheduledUpload.change_seq > cursor, ScheduledUpload.change_seq <= latest)
             .all()
         )
+    finally:
+        db.close()
 
-        if not due_schedules:
-            return
+    for row in rows:
+        if row.status == "pending":
+            deadline_queue.push(row.id, row.due, row.account_id)
+        else:
+            deadline_queue.discard(row.id)
+    return latest
 
-        print(f"[{now.strftime('%H:%M:%S')}] Found {len(due_schedules)} upload(s) to process")
 
-        for schedule in due_schedules:
-            print(f"  📤 Uploading: {schedule.video.original_filename}")
-            process_schedule(schedule.id, headless=False)
-        
-    except Exception as e:
-        print(f"Error in scheduler: {e}")
+def _change_cursor() -> int:
+    db = SessionLocal()
+    try:
+        return current_change_seq(db)
     finally:
         db.close()
 
 
-def run_scheduler():
-    """Run the scheduler loop"""
-    print("🕐 Scheduler started - checking every 60 seconds")
-    
+def run_scheduler(leader: LeaderElection | None = None, poll_seconds: float = SCHEDULER_POLL_SECONDS):
+    """Run the scheduler loop.
+
+    With a ``leader`` election, only the process holding it dispatches; the
+    others stand by and take over if the leader stops renewing.
+
+    ``poll_seconds`` is how often the change feed is followed between
+    resyncs; 0 follows it only on resync, for a scheduler that is told about
+    every change directly.
+    """
+    shard = ", ".join(sorted(deadline_queue.shard)) if deadline_queue.shard else "all accounts"
+    leading = False
+    cursor = last_sync = 0
+
     while True:
         try:
+            if leader is not None and not leader.hold():
+                leading = False
+                time.sleep(leader.renew_seconds)
+                continue
+            if not leading:
+                # Fresh start or a takeover: rebuild everything from the DB
+                recover_orphaned_uploads(startup=True)
+                materialize_recurrences()
+                cursor = _change_cursor()
+                pending = deadline_queue.load()
+                last_sync = time.monotonic()
+                leading = True
+                print(f"🕐 Scheduler started - tracking {pending} pending upload(s) for {shard}")
+            if time.monotonic() - last_sync >= RESYNC_INTERVAL_SECONDS:
+                recover_orphaned_uploads()
+                materialize_recurrences()
+                cursor = _change_cursor()
+                deadline_queue.load()
+                last_sync = time.monotonic()
+            if poll_seconds:
+                cursor = follow_changes(cursor)
             check_and_upload()
         except Exception as e:
             print(f"Scheduler error: {e}")
-        
-        time.sleep(60)  # Check every minute
+
+        remaining = RESYNC_INTERVAL_SECONDS - (time.monotonic() - last_sync)
+        wait = max(remaining, 0)
+        if poll_seconds:
+            wait = min(wait, poll_seconds)
+        if leader is not None:
+            wait = min(wait, leader.renew_seconds)
+        deadline_queue.wait(wait)
 
 
 def start_scheduler_thread():
     """Start the scheduler in a background thread"""
-    thread = threading.Thread(target=run_scheduler, daemon=True)
+    thread = threading.Thread(
+        target=run_scheduler,
+        args=(scheduler_leader(deadline_queue.shard), API_SCHEDULER_POLL_SECONDS),
+        daemon=True,
+    )
     thread.start()
     return thread
 
 
 if __name__ == "__main__":
-    # Run standalone
-    run_scheduler()
+    # Kept for existing scripts; same as: python cli.py scheduler 3 5 default
+    from cli import main
 
+    main(["scheduler", *sys.argv[1:]])
@@ -0,0 +1,116 @@
+"""Per-account index of pending post times for conflict checks and slot suggestions.
+
+Each account keeps a sorted list of ``(scheduled_time, schedule_id)``, so
+"what is within ±N minutes" and "where is the next gap" are bisections instead
+of queries. The index follows the schedules change feed like the scheduler's
+deadline queue does: every lookup first applies rows changed since its cursor,
+so creates, reschedules and cancels from any process (API, bulk, scheduler,
+workers) are reflected, and a hard delete forces a reload.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from datetime import datetime, timedelta
+
+from accounts import account_key
+from change_feed import SCHEDULES_PURGED, current_change_seq
+from database import SessionLocal
+from models import ScheduledUpload
+
+
+class SlotIndex:
+    def __init__(self):
+        self._slots = {}  # account key -> sorted [(scheduled_time, schedule_id)]
+        self._entries = {}  # schedule_id -> (account key, scheduled_time)
+        self._cursor = None
+        self._lock = threading.Lock()
+
+    def conflicts(
+        self, account_id: int | None, when: datetime, window: timedelta, exclude_id: int | None = None
+    ) -> list[tuple[datetime, int]]:
+        """Pending posts for the account within ``window`` either side of ``when``"""
+        with self._lock:
+            self._refresh()
+            slots = self._slots.get(account_key(account_id), [])
+            start = bisect.bisect_left(slots, (when - window,))
+            end = bisect.bisect_right(slots, (when + window, float("inf")))
+            return [slot for slot in slots[start:end] if slot[1] != exclude_id]
+
+    def free_slots(
+        self,
+        account_id: int | None,
+        after: datetime,
+        spacing: timedelta,
+        count: int,
+        exclude_id: int | None = None,
+    ) -> list[datetime]:
+        """The first ``count`` times from ``after`` at least ``spacing`` away from
+        every pending post of the account (and from each other)"""
+        with self._lock:
+            self._refresh()
+            slots = self._slots.get(account_key(account_id), [])
+            found = []
+            candidate = after
+            while len(found) < count:
+                # Nearest pending post that is too close to the candidate, if any
+                i = bisect.bisect_right(slots, (candidate - spacing, float("inf")))
+                while i < len(slots) and slots[i][1] == exclude_id:
+                    i += 1
+                if i < len(slots) and slots[i][0] < candidate + spacing:
+                    candidate = slots[i][0] + spacing
+                    continue
+                found.append(candidate)
+                candidate += spacing
+            return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cursor": self._cursor, "accounts": {key: len(slots) for key, slots in self._slots.items()}}
+
+    def _refresh(self) -> None:
+        db = SessionLocal()
+        try:
+            latest = current_change_seq(db)
+            if self._cursor is None or self._cursor < current_change_seq(db, SCHEDULES_PURGED):
+                rows = db.query(ScheduledUpload.id, ScheduledUpload.scheduled_time, ScheduledUpload.account_id).filter(
+                    ScheduledUpload.status == "pending"
+                )
+                self._slots.clear()
+                self._entries.clear()
+            elif latest > self._cursor:
+                rows = db.query(
+                    ScheduledUpload.id,
+                    ScheduledUpload.scheduled_time,
+                    ScheduledUpload.account_id,
+                    ScheduledUpload.status,
+                ).filter(ScheduledUpload.change_seq > self._cursor, ScheduledUpload.change_seq <= latest)
+            else:
+                return
+            rows = rows.all()
+        finally:
+            db.close()
+
+        for row in rows:
+            self._remove(row.id)
+            if getattr(row, "status", "pending") == "pending":
+                self._add(row.id, row.scheduled_time, row.account_id)
+        self._cursor = latest
+
+    def _add(self, schedule_id: int, when: datetime, account_id: int | None) -> None:
+        account = account_key(account_id)
+        bisect.insort(self._slots.setdefault(account, []), (when, schedule_id))
+        self._entries[schedule_id] = (account, when)
+
+    def _remove(self, schedule_id: int) -> None:
+        entry = self._entries.pop(schedule_id, None)
+        if entry is None:
+            return
+        account, when = entry
+        slots = self._slots[account]
+        i = bisect.bisect_left(slots, (when, schedule_id))
+        if i < len(slots) and slots[i] == (when, schedule_id):
+            del slots[i]
+
+
+slot_index = SlotIndex()
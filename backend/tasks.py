@@ -1,22 +1,26 @@
-from celery import Celery
-from datetime import datetime
-import sys
 import os
-from pathlib import Path
+from datetime import datetime, timedelta
 
-# Add tiktok-uploader to path
-TIKTOK_UPLOADER_PATH = Path(__file__).parent.parent / "tiktok-uploader" / "src"
-sys.path.insert(0, str(TIKTOK_UPLOADER_PATH))
+from celery import Celery
 
-from tiktok_uploader.upload import upload_video
+from accounts import account_key
 from database import SessionLocal
+from metrics import dispatch_deferred_total, upload_phase_seconds
 from models import ScheduledUpload
+from rate_limit import dispatch_limiter
+from upload_pool import MAX_PER_ACCOUNT
+from upload_worker import claim_schedule, process_schedule, running_uploads
+
+CELERY_EAGER = os.getenv("CELERY_EAGER", "0") == "1"
+# How long a task waits before retrying when its account is at UPLOAD_MAX_PER_ACCOUNT uploads
+ACCOUNT_BUSY_RETRY_SECONDS = int(os.getenv("UPLOAD_ACCOUNT_BUSY_RETRY_SECONDS", "60"))
+BROKER_URL = os.getenv("CELERY_BROKER_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
 
-# Celery config
+# Celery config; eager mode needs no broker at all (see dispatcher.py)
 celery_app = Celery(
     "tiktok_scheduler",
-    broker="redis://localhost:6379/0",
-    backend="redis://localhost:6379/0"
+    broker="memory://" if CELERY_EAGER else BROKER_URL,
+    backend="cache+memory://" if CELERY_EAGER else BROKER_URL,
 )
 
 celery_app.conf.update(
@@ -25,62 +29,113 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    task_default_queue="uploads",
+    # Uploads are long and must not be prefetched behind one another
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    beat_schedule={
+        "sync-dispatch": {
+            "task": "sync_dispatch",
+            "schedule": float(os.getenv("CELERY_SYNC_SECONDS", "300")),
+        },
+    },
 )
 
 
+@celery_app.task(name="dispatch_upload", bind=True)
+def dispatch_upload(self, schedule_id: int):
+    """ETA task: upload a schedule if this task is still its live dispatch"""
+    from dispatcher import dispatcher
+
+    db = SessionLocal()
+    try:
+        schedule = db.query(ScheduledUpload).filter(ScheduledUpload.id == schedule_id).first()
+        if not schedule or schedule.status != "pending" or schedule.dispatch_token != self.request.id:
+            # Cancelled, rescheduled or already handled by a newer task
+            return {"schedule_id": schedule_id, "skipped": True}
+        account_id = schedule.account_id
+    finally:
+        db.close()
+
+    account = account_key(account_id)
+    now = datetime.now()
+    busy_until = now + timedelta(seconds=ACCOUNT_BUSY_RETRY_SECONDS)
+    # Cheap check first so a busy account doesn't spend a rate-limit token
+    if running_uploads(account_id) >= MAX_PER_ACCOUNT:
+        return _defer(dispatcher, schedule_id, busy_until, account_id, "account_busy")
+
+    # Check and take in one transaction: workers share the bucket through the DB
+    slot = dispatch_limiter.acquire(account, now)
+    if slot is not None:
+        dispatch_deferred_total.inc(account=account)
+        return _defer(dispatcher, schedule_id, slot, account_id, "rate_limit")
+
+    return _upload_within_cap(dispatcher, schedule_id, account_id, busy_until, self.request.id, now)
+
+
 @celery_app.task(name="schedule_tiktok_upload")
 def schedule_tiktok_upload(schedule_id: int):
-    """Celery task to upload video to TikTok"""
+    """Celery task to upload video to TikTok right away (skips the rate limit, not the account cap)"""
+    from dispatcher import dispatcher
+
     db = SessionLocal()
-    
     try:
-        # Get schedule
-        schedule = db.query(ScheduledUpload).filter(ScheduledUpload.id == schedule_id).first()
-        if not schedule:
-            return {"error": "Schedule not found"}
-        
-        if schedule.status != "pending":
-            return {"error": f"Schedule status is {schedule.status}, not pending"}
-        
-        # Update status
-        schedule.status = "uploading"
-        db.commit()
-        
-        # Get video
-        video = schedule.video
-        
-        # Path to cookies
-        cookies_path = Path(__file__).parent.parent / "tiktok-uploader" / "tiktok_only_cookies.txt"
-        
-        # Upload to TikTok
-        result = upload_video(
-            filename=video.file_path,
-            description=schedule.description,
-            cookies=str(cookies_path),
-            headless=True,
-        )
-        
-        if result:  # If result is not None/empty, it failed
-            schedule.status = "failed"
-            schedule.error_message = str(result)
-        else:
-            schedule.status = "completed"
-            schedule.uploaded_at = datetime.utcnow()
-        
-        db.commit()
-        
-        return {
-            "schedule_id": schedule_id,
-            "status": schedule.status,
-            "uploaded_at": schedule.uploaded_at,
-        }
-        
-    except Exception as e:
-        schedule.status = "failed"
-        schedule.error_message = str(e)
-        db.commit()
-        return {"error": str(e)}
-    
+        schedule = db.get(ScheduledUpload, schedule_id)
+        account_id = schedule.account_id if schedule else None
     finally:
         db.close()
+    now = datetime.now()
+    # Skips the rate limit but counts against it, as in-process dispatch does
+    dispatch_limiter.take(account_key(account_id), now)
+    busy_until = now + timedelta(seconds=ACCOUNT_BUSY_RETRY_SECONDS)
+    return _upload_within_cap(dispatcher, schedule_id, account_id, busy_until, None, now)
+
+
+def _upload_within_cap(
+    dispatcher, schedule_id: int, account_id, busy_until: datetime, task_token, taken_at: datetime
+) -> dict:
+    """Claim under the account's concurrency cap and upload.
+
+    If the claim fails, the rate-limit token taken at ``taken_at`` is given
+    back: a deferred post must not push the account's later posts out.
+    """
+    with upload_phase_seconds.time(phase="claim"):
+        token = claim_schedule(schedule_id, max_per_account=MAX_PER_ACCOUNT)
+    if token is None:
+        db = SessionLocal()
+        try:
+            still_ours = (
+                db.query(ScheduledUpload.id)
+                .filter(
+                    ScheduledUpload.id == schedule_id,
+                    ScheduledUpload.status == "pending",
+                    # No newer task took over (post-now runs without a token)
+                    ScheduledUpload.dispatch_token.is_not_distinct_from(task_token),
+                )
+                .first()
+            )
+        finally:
+            db.close()
+        dispatch_limiter.refund(account_key(account_id), taken_at)
+        if still_ours:
+            # Another worker filled the account's last slot since the check above
+            return _defer(dispatcher, schedule_id, busy_until, account_id, "account_busy")
+        return {"schedule_id": schedule_id, "skipped": True}
+
+    return {
+        "schedule_id": schedule_id,
+        "success": process_schedule(schedule_id, headless=True, lease_token=token),
+    }
+
+
+def _defer(dispatcher, schedule_id: int, when: datetime, account_id: int | None, reason: str) -> dict:
+    dispatcher.defer(schedule_id, when, account_id)
+    return {"schedule_id": schedule_id, "deferred_until": when.isoformat(), "reason": reason}
+
+
+@celery_app.task(name="sync_dispatch")
+def sync_dispatch():
+    """Beat task: enqueue uploads entering the ETA horizon and recover lost ones"""
+    from dispatcher import dispatcher
 
+    return {"enqueued": dispatcher.sync()}
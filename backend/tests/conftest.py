@@ -0,0 +1,47 @@
+"""Shared test setup: backend modules on sys.path and a scratch working directory.
+
+The backend keeps its SQLite database, uploads and cookies relative to the
+working directory, so the tests run in a fresh temp dir with one database
+shared by the whole session. Tests create their own rows and don't assume an
+empty table.
+
+Without the tiktok-uploader checkout, upload_worker imports against a stub
+``tiktok_uploader`` (as loadsim and the benchmarks do); tests that reach the
+uploader monkeypatch ``upload_worker.upload_video``.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.chdir(tempfile.mkdtemp(prefix="tiktok-scheduler-tests-"))
+
+# Read at import time by the modules under test
+os.environ.setdefault("BROWSER_POOL_ENABLED", "0")
+os.environ.setdefault("DISPATCH_IN_API", "0")
+os.environ.setdefault("TRANSCODE_ENABLED", "0")
+
+
+def _no_uploader(**kwargs):
+    raise AssertionError("tests must replace upload_worker.upload_video")
+
+
+from loadsim import stub_tiktok_uploader  # noqa: E402
+
+stub_tiktok_uploader(_no_uploader)
+
+
+@pytest.fixture
+def db():
+    from database import SessionLocal, init_db
+
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
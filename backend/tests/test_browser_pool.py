@@ -0,0 +1,162 @@
+import threading
+
+import pytest
+
+from browser_pool import BrowserPool
+
+
+class StubDriver:
+    """Enough of a Selenium WebDriver for the pool: a health probe and quit()"""
+
+    def __init__(self, cookies_path, headless):
+        self.cookies_path = cookies_path
+        self.headless = headless
+        self.alive = True
+        self.quit_calls = 0
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("chrome not reachable")
+        return 1
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+@pytest.fixture
+def drivers():
+    return []
+
+
+@pytest.fixture
+def pool(drivers):
+    def factory(cookies_path, headless):
+        driver = StubDriver(cookies_path, headless)
+        drivers.append(driver)
+        return driver
+
+    return BrowserPool(factory=factory, max_uses=3, idle_seconds=3600)
+
+
+def test_reuses_warm_session_per_cookie_file(pool, drivers):
+    with pool.lease("a.txt") as first:
+        pass
+    with pool.lease("a.txt") as second:
+        pass
+    with pool.lease("b.txt") as other:
+        pass
+
+    assert second.driver is first.driver
+    assert other.driver is not first.driver
+    assert [d.cookies_path for d in drivers] == ["a.txt", "b.txt"]
+    assert pool.stats()["created"] == 2
+    assert pool.stats()["reused"] == 1
+
+
+def test_headless_and_headed_sessions_are_separate(pool, drivers):
+    with pool.lease("a.txt", headless=True):
+        pass
+    with pool.lease("a.txt", headless=False):
+        pass
+    assert len(drivers) == 2
+
+
+def test_recycles_after_max_uses(pool, drivers):
+    for _ in range(3):
+        with pool.lease("a.txt"):
+            pass
+    assert drivers[0].quit_calls == 1
+    assert pool.stats()["idle"] == 0
+
+    with pool.lease("a.txt") as session:
+        pass
+    assert session.driver is drivers[1]
+
+
+def test_error_during_lease_recycles_the_session(pool, drivers):
+    with pytest.raises(ValueError):
+        with pool.lease("a.txt"):
+            raise ValueError("upload page stuck")
+    assert drivers[0].quit_calls == 1
+
+    with pool.lease("a.txt") as session:
+        pass
+    assert session.driver is drivers[1]
+
+
+def test_marked_failed_session_is_not_returned(pool, drivers):
+    with pool.lease("a.txt") as session:
+        session.mark_failed()
+    assert drivers[0].quit_calls == 1
+    assert pool.stats()["idle"] == 0
+
+
+def test_unhealthy_idle_session_is_replaced(pool, drivers):
+    with pool.lease("a.txt"):
+        pass
+    drivers[0].alive = False
+
+    with pool.lease("a.txt") as session:
+        pass
+    assert session.driver is drivers[1]
+    assert drivers[0].quit_calls == 1
+
+
+def test_idle_sessions_are_evicted(pool, drivers):
+    with pool.lease("a.txt"):
+        pass
+    pool.idle_seconds = 0
+    pool.evict_idle()
+    assert drivers[0].quit_calls == 1
+    assert pool.stats()["idle"] == 0
+
+
+def test_concurrent_leases_get_distinct_sessions(pool, drivers):
+    inside = threading.Barrier(3)
+    leased = []
+
+    def worker():
+        with pool.lease("a.txt") as session:
+            leased.append(session.driver)
+            inside.wait(timeout=5)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(driver) for driver in leased}) == 3
+    assert pool.stats()["idle"] == 3
+
+
+def test_close_quits_idle_sessions(pool, drivers):
+    with pool.lease("a.txt"):
+        pass
+    with pool.lease("b.txt"):
+        pass
+    pool.close()
+    assert [d.quit_calls for d in drivers] == [1, 1]
+
+
+def test_upload_once_runs_on_the_leased_driver(monkeypatch, pool, drivers):
+    import upload_worker
+
+    calls = []
+
+    def fake_upload_video(**kwargs):
+        calls.append(kwargs)
+        return []
+
+    monkeypatch.setattr(upload_worker, "BROWSER_POOL_ENABLED", True)
+    monkeypatch.setattr(upload_worker, "browser_pool", pool)
+    monkeypatch.setattr(upload_worker, "upload_video", fake_upload_video)
+
+    assert upload_worker._upload_once("v.mp4", "caption", "a.txt", True) == []
+    assert upload_worker._upload_once("v.mp4", "caption", "a.txt", True) == []
+    assert [call["browser_agent"] for call in calls] == [drivers[0], drivers[0]]
+
+    # A returned failure list leaves the page in an unknown state: recycle
+    monkeypatch.setattr(upload_worker, "upload_video", lambda **kwargs: [{"path": "v.mp4"}])
+    upload_worker._upload_once("v.mp4", "caption", "a.txt", True)
+    assert drivers[0].quit_calls == 1
@@ -0,0 +1,125 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal
+from models import ScheduledUpload, Video
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def make_schedules(db, count):
+    video = Video(
+        original_filename="bulk.mp4",
+        stored_filename=f"{uuid.uuid4().hex}-bulk.mp4",
+        file_path="uploads/bulk.mp4",
+        description="d",
+        file_size=1,
+    )
+    db.add(video)
+    db.flush()
+    schedules = [
+        ScheduledUpload(
+            video_id=video.id,
+            scheduled_time=datetime.now() + timedelta(days=1, minutes=index),
+            description="d",
+            status="pending",
+        )
+        for index in range(count)
+    ]
+    db.add_all(schedules)
+    db.commit()
+    return schedules
+
+
+def claim_before_apply(monkeypatch, schedule_id):
+    """Have the dispatcher claim ``schedule_id`` after validation, before the UPDATEs run"""
+    original = main.next_change_seq
+
+    def racing_next_change_seq(connection, *args):
+        other = SessionLocal()
+        try:
+            other.get(ScheduledUpload, schedule_id).status = "uploading"
+            other.commit()
+        finally:
+            other.close()
+        return original(connection, *args)
+
+    monkeypatch.setattr(main, "next_change_seq", racing_next_change_seq)
+
+
+def status_of(db, schedule):
+    db.expire_all()
+    return db.get(ScheduledUpload, schedule.id).status
+
+
+def test_bulk_cancel_and_reschedule(db, client):
+    first, second = make_schedules(db, 2)
+    later = (datetime.now() + timedelta(days=2)).isoformat()
+
+    response = client.post("/schedules/bulk", json={"operations": [
+        {"op": "cancel", "id": first.id},
+        {"op": "reschedule", "id": second.id, "scheduled_time": later},
+    ]})
+
+    body = response.json()
+    assert body["applied"] and body["failed"] == 0
+    assert status_of(db, first) == "cancelled"
+    assert db.get(ScheduledUpload, second.id).scheduled_time.isoformat() == later
+
+
+def test_bulk_create_reports_each_new_id(db, client):
+    video_id = make_schedules(db, 1)[0].video_id
+    times = [(datetime.now() + timedelta(days=3, minutes=index)).isoformat() for index in range(5)]
+
+    response = client.post("/schedules/bulk", json={"operations": [
+        {"op": "create", "video_id": video_id, "scheduled_time": when, "description": f"post {index}"}
+        for index, when in enumerate(times)
+    ]})
+
+    results = response.json()["results"]
+    assert all(result["ok"] for result in results)
+    for index, result in enumerate(results):
+        schedule = db.get(ScheduledUpload, result["id"])
+        assert schedule.description == f"post {index}"
+        assert schedule.scheduled_time.isoformat() == times[index]
+
+
+def test_row_claimed_after_validation_is_reported_not_overwritten(monkeypatch, db, client):
+    claimed, free = make_schedules(db, 2)
+    claim_before_apply(monkeypatch, claimed.id)
+
+    response = client.post("/schedules/bulk", json={"operations": [
+        {"op": "cancel", "id": claimed.id},
+        {"op": "cancel", "id": free.id},
+    ]})
+
+    body = response.json()
+    assert body["applied"] and body["failed"] == 1 and body["cancelled"] == 1
+    assert body["results"][0] == {
+        "index": 0, "op": "cancel", "id": claimed.id, "ok": False, "error": "Schedule is not pending"
+    }
+    assert body["results"][1]["ok"]
+    assert status_of(db, claimed) == "uploading"
+    assert status_of(db, free) == "cancelled"
+
+
+def test_row_claimed_after_validation_rejects_an_all_or_nothing_batch(monkeypatch, db, client):
+    claimed, free = make_schedules(db, 2)
+    claim_before_apply(monkeypatch, claimed.id)
+
+    response = client.post("/schedules/bulk", json={"all_or_nothing": True, "operations": [
+        {"op": "cancel", "id": claimed.id},
+        {"op": "cancel", "id": free.id},
+    ]})
+
+    body = response.json()
+    assert not body["applied"] and body["failed"] == 1
+    assert status_of(db, claimed) == "uploading"
+    assert status_of(db, free) == "pending"
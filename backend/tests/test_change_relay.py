@@ -0,0 +1,91 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from change_feed import EVENT_RELAY_MAX_EVENTS, ChangeRelay, current_change_seq
+from events import EventBus, schedule_event
+from models import ScheduledUpload, Video
+
+
+def make_schedules(db, count):
+    video = Video(
+        original_filename="relay.mp4",
+        stored_filename=f"{uuid.uuid4().hex}-relay.mp4",
+        file_path="uploads/relay.mp4",
+        description="d",
+        file_size=1,
+    )
+    db.add(video)
+    db.flush()
+    schedules = [
+        ScheduledUpload(
+            video_id=video.id,
+            scheduled_time=datetime.now() + timedelta(days=1),
+            description="d",
+            status="pending",
+        )
+        for _ in range(count)
+    ]
+    db.add_all(schedules)
+    db.commit()
+    return schedules
+
+
+def relayed_events(db, change):
+    """Run ``change(db)`` after the relay's cursor is set; returns what a subscriber receives"""
+    bus = EventBus()
+    relay = ChangeRelay(bus=bus)
+
+    async def scenario():
+        subscription = bus.subscribe()
+        cursor = current_change_seq(db)
+        change(db, bus)
+        await asyncio.to_thread(relay.relay, cursor)
+        await asyncio.sleep(0)
+        received = []
+        while not subscription.queue.empty():
+            received.append(subscription.queue.get_nowait())
+        subscription.close()
+        return received
+
+    return asyncio.run(scenario())
+
+
+def test_rows_changed_by_another_process_are_published(db):
+    schedule, = make_schedules(db, 1)
+
+    def worker_finishes_upload(db, bus):
+        schedule.status = "completed"
+        db.commit()
+
+    events = relayed_events(db, worker_finishes_upload)
+
+    assert [(event["type"], event["id"], event["status"]) for event in events] == [
+        ("schedule.status", schedule.id, "completed")
+    ]
+
+
+def test_changes_already_announced_here_are_not_repeated(db):
+    schedule, = make_schedules(db, 1)
+
+    def api_cancels(db, bus):
+        schedule.status = "cancelled"
+        db.commit()
+        bus.publish("schedule.cancelled", schedule_event(schedule))
+
+    events = relayed_events(db, api_cancels)
+
+    assert [event["type"] for event in events] == ["schedule.cancelled"]
+
+
+def test_a_large_batch_is_sent_as_one_resync(db):
+    schedules = make_schedules(db, EVENT_RELAY_MAX_EVENTS + 1)
+
+    def bulk_cancel_elsewhere(db, bus):
+        for schedule in schedules:
+            schedule.status = "cancelled"
+        db.commit()
+
+    events = relayed_events(db, bulk_cancel_elsewhere)
+
+    assert [event["type"] for event in events] == ["resync"]
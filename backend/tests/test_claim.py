@@ -0,0 +1,58 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import upload_worker
+from models import Account, ScheduledUpload, Video
+
+
+@pytest.fixture
+def account_schedules(db):
+    """An account with two uploads under live leases, one under an expired lease, and two pending"""
+    account = Account(name=f"acct-{uuid.uuid4().hex[:8]}")
+    video = Video(
+        original_filename="claim.mp4",
+        stored_filename=f"{uuid.uuid4().hex}-claim.mp4",
+        file_path="uploads/claim.mp4",
+        description="d",
+        file_size=1,
+    )
+    db.add_all([account, video])
+    db.flush()
+    now = datetime.now()
+
+    def schedule(status, lease_expires_at=None):
+        row = ScheduledUpload(
+            video_id=video.id,
+            account_id=account.id,
+            scheduled_time=now,
+            description="d",
+            status=status,
+            lease_expires_at=lease_expires_at,
+        )
+        db.add(row)
+        return row
+
+    schedule("uploading", now + timedelta(minutes=5))
+    schedule("uploading", now + timedelta(minutes=5))
+    schedule("uploading", now - timedelta(minutes=5))
+    pending = [schedule("pending"), schedule("pending")]
+    db.commit()
+    return account, pending
+
+
+def test_running_uploads_counts_live_leases_only(account_schedules):
+    account, _ = account_schedules
+    assert upload_worker.running_uploads(account.id) == 2
+
+
+def test_claim_respects_the_account_cap(account_schedules):
+    account, (first, second) = account_schedules
+
+    assert upload_worker.claim_schedule(first.id, max_per_account=2) is None
+    assert upload_worker.claim_schedule(first.id, max_per_account=3) is not None
+    # That claim filled the third slot
+    assert upload_worker.claim_schedule(second.id, max_per_account=3) is None
+    # Without a cap (the in-process pool enforces its own) the claim goes through
+    assert upload_worker.claim_schedule(second.id) is not None
@@ -0,0 +1,87 @@
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client(db):
+    return TestClient(main.app)
+
+
+def upload(client, content: bytes) -> dict:
+    response = client.post("/videos/upload", files={"file": ("clip.mp4", content, "video/mp4")})
+    response.raise_for_status()
+    return response.json()
+
+
+def init_known(client, content: bytes) -> dict:
+    response = client.post(
+        "/videos/chunked",
+        json={"filename": "again.mp4", "total_size": len(content), "sha256": hashlib.sha256(content).hexdigest()},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def test_a_digest_alone_does_not_attach_stored_content(client):
+    content = os.urandom(200_000)
+    upload(client, content)
+
+    session = init_known(client, content)
+
+    assert session["duplicate"] is False
+    assert "proof" in session
+    wrong = client.post(f"/videos/chunked/{session['upload_id']}/proof", content=b"\0" * session["proof"]["length"])
+    assert wrong.status_code == 403
+    # One attempt per upload
+    retry = client.post(f"/videos/chunked/{session['upload_id']}/proof", content=b"\0")
+    assert retry.status_code == 409
+
+
+def test_the_requested_range_proves_possession(client):
+    content = os.urandom(200_000)
+    original = upload(client, content)
+
+    session = init_known(client, content)
+    offset, length = session["proof"]["offset"], session["proof"]["length"]
+    proved = client.post(f"/videos/chunked/{session['upload_id']}/proof", content=content[offset:offset + length])
+
+    assert proved.status_code == 200
+    body = proved.json()
+    assert body["duplicate"] is True
+    assert body["video"]["sha256"] == original["sha256"]
+    assert client.get(f"/videos/chunked/{session['upload_id']}").status_code == 404
+
+
+def test_unknown_content_gets_no_proof_offer(client):
+    session = init_known(client, os.urandom(1000))
+    assert "proof" not in session
+
+
+def test_deleting_the_last_copy_spares_a_concurrent_reupload(db, tmp_path):
+    store = main.blob_store
+    content = os.urandom(1000)
+    sha256 = hashlib.sha256(content).hexdigest()
+    first = tmp_path / "first.upload"
+    first.write_bytes(content)
+    blob, _ = store.adopt(db, sha256, ".mp4", first)
+    db.commit()
+    path = Path(blob.file_path)
+
+    # The delete's transaction moves the file aside before it commits...
+    doomed = store.release(db, sha256)
+    db.commit()
+    assert not path.exists()
+    # ...so a re-upload landing in between writes a fresh file that the delete then leaves alone
+    second = tmp_path / "second.upload"
+    second.write_bytes(content)
+    store.adopt(db, sha256, ".mp4", second)
+    db.commit()
+    doomed.unlink()
+
+    assert path.read_bytes() == content
@@ -0,0 +1,175 @@
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+from ai_description import OpenAIBackend
+from description_jobs import DescriptionService, placeholder_description
+from models import Video
+
+
+class StubBackend:
+    """Records each batch it is asked for; descriptions are derived from the filename"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def generate_batch(self, items):
+        self.release.wait(timeout=5)
+        self.batches.append([filename for filename, _ in items])
+        return [f"about {filename}" for filename, _ in items]
+
+
+def make_video(db, filename, content_hash=None, description=None):
+    video = Video(
+        original_filename=filename,
+        stored_filename=f"{uuid.uuid4().hex}-{filename}",
+        file_path=f"uploads/{filename}",
+        description=description or placeholder_description(filename),
+        file_size=1,
+        content_hash=content_hash or uuid.uuid4().hex,
+    )
+    db.add(video)
+    db.commit()
+    return video
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+def description_of(db, video):
+    db.expire_all()
+    return db.get(Video, video.id).description
+
+
+def test_jobs_are_batched_and_fill_in_the_placeholder(db):
+    backend = StubBackend()
+    backend.release.clear()
+    service = DescriptionService(backend=backend, batch_size=4, batch_window=0.2)
+    videos = [make_video(db, f"clip{i}.mp4") for i in range(6)]
+
+    for video in videos:
+        service.submit(video.id, video.content_hash, video.original_filename, video.file_path)
+    backend.release.set()
+
+    wait_for(lambda: all(description_of(db, v) == f"about {v.original_filename}" for v in videos))
+    assert [len(batch) for batch in backend.batches] == [4, 2]
+    assert service.stats()["batches"] == 2
+
+
+def test_cache_hits_skip_the_backend(db):
+    backend = StubBackend()
+    service = DescriptionService(backend=backend, batch_window=0)
+    first = make_video(db, "dance.mp4", content_hash="a" * 64)
+
+    assert service.cached(first.content_hash, "dance.mp4") is None
+    service.submit(first.id, first.content_hash, "dance.mp4", first.file_path)
+    wait_for(lambda: description_of(db, first) == "about dance.mp4")
+
+    # Same clip, same name: answered from the cache at upload time
+    assert service.cached("a" * 64, "dance.mp4") == "about dance.mp4"
+    # Same clip under another name is a different key
+    assert service.cached("a" * 64, "other.mp4") is None
+    assert len(backend.batches) == 1
+    assert service.stats()["hit_rate"] == 1 / 3
+
+
+def test_identical_jobs_in_one_batch_share_a_backend_slot(db):
+    backend = StubBackend()
+    backend.release.clear()
+    service = DescriptionService(backend=backend, batch_size=8, batch_window=0.2)
+    twins = [make_video(db, "twin.mp4", content_hash="b" * 64) for _ in range(3)]
+
+    for video in twins:
+        service.submit(video.id, video.content_hash, "twin.mp4", video.file_path)
+    backend.release.set()
+
+    wait_for(lambda: all(description_of(db, v) == "about twin.mp4" for v in twins))
+    assert backend.batches == [["twin.mp4"]]
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    service = DescriptionService(backend=StubBackend(), cache_size=2)
+    service._remember("h1", "a.mp4", "A")
+    service._remember("h2", "b.mp4", "B")
+    assert service.cached("h1", "a.mp4") == "A"
+    service._remember("h3", "c.mp4", "C")
+
+    assert service.cached("h2", "b.mp4") is None
+    assert service.cached("h1", "a.mp4") == "A"
+    assert service.cached("h3", "c.mp4") == "C"
+
+
+def test_user_edits_are_not_overwritten(db):
+    backend = StubBackend()
+    backend.release.clear()
+    service = DescriptionService(backend=backend, batch_window=0)
+    video = make_video(db, "edited.mp4")
+    service.submit(video.id, video.content_hash, "edited.mp4", video.file_path)
+
+    video.description = "My own caption"
+    db.commit()
+    backend.release.set()
+
+    wait_for(lambda: backend.batches)
+    time.sleep(0.1)
+    assert description_of(db, video) == "My own caption"
+
+
+def test_placeholders_left_by_a_restart_are_requeued(db):
+    stranded = make_video(db, "stranded.mp4")
+    done = make_video(db, "done.mp4", description="Already written #fyp")
+    legacy = make_video(db, "legacy.mp4")
+    legacy.content_hash = None
+    db.commit()
+
+    backend = StubBackend()
+    service = DescriptionService(backend=backend, batch_window=0)
+    service.requeue_placeholders()
+
+    wait_for(lambda: description_of(db, stranded) == "about stranded.mp4")
+    requested = [filename for batch in backend.batches for filename in batch]
+    assert "done.mp4" not in requested
+    assert "legacy.mp4" not in requested
+
+
+class StubOpenAIClient:
+    def __init__(self, answer):
+        self.answer = answer
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        message = SimpleNamespace(content=self.answer)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_openai_backend_makes_one_round_trip_per_batch():
+    client = StubOpenAIClient("1. Morning run vibes #fitness\n\n2) Cat vs cucumber #pets")
+    backend = OpenAIBackend(client=client, model="test-model")
+
+    descriptions = backend.generate_batch([("morning_run.mp4", "a"), ("cat-vs-cucumber.mp4", "b")])
+
+    assert descriptions == ["Morning run vibes #fitness", "Cat vs cucumber #pets"]
+    assert len(client.requests) == 1
+    assert client.requests[0]["model"] == "test-model"
+    prompt = client.requests[0]["messages"][-1]["content"]
+    assert "1. morning_run" in prompt and "2. cat-vs-cucumber" in prompt
+
+
+def test_openai_backend_falls_back_for_titles_the_model_skipped():
+    client = StubOpenAIClient("2. Second one #fyp")
+    backend = OpenAIBackend(client=client)
+
+    first, second = backend.generate_batch([("beach_day.mp4", "a"), ("x.mp4", "b")])
+
+    assert first == "Beach Day #fyp #viral #trending"
+    assert second == "Second one #fyp"
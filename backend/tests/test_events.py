@@ -0,0 +1,109 @@
+import asyncio
+import json
+import threading
+
+import main
+from events import EventBus
+
+
+def drain(subscription) -> list:
+    received = []
+    while not subscription.queue.empty():
+        received.append(subscription.queue.get_nowait())
+    return received
+
+
+def test_publish_fans_out_to_subscribers_on_every_loop():
+    bus = EventBus()
+    subscribed = threading.Barrier(3)
+    received = {}
+
+    def subscriber_loop(name):
+        async def consume():
+            first, second = bus.subscribe(), bus.subscribe()
+            subscribed.wait()
+            received[name] = [await first.get(), await second.get()]
+            first.close()
+            second.close()
+
+        asyncio.run(consume())
+
+    loops = [threading.Thread(target=subscriber_loop, args=(name,)) for name in ("a", "b")]
+    for thread in loops:
+        thread.start()
+    subscribed.wait()
+    # Published from a thread that runs no event loop, as upload workers do
+    bus.publish("schedule.status", {"id": 1, "status": "completed"})
+    for thread in loops:
+        thread.join(timeout=5)
+
+    assert received == {
+        name: [{"type": "schedule.status", "id": 1, "status": "completed"}] * 2 for name in ("a", "b")
+    }
+    assert bus.subscriber_count() == 0
+
+
+def test_a_subscriber_that_falls_behind_gets_one_resync():
+    bus = EventBus(queue_size=4)
+
+    async def scenario():
+        subscription = bus.subscribe()
+        for index in range(5):
+            bus.publish("schedule.status", {"id": index})
+        await asyncio.sleep(0)
+        backlog = drain(subscription)
+        bus.publish("schedule.status", {"id": 5})
+        await asyncio.sleep(0)
+        return backlog, drain(subscription)
+
+    backlog, after = asyncio.run(scenario())
+
+    assert backlog == [{"type": "resync"}]
+    # Delivery carries on normally after the resync
+    assert after == [{"type": "schedule.status", "id": 5}]
+
+
+def test_closed_subscriptions_receive_nothing():
+    bus = EventBus()
+
+    async def scenario():
+        kept, closed = bus.subscribe(), bus.subscribe()
+        closed.close()
+        bus.publish("schedule.cancelled", {"id": 1})
+        await asyncio.sleep(0)
+        return drain(kept), drain(closed), bus.subscriber_count()
+
+    kept, closed, count = asyncio.run(scenario())
+
+    assert [event["id"] for event in kept] == [1]
+    assert closed == []
+    assert count == 1
+
+
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def test_sse_endpoint_streams_published_events():
+    # TestClient buffers whole responses, so drive the endless stream directly
+    async def scenario():
+        response = await main.stream_schedule_events(ConnectedRequest())
+        stream = response.body_iterator
+        try:
+            first = await stream.__anext__()
+            main.event_bus.publish("schedule.status", {"id": 42, "status": "uploading"})
+            message = await asyncio.wait_for(stream.__anext__(), 5)
+        finally:
+            await stream.aclose()
+        return response, first, message
+
+    response, first, message = asyncio.run(scenario())
+
+    assert response.media_type == "text/event-stream"
+    assert first == "retry: 5000\n\n"
+    event_line, data_line = message.strip().split("\n")
+    assert event_line == "event: schedule.status"
+    assert json.loads(data_line.removeprefix("data: ")) == {"type": "schedule.status", "id": 42, "status": "uploading"}
+    # Closing the stream unsubscribes
+    assert main.event_bus.subscriber_count() == 0
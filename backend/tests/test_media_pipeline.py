@@ -0,0 +1,182 @@
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+import media_pipeline
+from change_feed import current_change_seq
+from media_pipeline import MediaPipeline, render_media
+from models import ScheduledUpload, Video
+
+
+def stub_render(source_path):
+    """Writes the same outputs render_media would, without ffmpeg"""
+    source = Path(source_path)
+    poster = source.with_suffix(".jpg")
+    preview = source.with_name(f"{source.stem}.preview.mp4")
+    poster.write_bytes(b"jpeg")
+    preview.write_bytes(b"mp4")
+    return str(poster), str(preview)
+
+
+@pytest.fixture(autouse=True)
+def ffmpeg_on_path(monkeypatch):
+    monkeypatch.setattr(media_pipeline, "FFMPEG", "ffmpeg")
+
+
+def make_pipeline(render=stub_render, queue_size=8):
+    return MediaPipeline(max_workers=2, queue_size=queue_size, render=render, executor_factory=ThreadPoolExecutor)
+
+
+def make_video(db, tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"\x00" * 16)
+    video = Video(
+        original_filename=name,
+        stored_filename=f"{uuid.uuid4().hex}-{name}",
+        file_path=str(path),
+        description="d",
+        file_size=16,
+    )
+    db.add(video)
+    db.commit()
+    return video
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+def test_finished_job_fills_in_paths_and_moves_schedules_in_the_change_feed(db, tmp_path):
+    video = make_video(db, tmp_path, "a.mp4")
+    schedule = ScheduledUpload(
+        video_id=video.id, scheduled_time=datetime.now() + timedelta(days=1), description="d", status="pending"
+    )
+    db.add(schedule)
+    db.commit()
+    seq_before = current_change_seq(db)
+
+    pipeline = make_pipeline()
+    assert pipeline.submit(video.id, video.file_path)
+    pipeline._executor.shutdown(wait=True)
+
+    db.expire_all()
+    assert video.thumbnail_path == str(tmp_path / "a.jpg")
+    assert video.preview_path == str(tmp_path / "a.preview.mp4")
+    # GET /schedules' ETag is the counter, so clients refetch the new preview URLs
+    assert current_change_seq(db) > seq_before
+    assert schedule.change_seq > seq_before
+
+
+def test_failed_render_leaves_the_video_alone(db, tmp_path):
+    video = make_video(db, tmp_path, "broken.mp4")
+    seq_before = current_change_seq(db)
+
+    def failing_render(source_path):
+        raise RuntimeError("moov atom not found")
+
+    pipeline = make_pipeline(render=failing_render)
+    pipeline.submit(video.id, video.file_path)
+    pipeline._executor.shutdown(wait=True)
+
+    db.expire_all()
+    assert video.thumbnail_path is None
+    assert current_change_seq(db) == seq_before
+    Path(video.file_path).unlink()
+
+
+def test_job_dropped_on_a_full_queue_is_picked_up_when_a_slot_frees(db, tmp_path):
+    first = make_video(db, tmp_path, "first.mp4")
+    second = make_video(db, tmp_path, "second.mp4")
+    release = threading.Event()
+
+    def slow_render(source_path):
+        release.wait(timeout=5)
+        return stub_render(source_path)
+
+    pipeline = make_pipeline(render=slow_render, queue_size=1)
+    assert pipeline.submit(first.id, first.file_path)
+    assert not pipeline.submit(second.id, second.file_path)
+
+    release.set()
+
+    def second_rendered():
+        db.expire_all()
+        return second.thumbnail_path is not None
+
+    wait_for(second_rendered)
+    assert second.preview_path == str(tmp_path / "second.preview.mp4")
+
+
+def test_backfill_queues_videos_missing_previews_once(db, tmp_path):
+    missing = make_video(db, tmp_path, "missing.mp4")
+    done = make_video(db, tmp_path, "done.mp4")
+    done.thumbnail_path, done.preview_path = "done.jpg", "done.preview.mp4"
+    gone = make_video(db, tmp_path, "gone.mp4")
+    Path(gone.file_path).unlink()
+    db.commit()
+
+    rendered = []
+
+    def recording_render(source_path):
+        rendered.append(Path(source_path).name)
+        return stub_render(source_path)
+
+    pipeline = make_pipeline(render=recording_render, queue_size=1000)
+    pipeline.backfill()
+    pipeline._executor.shutdown(wait=True)
+
+    assert "missing.mp4" in rendered
+    assert "done.mp4" not in rendered
+    assert "gone.mp4" not in rendered
+    db.expire_all()
+    assert missing.thumbnail_path is not None
+
+    # Already tried by this process: not queued again even if rendering left gaps
+    missing.preview_path = None
+    db.commit()
+    rendered.clear()
+    pipeline._executor = None
+    pipeline.backfill()
+    assert "missing.mp4" not in rendered
+
+
+def test_disabled_without_ffmpeg(monkeypatch, db, tmp_path):
+    monkeypatch.setattr(media_pipeline, "FFMPEG", None)
+    video = make_video(db, tmp_path, "noffmpeg.mp4")
+    pipeline = make_pipeline()
+    assert not pipeline.submit(video.id, video.file_path)
+    assert pipeline.backfill() == 0
+    Path(video.file_path).unlink()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_render_media_on_a_generated_sample(monkeypatch, tmp_path):
+    monkeypatch.setattr(media_pipeline, "FFMPEG", shutil.which("ffmpeg"))
+    sample = tmp_path / "sample.mp4"
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "lavfi", "-i", "testsrc=size=640x360:rate=25",
+            "-t", "2", "-pix_fmt", "yuv420p", str(sample),
+        ],
+        check=True,
+    )
+
+    poster, preview = render_media(str(sample))
+
+    assert poster == str(tmp_path / "sample.jpg") and Path(poster).stat().st_size > 0
+    assert preview == str(tmp_path / "sample.preview.mp4") and Path(preview).stat().st_size > 0
+    # Outputs are reused, not re-rendered
+    mtime = Path(preview).stat().st_mtime
+    render_media(str(sample))
+    assert Path(preview).stat().st_mtime == mtime
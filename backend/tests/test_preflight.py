@@ -0,0 +1,163 @@
+import subprocess
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import preflight
+from models import Video, VideoBlob
+from preflight import NEEDS_PROBE, NEEDS_TRANSCODE, OK, PROBE_TIMEOUT, PROBING, TRANSCODING, TranscodeQueue
+
+
+def make_video(db, **fields):
+    fields.setdefault("file_path", f"uploads/{uuid.uuid4().hex}.mp4")
+    video = Video(
+        original_filename="preflight.mp4",
+        stored_filename=f"{uuid.uuid4().hex}-preflight.mp4",
+        description="d",
+        file_size=1,
+        **fields,
+    )
+    db.add(video)
+    db.commit()
+    return video
+
+
+def make_blob(db):
+    blob = VideoBlob(sha256=uuid.uuid4().hex, file_path=f"uploads/{uuid.uuid4().hex}.mp4", file_size=1, ref_count=1)
+    db.add(blob)
+    db.commit()
+    return blob
+
+
+def probe_output(video_codec="h264"):
+    return {
+        "duration_seconds": 12.0,
+        "video_codec": video_codec,
+        "audio_codec": "aac",
+        "pix_fmt": "yuv420p",
+        "width": 1080,
+        "height": 1920,
+        "bitrate": 4_000_000,
+        "containers": {"mov", "mp4"},
+        "size": 1,
+    }
+
+
+@pytest.fixture
+def transcode_queue(monkeypatch):
+    monkeypatch.setattr(preflight, "TRANSCODE_ENABLED", True)
+    monkeypatch.setattr(preflight, "FFMPEG", "ffmpeg")
+    monkeypatch.setattr(preflight, "FFPROBE", "ffprobe")
+    queue = TranscodeQueue(max_workers=1)
+    # No worker threads: the tests drive the queue directly
+    monkeypatch.setattr(queue, "notify", lambda: None)
+    return queue
+
+
+def test_new_videos_are_queued_for_a_probe_not_probed_inline(db, transcode_queue, monkeypatch):
+    def no_subprocess(*args, **kwargs):
+        raise AssertionError("ffprobe ran in the request")
+
+    monkeypatch.setattr(preflight.subprocess, "run", no_subprocess)
+    video = Video(original_filename="new.mp4", stored_filename=f"{uuid.uuid4().hex}-new.mp4", file_path="uploads/new.mp4")
+
+    preflight.check_video(db, video)
+
+    assert video.preflight_status == NEEDS_PROBE
+
+
+def test_a_hanging_ffprobe_is_retried_and_not_inherited(db, transcode_queue, monkeypatch):
+    def hang(args, **kwargs):
+        raise subprocess.TimeoutExpired(args, kwargs["timeout"])
+
+    monkeypatch.setattr(preflight.subprocess, "run", hang)
+    blob = make_blob(db)
+    video = make_video(db, file_path=blob.file_path, content_hash=blob.sha256, preflight_status=PROBING)
+
+    transcode_queue._run_probe(video.id, video.file_path)
+
+    db.refresh(video)
+    assert video.preflight_status == PROBE_TIMEOUT
+    assert "did not finish" in video.preflight_error
+    assert video.preflight_lease_expires_at.replace(tzinfo=None) > datetime.now()
+    # A re-upload of the same content is probed afresh rather than copying the timeout
+    copy = Video(
+        original_filename="again.mp4",
+        stored_filename=f"{uuid.uuid4().hex}-again.mp4",
+        file_path=blob.file_path,
+        content_hash=blob.sha256,
+    )
+    preflight.check_video(db, copy)
+    assert copy.preflight_status == NEEDS_PROBE
+
+
+def test_a_probe_settles_every_copy_awaiting_it(db, transcode_queue, monkeypatch):
+    monkeypatch.setattr(preflight, "probe", lambda path: probe_output(video_codec="vp9"))
+    path = f"uploads/{uuid.uuid4().hex}.mp4"
+    retrying = make_video(
+        db, file_path=path, preflight_status=PROBE_TIMEOUT, preflight_lease_expires_at=datetime.now() + timedelta(hours=1)
+    )
+    running = make_video(db, file_path=path, preflight_status=PROBING)
+
+    transcode_queue._run_probe(running.id, path)
+
+    for video in (retrying, running):
+        db.refresh(video)
+        assert video.preflight_status == NEEDS_TRANSCODE
+        assert video.video_codec == "vp9"
+        assert video.preflight_lease_expires_at is None
+
+
+def test_start_requeues_only_jobs_whose_lease_lapsed(db, transcode_queue):
+    now = datetime.now()
+    live = make_video(
+        db, preflight_status=TRANSCODING, preflight_owner="other", preflight_lease_expires_at=now + timedelta(minutes=5)
+    )
+    lapsed = make_video(
+        db, preflight_status=TRANSCODING, preflight_owner="dead", preflight_lease_expires_at=now - timedelta(minutes=5)
+    )
+    unleased = make_video(db, preflight_status=TRANSCODING)
+    lapsed_probe = make_video(db, preflight_status=PROBING, preflight_lease_expires_at=now - timedelta(minutes=5))
+
+    transcode_queue.start()
+
+    for video in (live, lapsed, unleased, lapsed_probe):
+        db.refresh(video)
+    assert (live.preflight_status, live.preflight_owner) == (TRANSCODING, "other")
+    assert (lapsed.preflight_status, lapsed.preflight_owner) == (NEEDS_TRANSCODE, None)
+    assert unleased.preflight_status == NEEDS_TRANSCODE
+    assert lapsed_probe.preflight_status == NEEDS_PROBE
+
+
+def test_claim_takes_probes_first_and_skips_live_leases(db, transcode_queue):
+    # Earlier tests may have left claimable rows; drain the queue and look for ours
+    transcode_job = make_video(db, preflight_status=NEEDS_TRANSCODE)
+    probe_job = make_video(db, preflight_status=NEEDS_PROBE)
+    claimed = []
+    while (job := transcode_queue._claim()) is not None:
+        claimed.append(job)
+    order = [job[0] for job in claimed]
+    assert order.index(probe_job.id) < order.index(transcode_job.id)
+
+    token = next(job[2] for job in claimed if job[0] == transcode_job.id)
+    db.refresh(transcode_job)
+    db.refresh(probe_job)
+    assert probe_job.preflight_status == PROBING
+    assert transcode_job.preflight_status == TRANSCODING
+    assert transcode_job.preflight_owner == token
+    assert transcode_job.preflight_lease_expires_at.replace(tzinfo=None) > datetime.now()
+    # Leased and live: nobody else can take them
+    assert transcode_queue._claim() is None
+
+
+def test_without_transcoding_only_probes_are_claimed(db, transcode_queue, monkeypatch):
+    monkeypatch.setattr(preflight, "TRANSCODE_ENABLED", False)
+    transcode_job = make_video(db, preflight_status=NEEDS_TRANSCODE)
+    make_video(db, preflight_status=OK)
+
+    while transcode_queue._claim() is not None:
+        pass
+
+    db.refresh(transcode_job)
+    assert transcode_job.preflight_status == NEEDS_TRANSCODE
@@ -0,0 +1,92 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from models import RateLimitState
+from rate_limit import RateLimiter
+
+
+def make_limiter(**kwargs):
+    options = {"posts_per_hour": 60, "burst": 2, "min_spacing_seconds": 0}
+    options.update(kwargs)
+    return RateLimiter(**options)
+
+
+def new_account():
+    return f"account-{uuid.uuid4().hex[:8]}"
+
+
+def test_acquire_spends_the_burst_then_returns_the_next_slot(db):
+    limiter, account = make_limiter(), new_account()
+    now = datetime(2030, 1, 1, 12, 0)
+
+    assert limiter.acquire(account, now) is None
+    assert limiter.acquire(account, now) is None
+    assert limiter.acquire(account, now) == now + timedelta(minutes=1)
+
+
+def test_processes_share_one_bucket(db):
+    # Two limiters stand in for the API and a Celery worker: state is in the DB, not the instance
+    api, worker, account = make_limiter(burst=1), make_limiter(burst=1), new_account()
+    now = datetime(2030, 1, 1, 12, 0)
+
+    assert api.acquire(account, now) is None
+    assert worker.acquire(account, now) == now + timedelta(minutes=1)
+    assert worker.plan(account, [now, now], now) == [now + timedelta(minutes=1), now + timedelta(minutes=2)]
+
+
+def test_concurrent_acquires_grant_only_the_burst(db):
+    account, now = new_account(), datetime(2030, 1, 1, 12, 0)
+    granted = []
+    start = threading.Barrier(6)
+
+    def worker():
+        limiter = make_limiter(burst=2)
+        start.wait(timeout=5)
+        if limiter.acquire(account, now) is None:
+            granted.append(True)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(granted) == 2
+
+
+def test_plan_does_not_consume_tokens(db):
+    limiter, account = make_limiter(burst=1), new_account()
+    now = datetime(2030, 1, 1, 12, 0)
+
+    assert limiter.plan(account, [now, now], now) == [now, now + timedelta(minutes=1)]
+    assert limiter.acquire(account, now) is None
+
+
+def test_take_counts_a_post_that_skipped_the_limit(db):
+    limiter, account = make_limiter(burst=1, min_spacing_seconds=120), new_account()
+    now = datetime(2030, 1, 1, 12, 0)
+
+    limiter.take(account, now)
+    assert limiter.acquire(account, now + timedelta(seconds=30)) == now + timedelta(minutes=2)
+    assert account in limiter.stats()["next_slot"]
+
+
+def test_disabled_limiter_keeps_no_state(db):
+    limiter, account = make_limiter(posts_per_hour=0, min_spacing_seconds=0), new_account()
+    now = datetime(2030, 1, 1, 12, 0)
+
+    assert limiter.acquire(account, now) is None
+    limiter.take(account, now)
+    assert db.get(RateLimitState, account) is None
+
+
+def test_refund_gives_back_a_token_for_a_post_that_never_ran(db):
+    limiter, account = make_limiter(burst=1, min_spacing_seconds=120), new_account()
+    now = datetime(2030, 1, 1, 12, 0)
+
+    assert limiter.acquire(account, now) is None
+    limiter.refund(account, now)
+    assert limiter.acquire(account, now) is None
+    # The post that did run still spaces the next one
+    assert limiter.acquire(account, now + timedelta(seconds=30)) == now + timedelta(minutes=2)
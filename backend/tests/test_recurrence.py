@@ -0,0 +1,80 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from models import RecurrenceRule, ScheduledUpload, Video
+from recurrence import materialize, remove_video
+
+
+def make_video(db, name):
+    video = Video(
+        original_filename=name,
+        stored_filename=f"{uuid.uuid4().hex}-{name}",
+        file_path=f"uploads/{name}",
+        description="d",
+        file_size=1,
+    )
+    db.add(video)
+    db.commit()
+    return video
+
+
+def make_rule(db, video_ids):
+    rule = RecurrenceRule(
+        video_ids=json.dumps(video_ids),
+        description="series",
+        frequency="daily",
+        interval=1,
+        times=json.dumps(["09:00", "18:00"]),
+        starts_at=datetime.now() + timedelta(hours=1),
+        active=True,
+    )
+    db.add(rule)
+    db.commit()
+    return rule
+
+
+def materialized_videos(db, rule):
+    rows = db.query(ScheduledUpload.video_id).filter(ScheduledUpload.rule_id == rule.id)
+    return {row.video_id for row in rows}
+
+
+def test_deleted_video_leaves_the_rotation(db):
+    kept, deleted = make_video(db, "kept.mp4"), make_video(db, "deleted.mp4")
+    rule = make_rule(db, [kept.id, deleted.id])
+
+    assert remove_video(db, deleted.id) == [rule.id]
+    db.delete(deleted)
+    db.commit()
+
+    assert json.loads(rule.video_ids) == [kept.id]
+    assert rule.active
+    materialize(db, until=datetime.now() + timedelta(days=3), rule_ids=[rule.id])
+    db.commit()
+    assert materialized_videos(db, rule) == {kept.id}
+
+
+def test_rule_left_without_videos_is_deactivated(db):
+    only = make_video(db, "only.mp4")
+    rule = make_rule(db, [only.id])
+
+    remove_video(db, only.id)
+    db.delete(only)
+    db.commit()
+
+    assert not rule.active
+    assert materialize(db, until=datetime.now() + timedelta(days=3), rule_ids=[rule.id]) == []
+
+
+def test_materialize_skips_videos_that_no_longer_exist(db):
+    kept, gone = make_video(db, "kept2.mp4"), make_video(db, "gone.mp4")
+    rule = make_rule(db, [kept.id, gone.id])
+    # Deleted without going through remove_video, as an older release did
+    db.delete(gone)
+    db.commit()
+
+    created = materialize(db, until=datetime.now() + timedelta(days=3), rule_ids=[rule.id])
+    db.commit()
+
+    assert created
+    assert materialized_videos(db, rule) == {kept.id}
@@ -0,0 +1,31 @@
+import random
+
+from retry_policy import AUTH, PERMANENT, TRANSIENT, RetryPolicy, UploadFailure, classify_failure
+
+
+def test_exceptions_are_classified_by_type_and_message():
+    assert classify_failure(TimeoutError("page load timed out")) == TRANSIENT
+    assert classify_failure(RuntimeError("sessionid cookie expired")) == AUTH
+    assert classify_failure(RuntimeError("Video violates community guidelines")) == PERMANENT
+    assert classify_failure(FileNotFoundError("clip.mp4")) == PERMANENT
+    assert classify_failure(UploadFailure("preflight failed", PERMANENT)) == PERMANENT
+
+
+def test_returned_failure_list_is_transient():
+    failed = [{"path": "clip.mp4", "description": "Morning run #fyp"}]
+    assert classify_failure(failed) == TRANSIENT
+
+
+def test_caption_with_marker_words_does_not_change_the_class():
+    # upload_video hands back the video dicts it couldn't post, caption and all
+    failed = [{"path": "clip.mp4", "description": "My cookie recipe, no copyright intended, login for more"}]
+    assert classify_failure(failed) == TRANSIENT
+
+
+def test_backoff_stays_within_the_ceiling_and_runs_out():
+    policy = RetryPolicy(max_attempts=3, base_delay_seconds=10, max_delay_seconds=15)
+    rng = random.Random(0)
+
+    assert 5 <= policy.next_delay(1, rng) <= 10
+    assert 7.5 <= policy.next_delay(2, rng) <= 15
+    assert policy.next_delay(3, rng) is None
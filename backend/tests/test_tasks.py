@@ -0,0 +1,47 @@
+import uuid
+from datetime import datetime, timedelta
+
+import tasks
+from models import ScheduledUpload, Video
+from rate_limit import RateLimiter
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.deferred = []
+
+    def defer(self, schedule_id, when, account_id=None):
+        self.deferred.append((schedule_id, when))
+
+
+def test_an_account_busy_deferral_refunds_the_rate_limit_token(db, monkeypatch):
+    video = Video(
+        original_filename="busy.mp4",
+        stored_filename=f"{uuid.uuid4().hex}-busy.mp4",
+        file_path="uploads/busy.mp4",
+        description="d",
+        file_size=1,
+    )
+    db.add(video)
+    db.flush()
+    schedule = ScheduledUpload(video_id=video.id, scheduled_time=datetime.now(), description="d", status="pending")
+    db.add(schedule)
+    db.commit()
+
+    limiter = RateLimiter(posts_per_hour=60, burst=1, min_spacing_seconds=0)
+    monkeypatch.setattr(tasks, "dispatch_limiter", limiter)
+    # Another worker filled the account's last slot between the check and the claim
+    monkeypatch.setattr(tasks, "claim_schedule", lambda schedule_id, max_per_account=None: None)
+    account = f"account-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setattr(tasks, "account_key", lambda account_id: account)
+    now = datetime.now()
+    busy_until = now + timedelta(seconds=60)
+    dispatcher = RecordingDispatcher()
+
+    assert limiter.acquire(account, now) is None
+    result = tasks._upload_within_cap(dispatcher, schedule.id, None, busy_until, None, now)
+
+    assert result["reason"] == "account_busy"
+    assert dispatcher.deferred == [(schedule.id, busy_until)]
+    # The post didn't happen, so the next one isn't pushed out
+    assert limiter.acquire(account, now) is None
@@ -0,0 +1,142 @@
+"""Bounded upload worker pool with per-account queues and concurrency limits"""
+from __future__ import annotations
+
+import bisect
+import itertools
+import os
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from datetime import datetime
+
+from accounts import DEFAULT_ACCOUNT
+from upload_worker import process_schedule
+
+MAX_WORKERS = int(os.getenv("UPLOAD_MAX_WORKERS", "4"))
+MAX_PER_ACCOUNT = int(os.getenv("UPLOAD_MAX_PER_ACCOUNT", "2"))
+# Queue depth above which submit() starts warning about backpressure
+BACKPRESSURE_THRESHOLD = int(os.getenv("UPLOAD_BACKPRESSURE_THRESHOLD", "20"))
+
+
+class UploadPool:
+    """Runs ``process_schedule`` on a fixed set of threads.
+
+    Each account has its own queue. A free worker takes the oldest
+    ``scheduled_time`` among the heads of the queues whose account is below
+    ``max_per_account`` running uploads, so a backlog (or a run of slow
+    uploads) on one account never holds up the others beyond its own slots.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_per_account: int = MAX_PER_ACCOUNT):
+        self.max_workers = max(max_workers, 1)
+        self.max_per_account = max(max_per_account, 1)
+        self._queues = {}  # account -> sorted [(scheduled_time, seq, schedule_id)]
+        self._futures = {}
+        self._running = Counter()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def submit(
+        self,
+        schedule_id: int,
+        scheduled_time: datetime | None = None,
+        account: str | None = None,
+    ) -> Future:
+        """Queue a schedule for upload; returns the existing future if already queued"""
+        account = account or DEFAULT_ACCOUNT
+        with self._cond:
+            existing = self._futures.get(schedule_id)
+            if existing is not None:
+                return existing
+
+            future = Future()
+            self._futures[schedule_id] = future
+            entry = (scheduled_time or datetime.now(), next(self._seq), schedule_id)
+            bisect.insort(self._queues.setdefault(account, []), entry)
+            self._start_threads()
+            self._cond.notify_all()
+
+            queued = self._queued()
+            if queued > BACKPRESSURE_THRESHOLD:
+                print(
+                    f"[upload-pool] Backpressure: {queued} queued, "
+                    f"{sum(self._running.values())}/{self.max_workers} running"
+                )
+        return future
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth and running uploads for backpressure reporting"""
+        with self._cond:
+            now = datetime.now()
+            heads = [queue[0][0] for queue in self._queues.values()]
+            oldest = min(heads) if heads else None
+            queued = self._queued()
+            return {
+                "queued": queued,
+                "queued_per_account": {account: len(queue) for account, queue in self._queues.items()},
+                "running": sum(self._running.values()),
+                "max_workers": self.max_workers,
+                "max_per_account": self.max_per_account,
+                "running_per_account": dict(self._running),
+                "oldest_queued_wait_seconds": (
+                    max((now - oldest).total_seconds(), 0) if oldest else 0
+                ),
+                "saturated": queued > 0
+                and sum(self._running.values()) >= self.max_workers,
+            }
+
+    def _start_threads(self) -> None:
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(
+                target=self._work,
+                name=f"upload-pool-{len(self._threads)}",
+                daemon=True,
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _take(self):
+        # Oldest queue head among accounts that still have a free slot
+        account = min(
+            (a for a, queue in self._queues.items() if self._running[a] < self.max_per_account),
+            key=lambda a: self._queues[a][0],
+            default=None,
+        )
+        if account is None:
+            return None
+        queue = self._queues[account]
+        _, _, schedule_id = queue.pop(0)
+        if not queue:
+            del self._queues[account]
+        self._running[account] += 1
+        return schedule_id, account
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                entry = self._take()
+                while entry is None:
+                    self._cond.wait()
+                    entry = self._take()
+
+            schedule_id, account = entry
+            future = self._futures[schedule_id]
+            try:
+                future.set_result(process_schedule(schedule_id, headless=False))
+            except Exception as exc:  # noqa: BLE001
+                print(f"[upload-pool] Schedule {schedule_id} crashed: {exc}")
+                future.set_exception(exc)
+            finally:
+                with self._cond:
+                    self._running[account] -= 1
+                    if not self._running[account]:
+                        del self._running[account]
+                    self._futures.pop(schedule_id, None)
+                    self._cond.notify_all()
+
+
+upload_pool = UploadPool()
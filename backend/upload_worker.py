@@ -1,12 +1,26 @@
 """Shared upload worker logic"""
 from __future__ import annotations
 
-from datetime import datetime
+import os
+import socket
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
 from pathlib import Path
-from time import sleep
+from time import monotonic, sleep
 
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import aliased
+
+from browser_pool import BROWSER_POOL_ENABLED, browser_pool
+from change_feed import next_change_seq
 from database import SessionLocal
-from models import ScheduledUpload
+from events import event_bus, schedule_event
+from metrics import dispatch_lateness_seconds, upload_attempts_total, upload_phase_seconds
+from models import ScheduledUpload, UploadAttempt
+from preflight import upload_source
+from retry_policy import AUTH, PERMANENT, POLICIES, TRANSIENT, UploadFailure, classify_failure
 
 # Add tiktok-uploader to path
 import sys
@@ -17,6 +31,17 @@ sys.path.insert(0, str(TIKTOK_UPLOADER_PATH))
 from tiktok_uploader import config as tt_config  # noqa: E402
 from tiktok_uploader.upload import upload_video  # noqa: E402
 
+DEFAULT_COOKIES_PATH = (
+    Path(__file__).parent.parent / "tiktok-uploader" / "tiktok_only_cookies.txt"
+)
+
+# A claim is valid until lease_expires_at; the heartbeat keeps pushing it out
+LEASE_SECONDS = int(os.getenv("UPLOAD_LEASE_SECONDS", "600"))
+HEARTBEAT_SECONDS = max(LEASE_SECONDS // 3, 1)
+# host:pid:boot - the boot part tells this process apart from an earlier one that had the same pid
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+# An interrupted attempt that never recorded a post: "retry" (per the retry policy) or "fail"
+ORPHAN_UPLOAD_POLICY = os.getenv("ORPHAN_UPLOAD_POLICY", "retry")
 
 _SLOW_MODE_APPLIED = False
 
@@ -36,24 +61,268 @@ def _apply_slow_mode() -> None:
     # Always run with the browser visible for debugging
     tt_config.headless = False
 
+    # Pooled browsers outlive a single upload
+    if BROWSER_POOL_ENABLED:
+        tt_config.quit_on_end = False
+
     _SLOW_MODE_APPLIED = True
 
 
+def _live_uploads(account_of, now: datetime):
+    """Rows of the account of ``account_of`` (a column) uploading under an unexpired lease"""
+    other = aliased(ScheduledUpload)
+    return (
+        select(func.count(other.id))
+        .where(
+            other.account_id.is_not_distinct_from(account_of),
+            other.status == "uploading",
+            other.lease_expires_at >= now,
+        )
+        .scalar_subquery()
+    )
+
+
+def running_uploads(account_id: int | None) -> int:
+    """Uploads in flight for an account across every process, by their live leases"""
+    db = SessionLocal()
+    try:
+        return db.execute(select(_live_uploads(account_id, datetime.now()))).scalar_one()
+    finally:
+        db.close()
+
+
+def claim_schedule(schedule_id: int, max_per_account: int | None = None) -> str | None:
+    """Atomically claim a schedule for upload.
+
+    A single conditional UPDATE flips a pending row (or an "uploading" row whose
+    lease has expired because its worker died) to "uploading" under a fresh lease.
+    With ``max_per_account`` the same UPDATE also requires fewer live leases than
+    that on the row's account, so processes sharing the DB share the cap.
+    Returns the lease token, or None if another worker got there first or the
+    account is at its cap.
+    """
+    now = datetime.now()
+    token = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+    db = SessionLocal()
+    try:
+        conditions = [
+            ScheduledUpload.id == schedule_id,
+            or_(
+                ScheduledUpload.status == "pending",
+                and_(
+                    ScheduledUpload.status == "uploading",
+                    ScheduledUpload.lease_expires_at < now,
+                ),
+            ),
+        ]
+        if max_per_account is not None:
+            conditions.append(_live_uploads(ScheduledUpload.account_id, now) < max_per_account)
+        claimed = (
+            db.query(ScheduledUpload)
+            .filter(*conditions)
+            .update(
+                {
+                    ScheduledUpload.status: "uploading",
+                    ScheduledUpload.lease_owner: token,
+                    ScheduledUpload.lease_expires_at: now + timedelta(seconds=LEASE_SECONDS),
+                    ScheduledUpload.heartbeat_at: now,
+                    ScheduledUpload.change_seq: next_change_seq(db.connection()),
+                },
+                synchronize_session=False,
+            )
+        )
+        if not claimed:
+            # Also undoes the change-counter bump
+            db.rollback()
+            return None
+        db.commit()
+        return token
+    finally:
+        db.close()
+
+
+def renew_lease(schedule_id: int, token: str) -> bool:
+    """Extend a held lease; returns False if it was lost to another worker"""
+    now = datetime.now()
+    db = SessionLocal()
+    try:
+        renewed = (
+            db.query(ScheduledUpload)
+            .filter(
+                ScheduledUpload.id == schedule_id,
+                ScheduledUpload.lease_owner == token,
+            )
+            .update(
+                {
+                    ScheduledUpload.lease_expires_at: now + timedelta(seconds=LEASE_SECONDS),
+                    ScheduledUpload.heartbeat_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(renewed)
+    finally:
+        db.close()
+
+
+def recover_orphaned_uploads(*, startup: bool = False) -> int:
+    """Reconcile "uploading" rows whose worker is gone.
+
+    Routine passes take rows whose lease expired. A ``startup`` pass also takes
+    rows leased by processes on this host that are no longer running, so a
+    restart doesn't wait out LEASE_SECONDS. Rows whose last attempt recorded
+    ``posted_at`` are completed. Rows where nothing started go back to
+    "pending", and interrupted attempts are retried or failed per
+    ORPHAN_UPLOAD_POLICY. Only "uploading" rows are scanned, through the status
+    index, so the pass costs the same however large the pending backlog is.
+    """
+    now = datetime.now()
+    db = SessionLocal()
+    try:
+        query = db.query(ScheduledUpload).filter(ScheduledUpload.status == "uploading")
+        if not startup:
+            query = query.filter(ScheduledUpload.lease_expires_at < now)
+        orphans = [
+            schedule
+            for schedule in query.all()
+            if schedule.lease_expires_at is None
+            or schedule.lease_expires_at.replace(tzinfo=None) < now
+            or _owner_is_dead(schedule.lease_owner)
+        ]
+        if not orphans:
+            db.rollback()
+            return 0
+
+        unfinished = {}
+        for record in (
+            db.query(UploadAttempt)
+            .filter(
+                UploadAttempt.schedule_id.in_([schedule.id for schedule in orphans]),
+                UploadAttempt.finished_at.is_(None),
+            )
+            .order_by(UploadAttempt.attempt)
+        ):
+            unfinished[record.schedule_id] = record
+
+        outcomes = Counter()
+        for schedule in orphans:
+            outcomes[_reconcile(schedule, unfinished.get(schedule.id), now)] += 1
+        db.commit()
+        summary = ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items()))
+        print(f"[upload-worker] Recovered {len(orphans)} orphaned upload(s): {summary}")
+        return len(orphans)
+    finally:
+        db.close()
+
+
+def _reconcile(schedule: ScheduledUpload, record: UploadAttempt | None, now: datetime) -> str:
+    """Settle one orphaned row; returns what happened to it"""
+    _release_lease(schedule)
+    # Its Celery task already ran; let the next sync enqueue a fresh one
+    schedule.dispatch_token = None
+    if record is None:
+        # Claimed, but the attempt never started
+        schedule.status = "pending"
+        return "requeued"
+    if record.posted_at is not None:
+        _complete(schedule, record, record.posted_at)
+        return "completed"
+
+    message = f"Attempt {record.attempt} interrupted: worker stopped mid-upload"
+    _record_failure(record, TRANSIENT, message)
+    delay = POLICIES[TRANSIENT].next_delay(record.attempt) if ORPHAN_UPLOAD_POLICY == "retry" else None
+    if delay is None:
+        _finish_failed(schedule, f"Attempt {record.attempt} interrupted (not retried; check TikTok before re-posting)")
+        return "failed"
+    record.retry_at = schedule.next_attempt_at = now + timedelta(seconds=delay)
+    schedule.status = "pending"
+    return "retried"
+
+
+def _owner_is_dead(owner: str | None) -> bool:
+    """True if a lease token belongs to a process on this host that has exited"""
+    try:
+        host, pid, boot, _ = owner.rsplit(":", 3)
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return False
+    if host != socket.gethostname():
+        return False
+    if pid == os.getpid():
+        # Same pid, different boot: an earlier run of this process
+        return f"{host}:{pid}:{boot}" != WORKER_ID
+    if os.name == "nt":
+        # os.kill would terminate the process rather than probe it
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+class LeaseHeartbeat:
+    """Renews a lease in the background while a long upload runs"""
+
+    def __init__(self, schedule_id: int, token: str):
+        self.schedule_id = schedule_id
+        self.token = token
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            try:
+                if not renew_lease(self.schedule_id, self.token):
+                    self.lost = True
+                    print(f"[upload-worker] Schedule {self.schedule_id}: lease lost")
+                    return
+            except Exception as exc:  # noqa: BLE001
+                print(f"[upload-worker] Schedule {self.schedule_id}: heartbeat failed: {exc}")
+
+
 def process_schedule(
     schedule_id: int,
     *,
     headless: bool = False,
-    max_attempts: int = 3,
-    retry_delay_seconds: int = 20,
     initial_delay_seconds: int = 3,
+    lease_token: str | None = None,
 ) -> bool:
-    """Process a scheduled upload with retries.
+    """Make one upload attempt for a schedule.
+
+    A failed attempt is classified (see retry_policy.py); if its policy allows
+    another try the row goes back to "pending" with ``next_attempt_at`` set, and
+    the worker thread is freed instead of sleeping through the backoff.
+
+    Pass ``lease_token`` when the caller has already claimed the row.
 
     Returns True on success, False on failure or if schedule not found.
     """
 
     _apply_slow_mode()
 
+    token = lease_token
+    if token is None:
+        with upload_phase_seconds.time(phase="claim"):
+            token = claim_schedule(schedule_id)
+    if token is None:
+        print(
+            f"[upload-worker] Schedule {schedule_id} not found, not pending or claimed elsewhere, skipping"
+        )
+        return False
+
     db = SessionLocal()
     try:
         schedule = (
@@ -66,78 +335,222 @@ def process_schedule(
             print(f"[upload-worker] Schedule {schedule_id} not found")
             return False
 
-        if schedule.status in {"completed", "cancelled"}:
-            print(
-                f"[upload-worker] Schedule {schedule_id} already {schedule.status}, skipping"
-            )
+        posted = (
+            db.query(UploadAttempt)
+            .filter(UploadAttempt.schedule_id == schedule_id, UploadAttempt.posted_at.isnot(None))
+            .first()
+        )
+        if posted:
+            # An earlier attempt posted but died before recording it; never post twice
+            _complete(schedule, posted, posted.posted_at)
+            _release_lease(schedule)
+            db.commit()
+            event_bus.publish("schedule.status", schedule_event(schedule))
+            print(f"[upload-worker] Schedule {schedule_id}: already posted by attempt {posted.attempt}")
+            return True
+
+        interrupted = (
+            db.query(UploadAttempt)
+            .filter(UploadAttempt.schedule_id == schedule_id, UploadAttempt.finished_at.is_(None))
+            .all()
+        )
+        for stale in interrupted:
+            # Claimed straight off an expired lease, before recovery got to it
+            _record_failure(stale, TRANSIENT, f"Attempt {stale.attempt} interrupted: worker stopped mid-upload")
+        if interrupted and ORPHAN_UPLOAD_POLICY != "retry":
+            _finish_failed(schedule, f"Attempt {interrupted[-1].attempt} interrupted (not retried; check TikTok before re-posting)")
+            db.commit()
+            event_bus.publish("schedule.status", schedule_event(schedule))
             return False
 
+        event_bus.publish("schedule.status", schedule_event(schedule))
+
+        attempt = (schedule.attempt_count or 0) + 1
+        if attempt == 1:
+            lateness = (datetime.now() - schedule.scheduled_time.replace(tzinfo=None)).total_seconds()
+            dispatch_lateness_seconds.observe(max(lateness, 0))
+        schedule.attempt_count = attempt
+        schedule.next_attempt_at = None
+        record = UploadAttempt(
+            schedule_id=schedule_id,
+            attempt=attempt,
+            worker=token,
+            started_at=datetime.now(),
+            outcome="failed",
+        )
+        db.add(record)
+
         video = schedule.video
         if not video:
-            schedule.status = "failed"
-            schedule.error_message = "Video record missing"
+            _record_failure(record, PERMANENT, "Video record missing")
+            _finish_failed(schedule, "Video record missing")
             db.commit()
+            event_bus.publish("schedule.status", schedule_event(schedule))
             return False
 
-        cookies_path = (
-            Path(__file__).parent.parent
-            / "tiktok-uploader"
-            / "tiktok_only_cookies.txt"
-        )
-
-        schedule.status = "uploading"
+        # Nothing is held open while the browser works
+        description, account_id = schedule.description, schedule.account_id
+        failure = None
+        try:
+            file_path = upload_source(video)
+            cookies_path = cookies_for(schedule)
+        except UploadFailure as exc:
+            cookies_path, failure = None, exc
         db.commit()
 
-        # Give Chrome a moment before hammering TikTok
-        sleep(max(initial_delay_seconds, 0))
+        with LeaseHeartbeat(schedule_id, token) as heartbeat:
+            if attempt == 1 and cookies_path:
+                # Give Chrome a moment before hammering TikTok
+                with upload_phase_seconds.time(phase="initial_delay"):
+                    sleep(max(initial_delay_seconds, 0))
 
-        for attempt in range(1, max_attempts + 1):
+            print(f"[upload-worker] Schedule {schedule_id}: attempt {attempt}")
+            started = monotonic()
+            try:
+                if cookies_path:
+                    failure = _upload_once(file_path, description, str(cookies_path), headless)
+            except Exception as exc:  # noqa: BLE001
+                failure = exc
             print(
-                f"[upload-worker] Schedule {schedule_id}: attempt {attempt}/{max_attempts}"
+                f"[upload-worker] Schedule {schedule_id}: attempt took {monotonic() - started:.1f}s"
             )
-            try:
-                result = upload_video(
-                    filename=video.file_path,
-                    description=schedule.description,
-                    cookies=str(cookies_path),
-                    headless=headless,
-                    num_retries=3,
-                )
-
-                if not result:
-                    schedule.status = "completed"
-                    schedule.uploaded_at = datetime.now()
-                    schedule.error_message = None
-                    db.commit()
-                    print(f"[upload-worker] Schedule {schedule_id}: success")
-                    return True
-
-                message = (
-                    f"Attempt {attempt} failed: {result}"
-                    if not isinstance(result, str)
-                    else f"Attempt {attempt} failed: {result}"
-                )
-                schedule.error_message = message
+            if cookies_path and not failure:
+                # Idempotency marker, committed on its own: if the completion below
+                # never lands, recovery sees the video is live and won't re-post it
+                record.posted_at = datetime.now()
                 db.commit()
-                print(f"[upload-worker] {message}")
 
-            except Exception as exc:  # noqa: BLE001
-                message = f"Attempt {attempt} raised error: {exc}"
-                schedule.error_message = message
+        if heartbeat.lost:
+            # Another worker owns the row now; record the attempt but leave the row alone
+            db.refresh(schedule)
+            if failure:
+                _record_failure(record, TRANSIENT, "Lease lost during upload")
+            else:
+                # Posted; posted_at stops the new owner from uploading it again
+                record.outcome = "completed"
+                record.finished_at = datetime.now()
+            db.commit()
+            print(f"[upload-worker] Schedule {schedule_id}: lease lost, giving up")
+            return False
+
+        if not failure:
+            _complete(schedule, record, record.posted_at)
+            _release_lease(schedule)
+            with upload_phase_seconds.time(phase="commit"):
                 db.commit()
-                print(f"[upload-worker] {message}")
+            upload_attempts_total.inc(outcome="completed")
+            event_bus.publish("schedule.status", schedule_event(schedule))
+            print(f"[upload-worker] Schedule {schedule_id}: success")
+            return True
 
-            if attempt < max_attempts:
-                print(
-                    f"[upload-worker] Schedule {schedule_id}: retrying in {retry_delay_seconds}s"
-                )
-                sleep(max(retry_delay_seconds, 1))
+        failure_class = classify_failure(failure)
+        message = (
+            f"Attempt {attempt} raised error: {failure}"
+            if isinstance(failure, Exception)
+            else f"Attempt {attempt} failed: {failure}"
+        )
+        _record_failure(record, failure_class, message)
+        print(f"[upload-worker] {message} ({failure_class})")
 
-        schedule.status = "failed"
-        db.commit()
-        print(f"[upload-worker] Schedule {schedule_id}: all attempts failed")
+        delay = POLICIES[failure_class].next_delay(attempt)
+        if delay is None:
+            _finish_failed(schedule, f"{message} ({failure_class}, giving up)")
+            with upload_phase_seconds.time(phase="commit"):
+                db.commit()
+            event_bus.publish("schedule.status", schedule_event(schedule))
+            print(f"[upload-worker] Schedule {schedule_id}: all attempts failed")
+            return False
+
+        retry_at = datetime.now() + timedelta(seconds=delay)
+        record.retry_at = retry_at
+        schedule.status = "pending"
+        schedule.next_attempt_at = retry_at
+        _release_lease(schedule)
+        with upload_phase_seconds.time(phase="commit"):
+            db.commit()
+        event_bus.publish("schedule.attempt_failed", schedule_event(schedule))
+        _queue_retry(schedule_id, retry_at, account_id)
+        print(f"[upload-worker] Schedule {schedule_id}: retrying in {delay:.0f}s")
         return False
 
     finally:
         db.close()
 
+
+def _record_failure(record: UploadAttempt, failure_class: str, message: str) -> None:
+    upload_attempts_total.inc(outcome="failed", failure_class=failure_class)
+    record.outcome = "failed"
+    record.failure_class = failure_class
+    record.error_message = message
+    record.finished_at = datetime.now()
+
+
+def _complete(schedule: ScheduledUpload, record: UploadAttempt, posted_at: datetime) -> None:
+    if record.finished_at is None:
+        record.outcome = "completed"
+        record.finished_at = datetime.now()
+    schedule.status = "completed"
+    schedule.uploaded_at = posted_at
+    schedule.error_message = None
+    schedule.next_attempt_at = None
+
+
+def _finish_failed(schedule: ScheduledUpload, message: str) -> None:
+    schedule.status = "failed"
+    schedule.error_message = message
+    _release_lease(schedule)
+
+
+def _queue_retry(schedule_id: int, retry_at: datetime, account_id: int | None) -> None:
+    """Hand the retry to this process's dispatcher; other processes pick it up on resync"""
+    from dispatcher import dispatcher  # imported late: dispatcher imports this module
+
+    dispatcher.schedule(schedule_id, retry_at, account_id)
+
+
+def cookies_for(schedule: ScheduledUpload) -> Path:
+    """Cookie file for the schedule's account; the legacy file when it has none"""
+    account = schedule.account
+    if account is None:
+        return DEFAULT_COOKIES_PATH
+    if not account.active:
+        raise UploadFailure(f"Account {account.name} is disabled", PERMANENT)
+    if not account.cookies_path or not Path(account.cookies_path).exists():
+        raise UploadFailure(f"Account {account.name} has no cookies uploaded", AUTH)
+    return Path(account.cookies_path)
+
+
+def _upload_once(file_path: str, description: str, cookies: str, headless: bool):
+    """One tiktok_uploader call, on a warm pooled browser when enabled"""
+    if not BROWSER_POOL_ENABLED:
+        # Browser start-up happens inside upload_video here, so it counts as upload time
+        with upload_phase_seconds.time(phase="upload"):
+            return upload_video(
+                filename=file_path,
+                description=description,
+                cookies=cookies,
+                headless=headless,
+                num_retries=3,
+            )
+
+    started = monotonic()
+    with browser_pool.lease(cookies, headless=headless) as session:
+        upload_phase_seconds.observe(monotonic() - started, phase="browser_start")
+        with upload_phase_seconds.time(phase="upload"):
+            result = upload_video(
+                filename=file_path,
+                description=description,
+                cookies=cookies,
+                headless=headless,
+                num_retries=3,
+                browser_agent=session.driver,
+            )
+        if result:
+            # Failed upload may leave the page in a bad state; start fresh next time
+            session.mark_failed()
+        return result
+
+
+def _release_lease(schedule: ScheduledUpload) -> None:
+    schedule.lease_owner = None
+    schedule.lease_expires_at = None
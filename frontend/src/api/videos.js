@@ -42,8 +42,9 @@ export const createSchedule = async (data) => {
   return response.data
 }
 
-export const getSchedules = async () => {
-  const response = await api.get('/schedules')
+// Optional { from, to } limits the result to a date window (e.g. the visible calendar range)
+export const getSchedules = async (params = {}) => {
+  const response = await api.get('/schedules', { params })
   return response.data
 }
 
@@ -52,6 +53,38 @@ export const updateSchedule = async (id, data) => {
   return response.data
 }
 
+// Pending posts near `time` for the account, plus the next free slots ({ conflicts, suggestions })
+export const getScheduleSlots = async (params) => {
+  const response = await api.get('/schedules/slots', { params })
+  return response.data
+}
+
+// operations: [{ op: 'create' | 'reschedule' | 'cancel', ... }] applied in one transaction
+export const bulkSchedules = async (operations, allOrNothing = false) => {
+  const response = await api.post('/schedules/bulk', { operations, all_or_nothing: allOrNothing })
+  return response.data
+}
+
+export const getAccounts = async () => {
+  const response = await api.get('/accounts')
+  return response.data
+}
+
+export const createRecurrence = async (recurrence) => {
+  const response = await api.post('/recurrences', recurrence)
+  return response.data
+}
+
+export const getRecurrences = async () => {
+  const response = await api.get('/recurrences')
+  return response.data
+}
+
+export const deleteRecurrence = async (id) => {
+  const response = await api.delete(`/recurrences/${id}`)
+  return response.data
+}
+
 export const deleteSchedule = async (id) => {
   const response = await api.delete(`/schedules/${id}`)
   return response.data
@@ -1,7 +1,7 @@
-import { useMemo, useState } from 'react'
-import { useQuery } from '@tanstack/react-query'
+import { useEffect, useMemo, useState } from 'react'
+import { useQuery, useQueryClient } from '@tanstack/react-query'
 import { Calendar, dateFnsLocalizer } from 'react-big-calendar'
-import { format, parse, startOfWeek, getDay } from 'date-fns'
+import { format, parse, startOfWeek, endOfWeek, startOfMonth, endOfMonth, addDays, getDay } from 'date-fns'
 import { enUS } from 'date-fns/locale'
 import 'react-big-calendar/lib/css/react-big-calendar.css'
 import { getSchedules, API_BASE_URL } from '../api/videos'
@@ -22,7 +22,10 @@ const localizer = dateFnsLocalizer({
 function CalendarEvent({ event }) {
   const timeLabel = format(event.start, 'p')
   const schedule = event.resource
-  const videoUrl = schedule.video_file_url ? `${API_BASE_URL}${schedule.video_file_url}` : null
+  // Small preview clip + poster frame when available; the original otherwise
+  const previewUrl = schedule.preview_url || schedule.video_file_url
+  const videoUrl = previewUrl ? `${API_BASE_URL}${previewUrl}` : null
+  const posterUrl = schedule.thumbnail_url ? `${API_BASE_URL}${schedule.thumbnail_url}` : undefined
   
   const statusIcons = {
     completed: <CheckCircle className="w-5 h-5" />,
@@ -42,6 +45,8 @@ function CalendarEvent({ event }) {
         <div className="flex-1 min-h-0 -mx-3 -mb-3 rounded-lg overflow-hidden shadow-md">
           <video
             src={videoUrl}
+            poster={posterUrl}
+            preload={posterUrl ? 'none' : 'metadata'}
             className="w-full h-full object-cover"
             muted
             onClick={(e) => e.stopPropagation()}
@@ -178,16 +183,48 @@ const ScheduleDetailsModal = ({ schedule, onClose }) => {
   )
 }
 
+// Month view shows the surrounding weeks too
+const monthRange = (date) => ({
+  start: startOfWeek(startOfMonth(date)),
+  end: addDays(endOfWeek(endOfMonth(date)), 1),
+})
+
+// react-big-calendar passes an array of days (week/day views) or { start, end } (month view)
+const toRange = (range) => {
+  if (Array.isArray(range)) {
+    return { start: range[0], end: addDays(range[range.length - 1], 1) }
+  }
+  return { start: range.start, end: addDays(range.end, 1) }
+}
+
 export default function CalendarView({ onDateSelect }) {
+  const queryClient = useQueryClient()
   const [selectedSchedule, setSelectedSchedule] = useState(null)
+  const [visibleRange, setVisibleRange] = useState(() => monthRange(new Date()))
 
-  // Fetch schedules
+  // Fetch only the schedules in the visible range
+  const rangeParams = {
+    from: format(visibleRange.start, "yyyy-MM-dd'T'00:00:00"),
+    to: format(visibleRange.end, "yyyy-MM-dd'T'00:00:00"),
+  }
   const { data: schedules = [] } = useQuery({
-    queryKey: ['schedules'],
-    queryFn: getSchedules,
-    refetchInterval: 10000, // Refetch every 10 seconds
+    queryKey: ['schedules', rangeParams],
+    queryFn: () => getSchedules(rangeParams),
+    refetchInterval: 60000, // Fallback only; live updates arrive over SSE
   })
 
+  // Server pushes schedule changes; refetch (cheap 304 if nothing changed) when one arrives
+  useEffect(() => {
+    const source = new EventSource(`${API_BASE_URL}/schedules/events`)
+    const refresh = () => {
+      queryClient.invalidateQueries(['schedules'])
+      queryClient.invalidateQueries(['videos'])
+    }
+    const types = ['schedule.created', 'schedule.updated', 'schedule.cancelled', 'schedule.status', 'schedule.attempt_failed', 'schedule.bulk', 'recurrence.created', 'recurrence.cancelled', 'resync']
+    types.forEach((type) => source.addEventListener(type, refresh))
+    return () => source.close()
+  }, [queryClient])
+
   // Convert schedules to calendar events (convert UTC to local time)
   const events = useMemo(() => {
     return schedules.map((schedule) => {
@@ -271,6 +308,7 @@ export default function CalendarView({ onDateSelect }) {
             onDateSelect(slotInfo.start)
           }}
           onSelectEvent={(event) => setSelectedSchedule(event.resource)}
+          onRangeChange={(range) => setVisibleRange(toRange(range))}
           selectable
           views={['month', 'week', 'day']}
           defaultView="month"
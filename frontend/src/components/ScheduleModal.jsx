@@ -1,7 +1,10 @@
 import { useState, useEffect } from 'react'
 import { useMutation, useQueryClient, useQuery } from '@tanstack/react-query'
 import { X } from 'lucide-react'
-import { createSchedule, getVideos } from '../api/videos'
+import { createSchedule, getAccounts, getScheduleSlots, getVideos } from '../api/videos'
+
+// Minutes either side of the chosen time that count as a clash
+const SLOT_WINDOW_MINUTES = 15
 
 export default function ScheduleModal({ isOpen, onClose, video, initialDate }) {
   const queryClient = useQueryClient()
@@ -18,6 +21,7 @@ export default function ScheduleModal({ isOpen, onClose, video, initialDate }) {
   const [description, setDescription] = useState(video?.description || '')
   const [scheduledDate, setScheduledDate] = useState(() => getDefaultDateTime().date)
   const [scheduledTime, setScheduledTime] = useState(() => getDefaultDateTime().time)
+  const [accountId, setAccountId] = useState('')
 
   // Fetch videos if no video was pre-selected
   const { data: videos = [] } = useQuery({
@@ -26,6 +30,40 @@ export default function ScheduleModal({ isOpen, onClose, video, initialDate }) {
     enabled: !video,
   })
 
+  const { data: accounts = [] } = useQuery({
+    queryKey: ['accounts'],
+    queryFn: getAccounts,
+    enabled: isOpen,
+  })
+  const activeAccounts = accounts.filter(a => a.active)
+
+  // Check the chosen slot once the user stops typing
+  const [slotQuery, setSlotQuery] = useState(null)
+  useEffect(() => {
+    if (!isOpen || !scheduledDate || !scheduledTime) return
+    const timer = setTimeout(() => {
+      setSlotQuery({
+        time: `${scheduledDate}T${scheduledTime}:00`,
+        account_id: accountId || undefined,
+        window_minutes: SLOT_WINDOW_MINUTES,
+        spacing_minutes: SLOT_WINDOW_MINUTES,
+      })
+    }, 300)
+    return () => clearTimeout(timer)
+  }, [isOpen, scheduledDate, scheduledTime, accountId])
+
+  const { data: slots } = useQuery({
+    queryKey: ['scheduleSlots', slotQuery],
+    queryFn: () => getScheduleSlots(slotQuery),
+    enabled: isOpen && !!slotQuery,
+  })
+  const conflicts = slots?.conflicts || []
+
+  const pickSuggestedSlot = (slot) => {
+    setScheduledDate(slot.slice(0, 10))
+    setScheduledTime(slot.slice(11, 16))
+  }
+
   // Set initial values when modal opens - recalculate EVERY time
   useEffect(() => {
     if (isOpen) {
@@ -67,7 +105,8 @@ export default function ScheduleModal({ isOpen, onClose, video, initialDate }) {
   // Post now mutation
   const postNowMutation = useMutation({
     mutationFn: async (data) => {
-      // Create a schedule for 1 minute from now
+      // Create a schedule for 1 minute from now; the API dispatches anything
+      // due within 2 minutes immediately instead of waiting for the time
       const now = new Date(Date.now() + 60 * 1000)
       const localPayload = `${now.toISOString().slice(0, 10)}T${now
         .toTimeString()
@@ -94,6 +133,7 @@ export default function ScheduleModal({ isOpen, onClose, video, initialDate }) {
       video_id: parseInt(selectedVideoId),
       scheduled_time: scheduledTimeValue,
       description: description,
+      account_id: accountId ? parseInt(accountId) : null,
     })
   }
 
@@ -103,6 +143,7 @@ export default function ScheduleModal({ isOpen, onClose, video, initialDate }) {
     postNowMutation.mutate({
       video_id: parseInt(selectedVideoId),
       description: description,
+      account_id: accountId ? parseInt(accountId) : null,
     })
   }
   
@@ -161,6 +202,27 @@ export default function ScheduleModal({ isOpen, onClose, video, initialDate }) {
             </div>
           )}
 
+          {/* Account */}
+          {activeAccounts.length > 0 && (
+            <div>
+              <label className="block text-sm font-medium text-gray-700 mb-1">
+                Account
+              </label>
+              <select
+                value={accountId}
+                onChange={(e) => setAccountId(e.target.value)}
+                className="w-full px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-green-500 focus:border-transparent"
+              >
+                <option value="">Default account</option>
+                {activeAccounts.map((a) => (
+                  <option key={a.id} value={a.id}>
+                    {a.name}{a.has_cookies ? '' : ' (no cookies)'}
+                  </option>
+                ))}
+              </select>
+            </div>
+          )}
+
           {/* Date */}
           <div>
             <label className="block text-sm font-medium text-gray-700 mb-1">
@@ -192,6 +254,30 @@ export default function ScheduleModal({ isOpen, onClose, video, initialDate }) {
             <p className="text-xs text-gray-500 mt-1">
               Your local time
             </p>
+            {conflicts.length > 0 && (
+              <div className="text-xs text-amber-700 bg-amber-50 p-2 rounded mt-2">
+                <p>
+                  {conflicts.length === 1 ? '1 post is' : `${conflicts.length} posts are`} already
+                  scheduled within {SLOT_WINDOW_MINUTES} min:{' '}
+                  {conflicts.map(c => c.scheduled_time.slice(11, 16)).join(', ')}
+                </p>
+                {slots.suggestions.length > 0 && (
+                  <div className="flex flex-wrap items-center gap-1 mt-1">
+                    <span>Free:</span>
+                    {slots.suggestions.map((slot) => (
+                      <button
+                        key={slot}
+                        type="button"
+                        onClick={() => pickSuggestedSlot(slot)}
+                        className="px-2 py-0.5 bg-white border border-amber-300 rounded hover:bg-amber-100"
+                      >
+                        {slot.slice(0, 10) === scheduledDate ? slot.slice(11, 16) : `${slot.slice(5, 10)} ${slot.slice(11, 16)}`}
+                      </button>
+                    ))}
+                  </div>
+                )}
+              </div>
+            )}
           </div>
 
           {/* Description */}
@@ -21,7 +21,7 @@ export default function VideoLibrary({ onScheduleClick }) {
   // Fetch schedules
   const { data: schedules = [] } = useQuery({
     queryKey: ['schedules'],
-    queryFn: getSchedules,
+    queryFn: () => getSchedules(),
   })
 
   // Upload mutation
@@ -202,7 +202,7 @@ function UnscheduledVideosSection({ videos, isLoading, onSchedule, onDelete, onP
           video={video}
           onSchedule={() => onSchedule(video, new Date())}
           onDelete={() => onDelete(video.id)}
-          onPlay={() => onPlayVideo(`${API_BASE_URL}/uploads/${video.stored_filename}`)}
+          onPlay={() => onPlayVideo(`${API_BASE_URL}${video.file_path}`)}
         />
       ))}
     </div>
@@ -232,14 +232,22 @@ function ScheduledVideosSection({ schedules, onUnschedule, onPlayVideo }) {
   )
 }
 
+// Tiles use the small preview clip and poster frame when the backend has rendered them
+const tileMedia = (fileUrl, previewUrl, thumbnailUrl) => ({
+  src: `${API_BASE_URL}${previewUrl || fileUrl}`,
+  poster: thumbnailUrl ? `${API_BASE_URL}${thumbnailUrl}` : undefined,
+})
+
 function VideoCard({ video, onSchedule, onDelete, onPlay }) {
-  const videoUrl = `${API_BASE_URL}/uploads/${video.stored_filename}`
+  const media = tileMedia(video.file_path, video.preview_url, video.thumbnail_url)
   
   return (
     <div className="group border border-gray-200 rounded-xl overflow-hidden hover:border-purple-300 hover:shadow-lg transition-all">
       <div className="relative bg-gray-900 h-48 flex items-center justify-center cursor-pointer" onClick={onPlay}>
         <video
-          src={videoUrl}
+          src={media.src}
+          poster={media.poster}
+          preload={media.poster ? 'none' : 'metadata'}
           className="w-full h-full object-cover"
           muted
         />
@@ -279,7 +287,9 @@ function VideoCard({ video, onSchedule, onDelete, onPlay }) {
 }
 
 function ScheduledVideoCard({ schedule, onUnschedule, onPlay }) {
-  const videoUrl = schedule.video_file_url ? `${API_BASE_URL}${schedule.video_file_url}` : null
+  const media = schedule.video_file_url
+    ? tileMedia(schedule.video_file_url, schedule.preview_url, schedule.thumbnail_url)
+    : null
   const scheduledAt = new Date(schedule.scheduled_time)
   
   const statusConfig = {
@@ -294,10 +304,12 @@ function ScheduledVideoCard({ schedule, onUnschedule, onPlay }) {
 
   return (
     <div className="group border border-gray-200 rounded-xl overflow-hidden hover:border-purple-300 hover:shadow-lg transition-all">
-      {videoUrl && (
+      {media && (
         <div className="relative bg-gray-900 h-48 flex items-center justify-center cursor-pointer" onClick={onPlay}>
           <video
-            src={videoUrl}
+            src={media.src}
+            poster={media.poster}
+            preload={media.poster ? 'none' : 'metadata'}
             className="w-full h-full object-cover"
             muted
           />